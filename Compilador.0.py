@@ -1,13 +1,14 @@
-import os
-import subprocess
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext, PhotoImage
 from ply import lex, yacc
 import pyautogui
 from PIL import Image, ImageTk
-from lexico import Lexer 
-import json
+from resaltado import ResaltadorIncremental
+from numeracion import NumeracionLineas, generar_cambios
+from vista_arbol import VistaArbol, describir_sintactico, describir_anotado
+from arena import rango
 import semantic
+from analisis_fondo import PlanificadorAnalisis, compilar_en_fondo, tokens_en_fondo, ejecutar_en_fondo, resultado_compilacion
 
 
 #Botones
@@ -15,6 +16,16 @@ array_strings = ["Abrir", "Guardar", "Guardar como...", "Cerrar", "Tabla Hash","
 
 ruta_actual=""
 
+# Fases que se analizan mientras se escribe
+FASES_EN_VIVO = ('lexico', 'sintactico', 'semantico')
+
+# Etiquetas de resaltado del área de texto
+ETIQUETAS = ["PALABRA_RESERVADA", "OPERADOR", "ENTERO", "ID", "COMENTARIO", "ERROR", "ASIGNACION", "SIMBOLO", "FLOAT"]
+# Líneas que se resaltan antes y después de la parte visible
+MARGEN_RESALTADO = 100
+# Líneas que se analizan por vez al saltar lejos de lo ya analizado
+LOTE_RESALTADO = 2000
+
 # Funciones para manejar archivos
 # Variable global para contar el número de documentos guardados
 num_documento = 1
@@ -66,6 +77,7 @@ class EditorCompilador:
 
 
         self.root = root
+        self.resultado = None  # Último compilacion.ResultadoCompilacion
         self.root.title("Editor y Compilador")
         self.root.geometry("800x600")  # Tamaño inicial
        
@@ -73,13 +85,14 @@ class EditorCompilador:
         self.paned_window_top = tk.PanedWindow(self.root, orient=tk.HORIZONTAL)
         self.paned_window_top.pack(expand=True, fill="both")
 
-        # Área de número
-        self.num_area = tk.Text(self.paned_window_top, width=4, padx=4, takefocus=0, border=0, background="lightgrey", state="disabled")
-        self.paned_window_top.add(self.num_area)
- 
        # Área de texto para mostrar archivos/editar
         self.text_area = scrolledtext.ScrolledText(self.paned_window_top, wrap=tk.WORD)
         self.text_area.config(wrap='none')  # Desactivar el ajuste automático de líneas
+        generar_cambios(self.text_area)  # <<Change>> en cada edición o movimiento del cursor
+
+        # Área de número: solo las líneas visibles, se redibuja con los cambios y el desplazamiento
+        self.num_area = NumeracionLineas(self.paned_window_top, self.text_area)
+        self.paned_window_top.add(self.num_area)
         self.paned_window_top.add(self.text_area)
 
         # Crear la barra de desplazamiento vertical antes de usarla en self.text_area
@@ -87,8 +100,8 @@ class EditorCompilador:
         
         # Configurar la barra de desplazamiento vertical
         self.scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        self.text_area.configure(yscrollcommand=self.scroll_y.set)
-        self.num_area.configure(yscrollcommand=self.scroll_y.set)
+        self.scroll_y.config(command=self.text_area.yview)
+        self.text_area.configure(yscrollcommand=self.desplazamiento)
 
         # Crear la barra de desplazamiento horizontal antes de usarla en self.text_area
         self.scroll_x = tk.Scrollbar(self.root, orient=tk.HORIZONTAL)
@@ -116,11 +129,24 @@ class EditorCompilador:
         self.notebook_result.add(self.arbol_frame, text="Árbol Sintáctico")
         self.arbol_area = ttk.Treeview(self.arbol_frame)
         self.arbol_area.pack(expand=True, fill="both")
+        # Los hijos se insertan al expandir cada nodo y al recompilar solo se cambia lo distinto
+        self.vista_arbol = VistaArbol(self.arbol_area, describir_sintactico)
+        self.arbol_area.tag_configure('dict_node', foreground='green')
+        self.arbol_area.tag_configure('other_node', foreground='black')  # Estilo por defecto
+        # Al elegir un nodo se marca en el editor el texto que cubre
+        self.arbol_area.bind('<<TreeviewSelect>>', self.seleccionar_nodo)
+        self.lineas_arbol = None  # posiciones.IndiceLineas del texto del árbol mostrado
 
         self.arbol_anotaciones_frame = tk.Frame(self.notebook_result)
         self.notebook_result.add(self.arbol_anotaciones_frame, text="Árbol Sintáctico con anotaciones")
         self.arbol_anotaciones_area = ttk.Treeview(self.arbol_anotaciones_frame)
         self.arbol_anotaciones_area.pack(expand=True, fill="both")
+        self.vista_arbol_anotado = VistaArbol(self.arbol_anotaciones_area, describir_anotado)
+
+        self.intermedio_frame = tk.Frame(self.notebook_result)
+        self.notebook_result.add(self.intermedio_frame, text="Código Intermedio")
+        self.intermedio_area = scrolledtext.ScrolledText(self.intermedio_frame, wrap=tk.NONE)
+        self.intermedio_area.pack(expand=True, fill="both")
         
         # Crear un Treeview para mostrar el árbol sintáctico
         #self.treeview = ttk.Treeview(self.arbol_frame)
@@ -130,11 +156,17 @@ class EditorCompilador:
         self.notebook_terminal = ttk.Notebook(self.root)
         self.notebook_terminal.pack(expand=True, fill="both")
 
-        self.text_area.bind("<KeyRelease>", lambda event: (self.highlight_tokens()))
-        self.text_area.bind("<ButtonRelease>", lambda event: (self.highlight_tokens()))
-        self.text_area.bind("<FocusIn>", lambda event: (self.highlight_tokens()))
-        self.text_area.bind("<MouseWheel>", lambda event: (self.highlight_tokens()))
-        self.text_area.bind("<Configure>", lambda event: (self.highlight_tokens()))
+        # Resaltador incremental: guarda el estado del lexer al inicio de cada
+        # línea y resalta solo la parte visible; se actualiza al modificar el
+        # texto (texto_modificado) y al desplazarse (desplazamiento)
+        self.resaltador = ResaltadorIncremental()
+        self.pintado_pendiente = False
+
+        # Análisis en un proceso aparte: la ventana no se congela con programas
+        # grandes. Cada cambio del texto invalida lo que se esté analizando.
+        self.analisis = PlanificadorAnalisis(root, lambda: self.text_area.get("1.0", tk.END), self.fallo_analisis)
+        self.text_area.bind("<<Modified>>", self.texto_modificado)
+        root.protocol("WM_DELETE_WINDOW", self.cerrar)
 
         # Configura las etiquetas para resaltar los tokens
         self.text_area.tag_configure("PALABRA_RESERVADA", foreground="purple")
@@ -146,6 +178,7 @@ class EditorCompilador:
         self.text_area.tag_configure("ERROR", foreground="red")
         self.text_area.tag_configure("SIMBOLO", foreground="brown")
         self.text_area.tag_configure("ASIGNACION", foreground="brown")
+        self.text_area.tag_configure("SELECCION", background="lightyellow")
 
         # Pestañas para errores
         self.lexical_error_frame = tk.Frame(self.notebook_terminal)
@@ -161,6 +194,15 @@ class EditorCompilador:
         self.hash_table_frame = tk.Frame(self.notebook_terminal, bg="lightblue")
         self.notebook_terminal.add(self.hash_table_frame, text="Tabla Hash")
 
+        # Pestaña de ejecución: datos para cin arriba, salida de cout abajo
+        self.ejecucion_frame = tk.Frame(self.notebook_terminal)
+        self.notebook_terminal.add(self.ejecucion_frame, text="Ejecución")
+        tk.Label(self.ejecucion_frame, text="Entrada (cin):", anchor="w").pack(fill="x")
+        self.entrada_area = tk.Text(self.ejecucion_frame, height=2)
+        self.entrada_area.pack(fill="x")
+        self.salida_area = scrolledtext.ScrolledText(self.ejecucion_frame, height=1)
+        self.salida_area.pack(expand=True, fill="both")
+
         # Agregar un widget de texto para mostrar la tabla hash
         self.hash_table_text = tk.Text(self.hash_table_frame, width=50, height=1)  # Ajusta el tamaño según sea necesario
         self.hash_table_text.pack(expand=True, fill="both")
@@ -173,9 +215,10 @@ class EditorCompilador:
         self.cursor_position_label = tk.Label(self.root, text='')
         self.cursor_position_label.pack()
 
-        # Llamar a la función para obtener la posición del cursor y numerar lineas
+        # La numeración y la posición del cursor se actualizan con cada cambio, sin revisar periódicamente
+        self.cursor_pendiente = False
+        self.text_area.bind("<<Change>>", self.texto_cambiado)
         self.get_cursor_position()
-        self.numerar_lineas()
 
         # Menú principal
         menu_bar = tk.Menu(root)
@@ -200,16 +243,16 @@ class EditorCompilador:
         compile_menu.add_separator()
         compile_menu.add_command(label="Análisis Semantico", command=self.analizador_sem)
         compile_menu.add_separator()
-        compile_menu.add_command(label="Codigo Intermedio")
+        compile_menu.add_command(label="Codigo Intermedio", command=self.codigo_intermedio)
         compile_menu.add_separator()
-        compile_menu.add_command(label="Ejecucion")
+        compile_menu.add_command(label="Ejecucion", command=self.run_code)
         
         # Crear un frame para contener los botones
         frame_botones = tk.Frame(root)
         frame_botones.pack()
 
         # Crear varios botones
-        for i in range(1, 10):
+        for i in range(1, 11):
             if i == 1:
                 boton = tk.Button(frame_botones, text=f"{array_strings[i-1]}", command=self.abrir_archivo)
             elif i == 2: 
@@ -227,11 +270,34 @@ class EditorCompilador:
             elif i == 8: 
                 boton = tk.Button(frame_botones, text=f"{array_strings[i-1]}", command= self.analizador_sem)
             elif i==9:
-                boton = tk.Button(frame_botones, text=f"{array_strings[i-1]}")
+                boton = tk.Button(frame_botones, text=f"{array_strings[i-1]}", command=self.codigo_intermedio)
             else: 
-                boton = tk.Button(frame_botones, text=f"{array_strings[i-1]}")
+                boton = tk.Button(frame_botones, text=f"{array_strings[i-1]}", command=self.run_code)
             boton.pack(side=tk.LEFT, padx=5, pady=5)
         
+    def texto_modificado(self, event=None):
+        # <<Modified>> solo se repite si se vuelve a limpiar la marca
+        if not self.text_area.edit_modified():
+            return
+        self.text_area.edit_modified(False)
+        self.highlight_tokens()
+        self.analisis.cambio()
+        self.analisis.solicitar('en_vivo', compilar_en_fondo, (FASES_EN_VIVO,), self.mostrar_diagnosticos, self.analisis.demora,
+                               en_vivo=True)
+
+    def mostrar_diagnosticos(self, text, datos):
+        self.resultado = resultado_compilacion(text, datos)
+        self.error_display.delete("1.0", tk.END)
+        for mensaje in self.resultado.errores():
+            self.display_error(mensaje)
+
+    def fallo_analisis(self, nombre, error):
+        self.display_error(f"Error en el análisis ({nombre}): {error}")
+
+    def cerrar(self):
+        self.analisis.cerrar()
+        self.root.destroy()
+
     def disable_click(self, event):
         return 'break'  # Esto evita que se procesen los clics
     
@@ -242,9 +308,20 @@ class EditorCompilador:
     
     def sincronizar_scrollbars(self, *args):
         self.text_area.yview_moveto(args[0])
-        self.num_area.yview_moveto(args[0])
         self.result_area.yview_moveto(args[0])
 
+    def desplazamiento(self, primero, ultimo):
+        # yscrollcommand del área de texto: rueda, barra, teclado o cambio de tamaño
+        self.scroll_y.set(primero, ultimo)
+        self.num_area.programar()
+        self.programar_pintado()
+
+    def texto_cambiado(self, event=None):
+        self.num_area.programar()
+        if not self.cursor_pendiente:
+            self.cursor_pendiente = True
+            self.root.after_idle(self.get_cursor_position)
+
     def abrir_archivo(self):
         global ruta_actual
         archivo = filedialog.askopenfilename(defaultextension=".txt", filetypes=[("Archivos de Texto", ".txt"), ("Todos los archivos", ".*")])
@@ -254,138 +331,84 @@ class EditorCompilador:
             self.text_area.delete("1.0", tk.END)
             self.text_area.insert(tk.END, contenido)
             ruta_actual = archivo
-            self.numerar_lineas()
-        self.highlight_tokens()
             
     def analizador_lex(self):
-        # Obtener el texto completo del editor
-        text = self.text_area.get("1.0", tk.END)
-
-        # Limpiar cualquier resaltado anterior
-        for tag_name in ["PALABRA RESERVADA", "OPERADOR", "ENTERO", "ID", "COMENTARIO", "ERROR", "ASIGNACION", "SIMBOLO","FLOAT"]:
-            self.text_area.tag_remove(tag_name, "1.0", tk.END)  # Configurar todos los tags para que el texto sea negro
-
-        # Instanciar un objeto Lexer
-        lexer = Lexer(text)
-        tokens = []
-        errors = []
-
-        # Resaltar los tokens
-        while True:
-            token = lexer.get_next_token()
-            if token.token_type == 'EOF':
-                break
-            
-            if token.token_type=='ERROR':
-                errors.append(token)
-            else:
-                tokens.append(token)
-
-            start_line = token.line 
-            start_column = token.column - 1  # Ajustar la columna inicial
-            end_line = token.line
-            end_column = start_column + len(str(token.value))
-
-            # Agregar etiqueta de resaltado al token
-            start_pos = f"{start_line}.{start_column}"
-            end_pos = f"{end_line}.{end_column}"
-            tag_name = self.get_tag_name(token.token_type)
-            print("Token: " + tag_name)
-            self.text_area.tag_add(tag_name, start_pos, end_pos)
-                
+        # El lexer corre en el proceso de análisis; aquí solo se muestra
+        self.analisis.solicitar('lexico', tokens_en_fondo, (), self.mostrar_lexico)
+
+    def mostrar_lexico(self, text, resultado):
+        tokens, errors = resultado
+
+        # Agrupar los rangos por etiqueta: una sola llamada a Tk por etiqueta
+        rangos = {}
+        for buffer in (tokens, errors):
+            for token in buffer:
+                start_column = token.column - 1  # Ajustar la columna inicial
+                indices = rangos.setdefault(self.get_tag_name(token.token_type), [])
+                indices.append(f"{token.line}.{start_column}")
+                # Fin según la longitud del lexema (no la del valor); "+Nc" sigue
+                # en las líneas siguientes, como en los comentarios de varias líneas
+                indices.append(f"{token.line}.{start_column}+{token.longitud}c")
+
+        # Limpiar cualquier resaltado anterior y resaltar los tokens
+        for tag_name in ETIQUETAS:
+            self.text_area.tag_remove(tag_name, "1.0", tk.END)
+        for tag_name, indices in rangos.items():
+            self.text_area.tag_add(tag_name, *indices)
+
         self.mostrar_tokens(tokens)
         self.mostrar_errors(errors)
-    
-    
-    def mostrar_arbol_sintactico(self, arbol):
-        # Limpiar el Treeview antes de mostrar el nuevo árbol
-        self.arbol_area.delete(*self.arbol_area.get_children())
-
-        # Función recursiva para agregar nodos al Treeview
-        def agregar_nodos(parent, arbol):
-            if isinstance(arbol, dict):
-                nodo_id = self.arbol_area.insert(parent, "end", text=str(arbol['label']), open=True, tags=('dict_node',))
-                for child in arbol.get('children', []):
-                    agregar_nodos(nodo_id, child)
-            elif isinstance(arbol, tuple):
-                nodo_id = self.arbol_area.insert(parent, "end", text=str(arbol[0]), open=True, tags=('tuple_node',))
-                for elemento in arbol[1:]:
-                    agregar_nodos(nodo_id, elemento)
-            elif isinstance(arbol, list):
-                for elemento in arbol:
-                    agregar_nodos(parent, elemento)
-            else:
-                self.arbol_area.insert(parent, "end", text=str(arbol), open=True, tags=('other_node',))  # Asegurar que los nodos individuales también sean colapsables
 
-        # Mostrar el árbol sintáctico
-        agregar_nodos("", arbol)
 
-        # Aplicar estilos a los nodos según el tipo
-        self.arbol_area.tag_configure('dict_node', foreground='green')
-        self.arbol_area.tag_configure('other_node', foreground='black')  # Estilo por defecto
+    def mostrar_arbol_sintactico(self, arbol):
+        # Compara con el árbol mostrado y cambia solo los nodos distintos
+        self.vista_arbol.mostrar(arbol)
+
+    def seleccionar_nodo(self, event=None):
+        # Las posiciones del nodo son offsets en el texto compilado; el índice
+        # de líneas del resultado los convierte en índices "línea.columna" de Tk
+        self.text_area.tag_remove("SELECCION", "1.0", tk.END)
+        datos = self.vista_arbol.datos.get(self.arbol_area.focus())
+        if datos is None or self.lineas_arbol is None:
+            return
+        posicion = rango(datos[0])
+        if posicion is None:
+            return
+        inicio = self.lineas_arbol.indice_tk(posicion[0])
+        self.text_area.tag_add("SELECCION", inicio, self.lineas_arbol.indice_tk(posicion[1]))
+        self.text_area.see(inicio)
 
     def compile_code(self):
-        text = self.text_area.get("1.0", tk.END).strip()
-        input_file = 'temp_input.txt'  # Nombre del archivo temporal para pasar al subprocesso
+        # Análisis léxico y sintáctico en el proceso de análisis, sin archivos intermedios
+        self.analisis.solicitar('sintactico', compilar_en_fondo, (('lexico', 'sintactico'),), self.mostrar_sintactico)
 
-        # Guardar el contenido en un archivo temporal
-        with open(input_file, 'w') as file:
-            file.write(text)
+    def mostrar_sintactico(self, text, datos):
+        self.resultado = resultado_compilacion(text, datos)
 
-        try:
-            result = subprocess.run(
-                ['python', 'sintactic.py', input_file],
-                check=True,
-                text=True,
-                capture_output=True
-            )
-
-            # Leer el archivo de análisis sintáctico y mostrar su contenido
-            with open('analisisSyntax.txt', 'r') as file:
-                content = file.read()
-                self.syntax_area.delete("1.0", tk.END)
-                self.syntax_area.insert(tk.END, content)
-            try:
-                with open('arbol.txt', 'r') as arbol_file:
-                    arbol_content = arbol_file.read()
-                    arbol_sintactico = eval(arbol_content)
-                    self.mostrar_arbol_sintactico(arbol_sintactico)   
-            except:    
-                with open('ast_info.txt', 'r') as arbol_file:
-                    arbol_content = arbol_file.read()
-                    arbol_sintactico = eval(arbol_content)
-                
-            self.error_display.delete("1.0", tk.END)
-            self.error_display.insert(tk.END, result.stdout)
-        except subprocess.CalledProcessError as e:
-            print(f"Error ejecutando analizador sintáctico: {e}")
-        finally:
-            # Eliminar el archivo temporal después de usarlo
-            try:
-                os.remove(input_file)
-            except Exception as e:
-                print(f"No se pudo eliminar el archivo temporal: {e}")
+        self.syntax_area.delete("1.0", tk.END)
+        if self.resultado.exito:
+            self.syntax_area.insert(tk.END, self.resultado.texto_tokens())
+        if self.resultado.ast is not None:
+            self.lineas_arbol = self.resultado.lineas
+            self.mostrar_arbol_sintactico(self.resultado.ast)
+
+        self.error_display.delete("1.0", tk.END)
+        for mensaje in self.resultado.errores():
+            self.display_error(mensaje)
 
     def analizador_sem(self):
-        try:
-            self.arbol_sintactico = self.load_syntax_tree('arbol.txt')
+        self.analisis.solicitar('semantico', compilar_en_fondo, (('lexico', 'sintactico', 'semantico'),), self.mostrar_semantico)
 
-            line_mapping = self.load_line_mapping('analisisSyntax.txt')  # Cargar líneas de 'analisisSyntax.txt'
-            if line_mapping is None:
-                print("No se pudo cargar el archivo de mapeo de líneas.")
-                return
+    def mostrar_semantico(self, text, datos):
+        try:
+            self.resultado = resultado_compilacion(text, datos)
 
-            success = semantic.perform_semantic_analysis(
-                self.arbol_sintactico,
-                'arbol_anotado.txt',
-                'tabla_hash.txt',
-                line_mapping,
-                error_callback=self.display_error
-            )
-            if not success:
+            for mensaje in self.resultado.errores('semantico'):
+                self.display_error(mensaje)
+            if self.resultado.tabla_simbolos is None:
                 return
 
-            self.arbol_anotado = self.load_syntax_tree('arbol_anotado.txt')
+            self.arbol_anotado = self.resultado.arbol_anotado
             self.mostrar_arbol_anotado(self.arbol_anotado)
 
             print("Análisis semántico completado sin errores.")
@@ -394,49 +417,51 @@ class EditorCompilador:
             print(f"Error en análisis semántico: {e}")
             self.error_display.insert(tk.END, str(e) + '\n')
 
+    def codigo_intermedio(self):
+        self.analisis.solicitar('intermedio', compilar_en_fondo, (('lexico', 'sintactico', 'semantico', 'intermedio', 'optimizacion'),),
+                                self.mostrar_intermedio)
+
+    def mostrar_intermedio(self, text, datos):
+        self.resultado = resultado_compilacion(text, datos)
+
+        self.error_display.delete("1.0", tk.END)
+        for mensaje in self.resultado.errores():
+            self.display_error(mensaje)
+
+        self.intermedio_area.delete("1.0", tk.END)
+        if self.resultado.intermedio is None:
+            self.intermedio_area.insert(tk.END, "No se generó código intermedio: corrija los errores del programa.\n")
+        else:
+            self.intermedio_area.insert(tk.END, self.resultado.texto_intermedio())
+            self.intermedio_area.insert(tk.END, "\n; Código optimizado\n")
+            self.intermedio_area.insert(tk.END, self.resultado.optimizado.texto())
+            self.intermedio_area.insert(tk.END, "\n; Instrucciones por pasada\n")
+            for ronda, pasada, antes, despues in self.resultado.reporte_optimizacion:
+                self.intermedio_area.insert(tk.END, f"; ronda {ronda} {pasada:<15} {antes:>6} -> {despues:>6}\n")
+        self.notebook_result.select(self.intermedio_frame)
+
     def display_error(self, error_message):
         self.error_display.insert(tk.END, error_message + '\n')
     
     def mostrar_arbol_anotado(self, arbol_anotado):
-        self.arbol_anotaciones_area.delete(*self.arbol_anotaciones_area.get_children())  # Limpiar la vista anterior
-
-        # Función recursiva para agregar nodos anotados
-        def agregar_nodos_anotados(parent, arbol):
-            if isinstance(arbol, dict):
-                nodo_id = self.arbol_anotaciones_area.insert(parent, "end", text=f"{arbol['label']} (Tipo: {arbol.get('type', 'Desconocido')})", open=True)
-                for child in arbol.get('children', []):
-                    agregar_nodos_anotados(nodo_id, child)
-            elif isinstance(arbol, list):
-                for item in arbol:
-                    agregar_nodos_anotados(parent, item)  # Procesa cada item de la lista
-            else:
-                self.arbol_anotaciones_area.insert(parent, "end", text=str(arbol), open=True)
-
-        agregar_nodos_anotados("", arbol_anotado)
+        self.vista_arbol_anotado.mostrar(arbol_anotado)
 
 
     def load_syntax_tree(self,file_path):
         try:
-            with open(file_path, 'r') as file:
-                syntax_tree = json.load(file)
-            return syntax_tree
-        except json.JSONDecodeError as e:
+            return semantic.load_ast_from_file(file_path)  # arbol.txt en texto o en binario
+        except (ValueError, SyntaxError) as e:
             print(f"Error al cargar el árbol sintáctico: {str(e)}")
             return None
     
-    def load_line_mapping(self, file_path):
-        try:
-            line_mapping = semantic.load_lines_from_file(file_path)  # Cargar el mapeo de líneas
-            return line_mapping
-        except Exception as e:
-            print(f"Error al cargar el archivo de líneas: {str(e)}")
-            return None
-        
     def mostrar_tabla_hash(self):
-        # Leer y mostrar la tabla hash en la pestaña correspondiente
+        # Mostrar la tabla hash del último análisis semántico; si no hay, leerla del archivo
         try:
-            with open('tabla_hash.txt', 'r') as hash_file:
-                tabla_hash = hash_file.read()
+            if self.resultado is not None and self.resultado.tabla_simbolos is not None:
+                tabla_hash = self.resultado.texto_tabla_simbolos()
+            else:
+                with open('tabla_hash.txt', 'r') as hash_file:
+                    tabla_hash = hash_file.read()
             
             self.hash_table_text.delete('1.0', tk.END)  # Limpiar el área antes de mostrar la nueva tabla
             self.hash_table_text.insert(tk.END, tabla_hash)  # Insertar la nueva tabla
@@ -459,46 +484,78 @@ class EditorCompilador:
             token_info = f"Tipo: {token.token_type}, Valor: {token.value}, Línea: {token.line}, Columna: {token.column-1}\n"
             self.error_display.insert(tk.END, token_info)
             
-    def run_code():
-        # Lógica para ejecutar el código
-        pass
-         
-    def highlight_tokens(self, event=None):
-        # Obtener el texto completo del editor
-        text = self.text_area.get("1.0", tk.END)
-
-        # Limpiar cualquier resaltado anterior
-        for tag_name in ["PALABRA RESERVADA", "OPERADOR", "ENTERO", "ID", "COMENTARIO", "ERROR", "ASIGNACION", "SIMBOLO","FLOAT"]:
-            self.text_area.tag_remove(tag_name, "1.0", tk.END)  # Configurar todos los tags para que el texto sea negro
+    def run_code(self):
+        # Compila el programa a bytecode y lo ejecuta en la máquina virtual, en el proceso de análisis
+        self.analisis.solicitar('ejecucion', ejecutar_en_fondo, (self.entrada_area.get("1.0", tk.END),), self.mostrar_ejecucion)
 
+    def mostrar_ejecucion(self, text, resultado):
+        datos, ejecucion = resultado
+        self.resultado = resultado_compilacion(text, datos)
 
-        # Instanciar un objeto Lexer
-        lexer = Lexer(text)
-        tokens = []
-        errors = []
+        self.error_display.delete("1.0", tk.END)
+        for mensaje in self.resultado.errores():
+            self.display_error(mensaje)
 
-        # Resaltar los tokens
-        while True:
-            token = lexer.get_next_token()
-            if token.token_type == 'EOF':
-                break
-            
-            if token.token_type=='ERROR':
-                errors.append(token)
+        self.salida_area.delete("1.0", tk.END)
+        if ejecucion is None:
+            self.salida_area.insert(tk.END, "No se puede ejecutar: corrija los errores del programa.\n")
+        else:
+            self.salida_area.insert(tk.END, ejecucion.salida)
+            if ejecucion.error is not None:
+                self.salida_area.insert(tk.END, f"Error de ejecución: {ejecucion.error}\n")
+            self.salida_area.insert(tk.END, f"\n--- {ejecucion.instrucciones} instrucciones en {ejecucion.segundos:.4f} s "
+                                            f"({ejecucion.instrucciones_por_segundo():,.0f} instrucciones/s)\n")
+        self.notebook_terminal.select(self.ejecucion_frame)
+         
+    def highlight_tokens(self, event=None):
+        # Obtener el texto completo del editor (sin el salto de línea final que agrega Tk)
+        text = self.text_area.get("1.0", "end-1c")
+
+        # Volver a analizar solo las líneas que cambiaron, sin pasar de la parte visible
+        _, ultima = self.lineas_visibles()
+        self.resaltador.actualizar(text, ultima + MARGEN_RESALTADO)
+        self.pintar_visible()
+
+    def lineas_visibles(self):
+        # Primera y última línea visibles del área de texto (base 1)
+        primera = self.text_area.index("@0,0")
+        ultima = self.text_area.index(f"@0,{self.text_area.winfo_height()}")
+        return int(primera.split('.')[0]), int(ultima.split('.')[0])
+
+    def programar_pintado(self, demora=None):
+        if not self.pintado_pendiente:
+            self.pintado_pendiente = True
+            if demora is None:
+                self.root.after_idle(self.pintar_visible)
             else:
-                tokens.append(token)
-
-            start_line = token.line 
-            start_column = token.column - 1  # Ajustar la columna inicial
-            end_line = token.line
-            end_column = start_column + len(str(token.value))
-
-            # Agregar etiqueta de resaltado al token
-            start_pos = f"{start_line}.{start_column}"
-            end_pos = f"{end_line}.{end_column}"
-            tag_name = self.get_tag_name(token.token_type)
-            print("Tipo: " + tag_name)
-            self.text_area.tag_add(tag_name, start_pos, end_pos)
+                self.root.after(demora, self.pintar_visible)
+
+    def pintar_visible(self):
+        # Resalta las líneas visibles (más un margen) que todavía no tienen etiquetas
+        self.pintado_pendiente = False
+        primera, ultima = self.lineas_visibles()
+        fin = ultima + MARGEN_RESALTADO
+        if fin - self.resaltador.validas > LOTE_RESALTADO:
+            # Lejos de lo ya analizado: se avanza por lotes sin congelar la ventana
+            self.resaltador.asegurar(self.resaltador.validas + LOTE_RESALTADO)
+            self.programar_pintado(1)
+            return
+        tramos, rangos = self.resaltador.rangos_sin_pintar(primera - 1 - MARGEN_RESALTADO, fin)
+        if not tramos:
+            return
+
+        # Una llamada a Tk por etiqueta con todos los rangos
+        limpiar = []
+        for linea_inicio, linea_fin in tramos:
+            limpiar.append(f"{linea_inicio + 1}.0")
+            limpiar.append(f"{linea_fin + 1}.0")
+        for tag_name in ETIQUETAS:
+            self.text_area.tag_remove(tag_name, *limpiar)
+        etiquetas = {}
+        for token_type, indices in rangos.items():
+            etiquetas.setdefault(self.get_tag_name(token_type), []).extend(indices)
+        for tag_name, indices in etiquetas.items():
+            self.text_area.tag_add(tag_name, *indices)
 
     def mostrar_tokens(self, tokens):
         self.result_area.delete("1.0", tk.END)
@@ -522,25 +579,8 @@ class EditorCompilador:
         }
         return tag_names.get(token_type, "DEFAULT")
     
-    def numerar_lineas(self):
-        # Obtener el contenido del área de texto
-        contenido = self.text_area.get("1.0", tk.END)
-
-        # Dividir el contenido en líneas
-        lineas = contenido.split("\n")
-        
-        aux = len(lineas)
-        # Crear la numeración y actualizar el área de numeración
-        numeracion_numeros = '\n'.join(str(i+1) for i in range(aux-1))
-        self.num_area.config(state="normal")
-        self.num_area.delete(1.0, "end")
-        self.num_area.insert("end", numeracion_numeros)
-        self.num_area.config(state="disabled")
-
-        # Configurar el área de números para desplazarse junto con el área de texto
-        self.num_area.yview_moveto(self.text_area.yview()[0])
-     
     def get_cursor_position(self):
+        self.cursor_pendiente = False
         # Obtener la posición actual del cursor en el área de texto
         index = self.text_area.index(tk.INSERT)
         
@@ -548,14 +588,7 @@ class EditorCompilador:
         row, col = index.split('.')
         
         # Actualizar la etiqueta con la posición del cursor
-        if int(col) > 3:
-            self.cursor_position_label.config(text=f'Cursor: Fila: {row}, Columna: {col}')
-        else:
-            self.cursor_position_label.config(text=f'Cursor: Fila: {row}, Columna: {col}')
-    
-        # Llamar a esta función cada cierto tiempo para actualizar la posición
-        self.root.after(100, self.get_cursor_position)
-        self.root.after(100, self.numerar_lineas)
+        self.cursor_position_label.config(text=f'Cursor: Fila: {row}, Columna: {col}')
 
 
 # Iniciar la aplicación
@@ -0,0 +1,219 @@
+import multiprocessing
+import time
+from cache_compilacion import DIR_CACHE, cache_en, empaquetar, desempaquetar
+from lexico import Lexer
+from maquina import traducir_bytecode, MaquinaVirtual
+from servidor_compilacion import iniciar_trabajador
+from token_buffer import TokenBuffer
+
+# Análisis en segundo plano para el editor. Las compilaciones se hacen en un
+# proceso aparte (el análisis no compite con Tk por el GIL y sintactic, que
+# guarda estado global, nunca se usa desde dos hilos). El proceso se arranca
+# con 'spawn': un fork del proceso de Tk copiaría su estado de Tk y de X. El
+# planificador:
+#   - espera DEMORA_MS sin cambios antes de analizar lo que se escribe,
+#   - tiene como mucho un trabajo en curso y uno pendiente por nombre,
+#   - lee el texto del editor justo al enviar cada trabajo,
+#   - descarta el resultado de un trabajo en vivo (los diagnósticos al
+#     escribir) si el texto cambió mientras se hacía y lo vuelve a pedir con
+#     el texto nuevo; si ya lleva más de OBSOLETO_MS, termina el proceso y
+#     arranca otro en lugar de esperarlo,
+#   - entrega los resultados en el hilo de Tk, revisando con root.after.
+# Las acciones pedidas una vez (ejecutar, ver los tokens...) terminan aunque
+# el texto cambie y muestran el resultado del texto con que se pidieron.
+
+DEMORA_MS = 300     # Pausa al escribir antes de analizar
+INTERVALO_MS = 15   # Cada cuánto se revisa si terminó el trabajo en curso
+OBSOLETO_MS = 500   # Espera máxima por un trabajo en vivo de un texto viejo
+
+
+def compilar_en_fondo(text, phases, directorio_cache=DIR_CACHE):
+    # Se ejecuta en el proceso de análisis. Los LexToken no se pueden enviar
+    # entre procesos: el resultado viaja como en la caché de compilación.
+    # Solo se quitan los espacios del final (Tk agrega un salto de línea): así
+    # las líneas y posiciones del resultado son las del editor.
+    return empaquetar(cache_en(directorio_cache).compilar(text.rstrip(), phases))
+
+
+def tokens_en_fondo(text):
+    # Tokens y errores del lexer del editor (lexico.Lexer), como TokenBuffer
+    tokens = TokenBuffer()
+    errores = TokenBuffer()
+    for token in Lexer(text):
+        if token.token_type == 'ERROR':
+            errores.agregar_token(token)
+        else:
+            tokens.agregar_token(token)
+    return tokens, errores
+
+
+def ejecutar_en_fondo(text, entrada, directorio_cache=DIR_CACHE):
+    # Compila todas las fases y ejecuta el código optimizado en la máquina
+    # virtual; la ejecución es None si el programa tiene errores
+    resultado = cache_en(directorio_cache).compilar(text.rstrip())
+    ejecucion = None
+    if resultado.optimizado is not None:
+        bytecode = traducir_bytecode(resultado.optimizado, resultado.tabla_simbolos)
+        ejecucion = MaquinaVirtual(bytecode).ejecutar(entrada)
+    return empaquetar(resultado), ejecucion
+
+
+def resultado_compilacion(text, datos):
+    # Reconstruye en el proceso de Tk lo que devolvió compilar_en_fondo
+    return desempaquetar(datos, text.rstrip())
+
+
+class ProcesoTerminado(Exception):
+    pass
+
+
+def bucle_trabajador(conexion):
+    # Proceso de análisis: ejecuta (función, argumentos) y devuelve
+    # (True, resultado) o (False, excepción) hasta que se cierra la conexión
+    iniciar_trabajador()
+    while True:
+        try:
+            funcion, argumentos = conexion.recv()
+        except EOFError:
+            return
+        try:
+            respuesta = (True, funcion(*argumentos))
+        except Exception as e:
+            respuesta = (False, e)
+        try:
+            conexion.send(respuesta)
+        except Exception as e:
+            # El resultado o la excepción no se pudo enviar entre procesos
+            conexion.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class ProcesoAnalisis:
+    # Un proceso de análisis con una conexión para enviarle trabajos de a uno
+    def __init__(self):
+        contexto = multiprocessing.get_context('spawn')
+        self.conexion, extremo = contexto.Pipe()
+        self.proceso = contexto.Process(target=bucle_trabajador, args=(extremo,), daemon=True)
+        self.proceso.start()
+        extremo.close()
+
+    def enviar(self, funcion, argumentos):
+        self.conexion.send((funcion, argumentos))
+
+    def terminado(self):
+        # True cuando hay respuesta o el proceso murió
+        return self.conexion.poll()
+
+    def resultado(self):
+        try:
+            exito, valor = self.conexion.recv()
+        except (EOFError, OSError):
+            raise ProcesoTerminado("El proceso de análisis terminó inesperadamente")
+        if not exito:
+            raise valor
+        return valor
+
+    def terminar(self):
+        self.proceso.terminate()
+        self.proceso.join(1)
+        self.conexion.close()
+
+
+class Trabajo:
+    def __init__(self, nombre, funcion, argumentos, al_terminar, en_vivo=False):
+        self.nombre = nombre
+        self.funcion = funcion          # funcion(text, *argumentos), en el proceso de análisis
+        self.argumentos = argumentos
+        self.al_terminar = al_terminar  # al_terminar(text, resultado), en el hilo de Tk
+        self.en_vivo = en_vivo          # Sigue al texto: si cambia, se vuelve a pedir
+
+
+class PlanificadorAnalisis:
+    def __init__(self, root, leer_texto, al_fallar=None, demora=DEMORA_MS):
+        self.root = root
+        self.leer_texto = leer_texto
+        self.al_fallar = al_fallar      # al_fallar(nombre, excepción); por defecto se ignora
+        self.demora = demora
+        self.revision = 0               # Aumenta con cada cambio del texto
+        self.pendientes = {}            # nombre -> Trabajo, en orden de pedido
+        self.en_curso = None            # (Trabajo, revisión, texto, inicio)
+        self.temporizador = None        # after de la demora
+        self.revisando = None           # after que revisa el trabajo en curso
+        self.proceso = None             # ProcesoAnalisis; se arranca con el primer trabajo
+
+    def cambio(self):
+        # El texto cambió: lo que esté en curso ya no sirve
+        self.revision += 1
+
+    def solicitar(self, nombre, funcion, argumentos, al_terminar, demora=0, en_vivo=False):
+        # Un pedido con el mismo nombre reemplaza al pendiente. Con demora,
+        # cada pedido nuevo vuelve a esperar (los pedidos al escribir se juntan).
+        self.pendientes.pop(nombre, None)
+        self.pendientes[nombre] = Trabajo(nombre, funcion, argumentos, al_terminar, en_vivo)
+        if self.temporizador is not None:
+            self.root.after_cancel(self.temporizador)
+            self.temporizador = None
+        if demora:
+            self.temporizador = self.root.after(demora, self.despachar)
+        else:
+            self.despachar()
+
+    def despachar(self):
+        self.temporizador = None
+        if self.en_curso is not None or not self.pendientes:
+            return
+        nombre = next(iter(self.pendientes))
+        trabajo = self.pendientes.pop(nombre)
+        if self.proceso is None:
+            self.proceso = ProcesoAnalisis()
+        text = self.leer_texto()
+        self.proceso.enviar(trabajo.funcion, (text,) + tuple(trabajo.argumentos))
+        self.en_curso = (trabajo, self.revision, text, time.perf_counter())
+        self.revisando = self.root.after(INTERVALO_MS, self.revisar)
+
+    def revisar(self):
+        self.revisando = None
+        trabajo, revision, text, inicio = self.en_curso
+        obsoleto = trabajo.en_vivo and revision != self.revision
+        if not self.proceso.terminado():
+            if obsoleto and (time.perf_counter() - inicio) * 1000 > OBSOLETO_MS:
+                # Nadie va a usar el resultado: se termina el proceso
+                self.terminar_proceso()
+                self.en_curso = None
+                self.pendientes.setdefault(trabajo.nombre, trabajo)
+            else:
+                self.revisando = self.root.after(INTERVALO_MS, self.revisar)
+                return
+        else:
+            self.en_curso = None
+            try:
+                resultado = self.proceso.resultado()
+            except Exception as e:
+                if isinstance(e, ProcesoTerminado):
+                    # El próximo trabajo arranca otro proceso
+                    self.terminar_proceso()
+                if obsoleto:
+                    self.pendientes.setdefault(trabajo.nombre, trabajo)
+                elif self.al_fallar is not None:
+                    self.al_fallar(trabajo.nombre, e)
+            else:
+                if obsoleto:
+                    # Resultado de un texto viejo: se pide otra vez, salvo que ya haya uno nuevo
+                    self.pendientes.setdefault(trabajo.nombre, trabajo)
+                else:
+                    trabajo.al_terminar(text, resultado)
+        if self.temporizador is None:
+            self.despachar()
+
+    def terminar_proceso(self):
+        self.proceso.terminar()
+        self.proceso = None
+
+    def cerrar(self):
+        for pendiente in (self.temporizador, self.revisando):
+            if pendiente is not None:
+                self.root.after_cancel(pendiente)
+        self.temporizador = self.revisando = None
+        self.pendientes.clear()
+        self.en_curso = None
+        if self.proceso is not None:
+            self.terminar_proceso()
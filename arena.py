@@ -0,0 +1,573 @@
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+# Representación compacta del árbol sintáctico. En lugar de un diccionario
+# {'label', 'children'} y una lista por nodo, el árbol vive en arreglos
+# paralelos indexados por número de nodo:
+#
+#   tipos         clase de nodo (NODO, LISTA, TEXTO, NULO)
+#   etiquetas     índice en la tabla de etiquetas internadas
+#   primer_hijo   primer hijo o -1
+#   siguiente     siguiente hermano o -1
+#   ultimo_hijo   último hijo o -1 (para agregar hijos en O(1))
+#   inicio, fin   posiciones en el texto fuente o -1 si no se conocen
+#
+# Cada clase corresponde a un valor de la forma de diccionarios de siempre:
+NODO = 0   # {'label': etiqueta, 'children': [hijos...]}
+LISTA = 1  # [hijos...]  (listaDeclaracion, listaSentencias)
+TEXTO = 2  # cadena suelta como hijo: 'x' en '=', '1' en x++
+NULO = 3   # None: lista vacía [None] o sentExpresion sin expresión
+
+
+# Formato binario del árbol (arbol.txt con sintactic.py --binario):
+#   cabecera   MAGIA, versión, orden de bytes, n_nodos, n_etiquetas, raíz, bytes de etiquetas
+#   columnas   tipos (1 byte por nodo), etiquetas, primer_hijo, siguiente,
+#              inicio y fin (4 bytes por nodo), cada una alineada a 4 bytes
+#   offsets    n_etiquetas + 1 enteros de 4 bytes con el inicio de cada etiqueta
+#   etiquetas  clase de la etiqueta (1 byte, ver CLASE_*) seguida de su texto en UTF-8
+# Las columnas se guardan en el orden de bytes de la máquina que escribe para
+# poder leerlas sin copia; si la que lee usa otro orden, se copian y se invierten.
+MAGIA = b'ASTB'
+VERSION = 1
+CABECERA = struct.Struct('<4sHBxIIiI')
+ORDEN_BYTES = {'little': 0, 'big': 1}
+
+CLASE_TEXTO = 0
+CLASE_ENTERO = 1
+CLASE_REAL = 2
+CLASE_NULO = 3
+
+
+def es_arbol_binario(file_path):
+    # True si el archivo empieza con la cabecera del formato binario del árbol
+    with open(file_path, 'rb') as file:
+        return file.read(len(MAGIA)) == MAGIA
+
+
+def codificar_etiqueta(etiqueta):
+    if etiqueta is None:
+        return bytes([CLASE_NULO])
+    if isinstance(etiqueta, bool) or not isinstance(etiqueta, (int, float)):
+        return bytes([CLASE_TEXTO]) + str(etiqueta).encode('utf-8')
+    if isinstance(etiqueta, int):
+        return bytes([CLASE_ENTERO]) + str(etiqueta).encode('utf-8')
+    return bytes([CLASE_REAL]) + repr(etiqueta).encode('utf-8')
+
+
+def texto_arbol(ast):
+    # Forma de texto de arbol.txt: JSON con sangría y None en lugar de null
+    if ast is None:
+        return ""
+    return json.dumps(ast, indent=2).replace('null', 'None')
+
+
+class EtiquetasBinarias:
+    # Tabla de etiquetas de un árbol cargado desde disco: cada etiqueta se
+    # decodifica la primera vez que se pide.
+    def __init__(self, offsets, datos):
+        self.offsets = offsets
+        self.datos = datos
+        self.cache = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, indice):
+        try:
+            return self.cache[indice]
+        except KeyError:
+            pass
+        inicio, fin = self.offsets[indice], self.offsets[indice + 1]
+        clase = self.datos[inicio]
+        texto = bytes(self.datos[inicio + 1:fin]).decode('utf-8')
+        if clase == CLASE_NULO:
+            etiqueta = None
+        elif clase == CLASE_ENTERO:
+            etiqueta = int(texto)
+        elif clase == CLASE_REAL:
+            etiqueta = float(texto)
+        else:
+            etiqueta = texto
+        self.cache[indice] = etiqueta
+        return etiqueta
+
+
+def fin_token(token):
+    # Posición siguiente al lexema; t_NUMBER guarda el texto original en lexema
+    if token.type == 'NUMBER':
+        return token.lexpos + len(token.lexema)
+    return token.lexpos + len(token.value)
+
+
+class ConstructorDicts:
+    # Constructor para la forma de diccionarios y listas que consumen
+    # semantic.py y la interfaz. Tiene los mismos métodos que ArenaAST, así las
+    # acciones de la gramática no dependen de la representación.
+    def lista(self):
+        return []
+
+    def lista_de(self, *hijos):
+        return list(hijos)
+
+    def agregar(self, lista, hijo):
+        lista.append(hijo)
+        return lista
+
+    def nodo(self, etiqueta, hijos, token=None):
+        return {'label': etiqueta, 'children': hijos}
+
+    def texto(self, texto, token=None):
+        return texto
+
+    def nulo(self):
+        return None
+
+    def terminar(self, raiz):
+        return raiz
+
+
+class Texto(str):
+    # Cadena suelta del árbol (como 'x' en '=') que recuerda su rango en el fuente
+    pass
+
+
+def texto_con_rango(texto, inicio, fin):
+    texto = Texto(texto)
+    texto.inicio = inicio
+    texto.fin = fin
+    return texto
+
+
+def rango(valor):
+    # (inicio, fin) de un valor de la forma de diccionarios construida con
+    # ConstructorRangos, o None si no tiene posición. Una lista va del primer
+    # al último de sus elementos con posición.
+    if isinstance(valor, dict):
+        return (valor['inicio'], valor['fin']) if valor.get('inicio', -1) >= 0 else None
+    if isinstance(valor, Texto):
+        return valor.inicio, valor.fin
+    if isinstance(valor, list):
+        primero = next((r for r in map(rango, valor) if r is not None), None)
+        if primero is None:
+            return None
+        ultimo = next(r for r in map(rango, reversed(valor)) if r is not None)
+        return primero[0], ultimo[1]
+    return None
+
+
+class ConstructorRangos(ConstructorDicts):
+    # Igual que ConstructorDicts, pero cada nodo lleva además 'inicio' y 'fin'
+    # (posiciones en el texto, -1 si no se conocen) y las cadenas sueltas son
+    # Texto con su rango. Es el mismo rango que guarda ArenaAST.
+    def nodo(self, etiqueta, hijos, token=None):
+        inicio, fin = (token.lexpos, fin_token(token)) if token is not None else (-1, -1)
+        for hijo in hijos:
+            r = rango(hijo)
+            if r is not None:
+                if inicio < 0 or r[0] < inicio:
+                    inicio = r[0]
+                if r[1] > fin:
+                    fin = r[1]
+        return {'label': etiqueta, 'children': hijos, 'inicio': inicio, 'fin': fin}
+
+    def texto(self, texto, token=None):
+        if token is None:
+            return texto
+        return texto_con_rango(texto, token.lexpos, fin_token(token))
+
+
+class NodoArena(dict):
+    # Nodo de un árbol cargado desde disco con la forma de diccionario de
+    # siempre ({'label', 'children', 'inicio', 'fin'}, como ConstructorRangos).
+    # 'children' se convierte la primera vez que se pide y queda guardado:
+    # solo se decodifica la parte del árbol que se recorre, y cada nodo es
+    # siempre el mismo objeto (el análisis semántico anota por id). Lo que
+    # recorre el diccionario entero (in, keys, items, len, ==, json.dumps...)
+    # convierte antes los hijos, así se comporta igual que un dict del AST.
+    __slots__ = ('arena', 'indice')
+
+    def __missing__(self, clave):
+        if clave != 'children':
+            raise KeyError(clave)
+        hijos = self.arena.hijos_perezosos(self.indice)
+        # Mismo orden de claves que ConstructorRangos
+        inicio, fin = dict.pop(self, 'inicio'), dict.pop(self, 'fin')
+        self['children'] = hijos
+        self['inicio'] = inicio
+        self['fin'] = fin
+        return hijos
+
+    def completar(self):
+        if not dict.__contains__(self, 'children'):
+            self.__missing__('children')
+
+    def get(self, clave, defecto=None):
+        if clave == 'children':
+            return self['children']
+        return dict.get(self, clave, defecto)
+
+    def __contains__(self, clave):
+        return clave == 'children' or dict.__contains__(self, clave)
+
+    def __iter__(self):
+        self.completar()
+        return dict.__iter__(self)
+
+    def __len__(self):
+        self.completar()
+        return dict.__len__(self)
+
+    def keys(self):
+        self.completar()
+        return dict.keys(self)
+
+    def values(self):
+        self.completar()
+        return dict.values(self)
+
+    def items(self):
+        self.completar()
+        return dict.items(self)
+
+    def copy(self):
+        self.completar()
+        return dict(dict.items(self))
+
+    def __eq__(self, otro):
+        self.completar()
+        if isinstance(otro, NodoArena):
+            otro.completar()
+        return dict.__eq__(self, otro)
+
+    def __ne__(self, otro):
+        igual = self.__eq__(otro)
+        return igual if igual is NotImplemented else not igual
+
+    def __repr__(self):
+        self.completar()
+        return dict.__repr__(self)
+
+
+class ArenaAST:
+    def __init__(self):
+        self.tipos = array('B')
+        self.etiquetas = array('I')
+        self.primer_hijo = array('i')
+        self.siguiente = array('i')
+        self.ultimo_hijo = array('i')
+        self.inicio = array('i')
+        self.fin = array('i')
+        self.tabla_etiquetas = []
+        self.indice_etiquetas = {}
+        self.raiz = -1
+
+    def __len__(self):
+        return len(self.tipos)
+
+    def id_etiqueta(self, etiqueta):
+        # 1, 1.0 y '1' son etiquetas distintas aunque sean iguales para un dict
+        clave = (etiqueta.__class__, etiqueta)
+        indice = self.indice_etiquetas.get(clave)
+        if indice is None:
+            indice = self.indice_etiquetas[clave] = len(self.tabla_etiquetas)
+            self.tabla_etiquetas.append(etiqueta)
+        return indice
+
+    def nuevo(self, tipo, etiqueta, token):
+        indice = len(self.tipos)
+        self.tipos.append(tipo)
+        self.etiquetas.append(self.id_etiqueta(etiqueta))
+        self.primer_hijo.append(-1)
+        self.siguiente.append(-1)
+        self.ultimo_hijo.append(-1)
+        if token is None:
+            self.inicio.append(-1)
+            self.fin.append(-1)
+        else:
+            self.inicio.append(token.lexpos)
+            self.fin.append(fin_token(token))
+        return indice
+
+    # Métodos del constructor que llaman las acciones de la gramática
+    def lista(self):
+        return self.nuevo(LISTA, None, None)
+
+    def lista_de(self, *hijos):
+        lista = self.nuevo(LISTA, None, None)
+        for hijo in hijos:
+            self.agregar(lista, hijo)
+        return lista
+
+    def agregar(self, lista, hijo):
+        ultimo = self.ultimo_hijo[lista]
+        if ultimo < 0:
+            self.primer_hijo[lista] = hijo
+        else:
+            self.siguiente[ultimo] = hijo
+        self.ultimo_hijo[lista] = hijo
+        self.extender(lista, self.inicio[hijo], self.fin[hijo])
+        return lista
+
+    def nodo(self, etiqueta, hijos, token=None):
+        # La lista de hijos se convierte en el nodo: no se copia nada
+        self.tipos[hijos] = NODO
+        self.etiquetas[hijos] = self.id_etiqueta(etiqueta)
+        if token is not None:
+            self.extender(hijos, token.lexpos, fin_token(token))
+        return hijos
+
+    def texto(self, texto, token=None):
+        return self.nuevo(TEXTO, texto, token)
+
+    def nulo(self):
+        return self.nuevo(NULO, None, None)
+
+    def terminar(self, raiz):
+        self.raiz = raiz
+        return self
+
+    def extender(self, nodo, inicio, fin):
+        # Amplía el rango del nodo para cubrir [inicio, fin)
+        if inicio < 0:
+            return
+        if self.inicio[nodo] < 0 or inicio < self.inicio[nodo]:
+            self.inicio[nodo] = inicio
+        if fin > self.fin[nodo]:
+            self.fin[nodo] = fin
+
+    # Consultas
+    def tipo(self, nodo):
+        return self.tipos[nodo]
+
+    def etiqueta(self, nodo):
+        return self.tabla_etiquetas[self.etiquetas[nodo]]
+
+    def rango(self, nodo):
+        return self.inicio[nodo], self.fin[nodo]
+
+    def hijos(self, nodo):
+        hijo = self.primer_hijo[nodo]
+        siguiente = self.siguiente
+        while hijo >= 0:
+            yield hijo
+            hijo = siguiente[hijo]
+
+    def recorrer(self, nodo=None):
+        # Recorrido en preorden sin recursión
+        if nodo is None:
+            nodo = self.raiz
+        primer_hijo = self.primer_hijo
+        siguiente = self.siguiente
+        pila = [nodo]
+        while pila:
+            nodo = pila.pop()
+            yield nodo
+            hijo = primer_hijo[nodo]
+            if hijo >= 0:
+                hijos = []
+                while hijo >= 0:
+                    hijos.append(hijo)
+                    hijo = siguiente[hijo]
+                pila.extend(reversed(hijos))
+
+    def a_dict(self, nodo=None, rangos=False):
+        # Convierte el árbol (o el subárbol de nodo) a la forma de diccionarios y
+        # listas; con rangos=True, la misma que construye ConstructorRangos.
+        if nodo is None:
+            nodo = self.raiz
+        tipos = self.tipos
+        etiquetas = self.etiquetas
+        tabla = self.tabla_etiquetas
+        primer_hijo = self.primer_hijo
+        siguiente = self.siguiente
+        inicio = self.inicio
+        fin = self.fin
+
+        def valor(nodo):
+            # Devuelve el valor del nodo y la lista donde van sus hijos
+            tipo = tipos[nodo]
+            if tipo == NODO:
+                hijos = []
+                if rangos:
+                    return {'label': tabla[etiquetas[nodo]], 'children': hijos, 'inicio': inicio[nodo], 'fin': fin[nodo]}, hijos
+                return {'label': tabla[etiquetas[nodo]], 'children': hijos}, hijos
+            if tipo == LISTA:
+                hijos = []
+                return hijos, hijos
+            if tipo == TEXTO:
+                if rangos and inicio[nodo] >= 0:
+                    return texto_con_rango(tabla[etiquetas[nodo]], inicio[nodo], fin[nodo]), None
+                return tabla[etiquetas[nodo]], None
+            return None, None
+
+        resultado, hijos = valor(nodo)
+        pila = [(primer_hijo[nodo], hijos)] if hijos is not None else []
+        while pila:
+            hijo, destino = pila.pop()
+            if hijo < 0:
+                continue
+            pila.append((siguiente[hijo], destino))
+            convertido, hijos = valor(hijo)
+            destino.append(convertido)
+            if hijos is not None:
+                pila.append((primer_hijo[hijo], hijos))
+        return resultado
+
+    def valor_perezoso(self, nodo):
+        # Valor de un nodo para vista(): las listas se convierten con sus
+        # elementos y los nodos quedan como NodoArena sin hijos convertidos
+        tipo = self.tipos[nodo]
+        if tipo == NODO:
+            valor = NodoArena(label=self.etiqueta(nodo), inicio=self.inicio[nodo], fin=self.fin[nodo])
+            valor.arena = self
+            valor.indice = nodo
+            return valor
+        if tipo == LISTA:
+            return self.hijos_perezosos(nodo)
+        if tipo == TEXTO:
+            if self.inicio[nodo] >= 0:
+                return texto_con_rango(self.etiqueta(nodo), self.inicio[nodo], self.fin[nodo])
+            return self.etiqueta(nodo)
+        return None
+
+    def hijos_perezosos(self, nodo):
+        # Lista de hijos de nodo; las listas anidadas se convierten sin recursión
+        resultado = []
+        pila = [(self.primer_hijo[nodo], resultado)]
+        while pila:
+            hijo, destino = pila.pop()
+            if hijo < 0:
+                continue
+            pila.append((self.siguiente[hijo], destino))
+            if self.tipos[hijo] == LISTA:
+                lista = []
+                destino.append(lista)
+                pila.append((self.primer_hijo[hijo], lista))
+            else:
+                destino.append(self.valor_perezoso(hijo))
+        return resultado
+
+    def vista(self, nodo=None):
+        # El árbol (o el subárbol de nodo) con la forma de ConstructorRangos,
+        # pero convertido a medida que se recorre (ver NodoArena)
+        return self.valor_perezoso(self.raiz if nodo is None else nodo)
+
+    def bytes_usados(self):
+        # Memoria de los arreglos de nodos (sin la tabla de etiquetas)
+        return sum(arreglo.itemsize * len(arreglo) for arreglo in (
+            self.tipos, self.etiquetas, self.primer_hijo, self.siguiente,
+            self.ultimo_hijo, self.inicio, self.fin) if arreglo is not None)
+
+    def columnas(self):
+        return (self.tipos, self.etiquetas, self.primer_hijo, self.siguiente, self.inicio, self.fin)
+
+    def guardar(self, output_file):
+        codificadas = [codificar_etiqueta(self.tabla_etiquetas[i]) for i in range(len(self.tabla_etiquetas))]
+        offsets = array('I', [0])
+        for etiqueta in codificadas:
+            offsets.append(offsets[-1] + len(etiqueta))
+
+        with open(output_file, 'wb') as file:
+            file.write(CABECERA.pack(MAGIA, VERSION, ORDEN_BYTES[sys.byteorder], len(self),
+                                     len(codificadas), self.raiz, offsets[-1]))
+            for columna in self.columnas():
+                datos = columna.tobytes() if isinstance(columna, array) else bytes(columna)
+                file.write(datos)
+                file.write(bytes(-len(datos) % 4))
+            file.write(offsets.tobytes())
+            file.write(b''.join(codificadas))
+
+    @classmethod
+    def cargar(cls, file_path):
+        # Mapea el archivo en memoria. Las columnas son vistas del mmap y las
+        # etiquetas se decodifican al pedirlas: cargar no recorre el árbol, y
+        # a_dict(nodo) convierte solo el subárbol que se necesite. El mapa
+        # queda abierto hasta cerrar() (o al salir de un with).
+        with open(file_path, 'rb') as file:
+            mapa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magia, version, orden, n_nodos, n_etiquetas, raiz, tam_etiquetas = CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA or version != VERSION:
+            mapa.close()
+            if magia != MAGIA:
+                raise ValueError(f"'{file_path}' no es un árbol sintáctico binario")
+            raise ValueError(f"Versión de árbol sintáctico no soportada: {version}")
+        mismo_orden = orden == ORDEN_BYTES[sys.byteorder]
+
+        vista = memoryview(mapa)
+        vistas = [vista]  # Se liberan al cerrar, antes que el mapa
+        pos = CABECERA.size
+
+        def columna(formato, cantidad):
+            nonlocal pos
+            tam = array(formato).itemsize * cantidad
+            datos = vista[pos:pos + tam]
+            vistas.append(datos)
+            pos += tam + (-tam % 4)
+            if mismo_orden:
+                datos = datos.cast(formato)
+                vistas.append(datos)
+                return datos
+            copia = array(formato, datos)
+            copia.byteswap()
+            return copia
+
+        arena = cls.__new__(cls)
+        arena.tipos = columna('B', n_nodos)
+        arena.etiquetas = columna('I', n_nodos)
+        arena.primer_hijo = columna('i', n_nodos)
+        arena.siguiente = columna('i', n_nodos)
+        arena.inicio = columna('i', n_nodos)
+        arena.fin = columna('i', n_nodos)
+        arena.ultimo_hijo = None  # Solo hace falta mientras se construye
+        offsets = columna('I', n_etiquetas + 1)
+        vistas.append(vista[pos:pos + tam_etiquetas])
+        arena.tabla_etiquetas = EtiquetasBinarias(offsets, vistas[-1])
+        arena.indice_etiquetas = None
+        arena.raiz = raiz
+        arena.mapa = mapa
+        arena.vistas = vistas
+        return arena
+
+    @classmethod
+    def leer(cls, file_path):
+        # Como cargar, pero copia las columnas y cierra el mapa enseguida: la
+        # arena no depende del archivo y los nodos se siguen convirtiendo al
+        # recorrerlos. Copiar las columnas es mucho más barato que a_dict.
+        with cls.cargar(file_path) as mapeada:
+            arena = cls.__new__(cls)
+            arena.tipos, arena.etiquetas, arena.primer_hijo, arena.siguiente, arena.inicio, arena.fin = (
+                array(columna.format, columna.tobytes()) if isinstance(columna, memoryview) else columna
+                for columna in mapeada.columnas())
+            arena.ultimo_hijo = None
+            etiquetas = mapeada.tabla_etiquetas
+            arena.tabla_etiquetas = EtiquetasBinarias(array('I', etiquetas.offsets), bytes(etiquetas.datos))
+            arena.indice_etiquetas = None
+            arena.raiz = mapeada.raiz
+        return arena
+
+    def cerrar(self):
+        # Libera el mapa de memoria de una arena cargada; sus columnas dejan
+        # de poder usarse
+        mapa = getattr(self, 'mapa', None)
+        if mapa is None:
+            return
+        for vista in reversed(self.vistas):
+            vista.release()
+        mapa.close()
+        self.mapa = None
+        self.vistas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+    def escribir_texto(self, output_file):
+        # Exporta al formato de texto de siempre (sintactic.write_ast_info)
+        with open(output_file, 'w') as file:
+            file.write(texto_arbol(self.a_dict()))
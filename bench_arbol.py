@@ -0,0 +1,104 @@
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+import sintactic
+import semantic
+
+# Compara el árbol de diccionarios y listas con arena.ArenaAST sobre un
+# programa grande (el cuerpo de codigo.txt repetido): memoria retenida,
+# tiempo de construcción, tiempo de un recorrido completo y costo de guardar
+# y volver a cargar arbol.txt en texto y en binario.
+# Uso: python bench_arbol.py [kilobytes] [archivo]
+
+def memoria_y_tiempo(funcion):
+    # Memoria que sigue ocupada al terminar (el resultado), no el pico
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion()
+    segundos = time.perf_counter() - inicio
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return resultado, memoria, segundos
+
+def recorrer_dicts(ast):
+    # Recorrido en preorden con la distinción de tipos que hacen los consumidores actuales
+    total = 0
+    pila = [ast]
+    while pila:
+        nodo = pila.pop()
+        total += 1
+        if isinstance(nodo, dict):
+            pila.extend(reversed(nodo.get('children', [])))
+        elif isinstance(nodo, (list, tuple)):
+            pila.extend(reversed(nodo))
+    return total
+
+def recorrer_arena(arena):
+    total = 0
+    for _ in arena.recorrer():
+        total += 1
+    return total
+
+def a_dict_mapeado(archivo):
+    with sintactic.ArenaAST.cargar(archivo) as arena:
+        return arena.a_dict()
+
+def mejor_tiempo(funcion, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+        if mejor is None or segundos < mejor:
+            mejor = segundos
+    return mejor
+
+if __name__ == "__main__":
+    kilobytes = float(sys.argv[1]) if len(sys.argv) > 1 else 256.0
+    archivo = sys.argv[2] if len(sys.argv) > 2 else 'codigo.txt'
+
+    with open(archivo, 'r') as file:
+        base = file.read()
+    cuerpo = base[base.index('{') + 1:base.rindex('}')]
+    text = 'main {' + cuerpo * max(1, int(kilobytes * 1024 / len(cuerpo))) + '}'
+    tokens = sintactic.tokenize(text)
+
+    with redirect_stdout(io.StringIO()):
+        dicts, memoria_dicts, _ = memoria_y_tiempo(lambda: sintactic.parse(text, motor='descendente')[0])
+        arena, memoria_arena, _ = memoria_y_tiempo(lambda: sintactic.parse(text, motor='descendente', arena=True)[0])
+    if arena.a_dict() != dicts:
+        print("La arena no reproduce el árbol de diccionarios")
+        sys.exit(1)
+
+    construccion = {}
+    with redirect_stdout(io.StringIO()):
+        for arena_activa in (False, True):
+            construccion[arena_activa] = mejor_tiempo(
+                lambda: sintactic.parser_descendente.parse(tokens, sintactic.ArenaAST() if arena_activa else sintactic.ConstructorDicts()))
+    nodos_dicts = recorrer_dicts(dicts)
+    nodos_arena = recorrer_arena(arena)
+
+    print(f"Programa de prueba: {len(text) / 1024:.0f} KB, {len(tokens)} tokens, {len(arena)} nodos en la arena")
+    print(f"{'representación':<16} {'memoria':>10} {'construcción':>13} {'recorrido':>10}")
+    for nombre, memoria, segundos, recorrido in (
+            ('diccionarios', memoria_dicts, construccion[False], mejor_tiempo(lambda: recorrer_dicts(dicts))),
+            ('arena', memoria_arena, construccion[True], mejor_tiempo(lambda: recorrer_arena(arena)))):
+        print(f"{nombre:<16} {memoria / 1024 / 1024:7.2f} MB {segundos:11.3f} s {recorrido:8.3f} s")
+    print(f"Nodos recorridos: {nodos_dicts} (diccionarios), {nodos_arena} (arena)")
+    print(f"Conversión a_dict: {mejor_tiempo(arena.a_dict):.3f} s")
+
+    with tempfile.TemporaryDirectory() as directorio:
+        texto = os.path.join(directorio, 'arbol.txt')
+        binario = os.path.join(directorio, 'arbol.bin')
+        sintactic.write_ast_info(dicts, texto)
+        sintactic.write_ast_info(arena, binario, 'binario')
+        print(f"{'arbol.txt':<16} {'tamaño':>10} {'cargar':>10} {'a dicts':>10}")
+        print(f"{'texto':<16} {os.path.getsize(texto) / 1024:7.0f} KB {'':>10} "
+              f"{mejor_tiempo(lambda: semantic.load_ast_from_file(texto)):8.3f} s")
+        print(f"{'binario':<16} {os.path.getsize(binario) / 1024:7.0f} KB "
+              f"{mejor_tiempo(lambda: semantic.load_ast_from_file(binario)):8.4f} s "
+              f"{mejor_tiempo(lambda: a_dict_mapeado(binario)):8.3f} s")
@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Mide el costo de un "import sintactic" en frío (proceso nuevo) en tres modos:
+#   original      arranque de PLY de siempre (COMPILADOR_DEPURAR=1)
+#   cache_vacia   primera vez con una firma de gramática nueva: genera las tablas
+#   cache_llena   tablas ya en la caché: solo se cargan
+# Uso: python bench_arranque.py [repeticiones]
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# El proceso hijo imprime cuánto tardó solo el import, sin el arranque del intérprete
+CODIGO = "import time; inicio = time.perf_counter(); import sintactic; print(time.perf_counter() - inicio)"
+
+def importar(entorno, cwd):
+    inicio = time.perf_counter()
+    salida = subprocess.run([sys.executable, '-c', CODIGO], cwd=cwd, env=entorno,
+                            capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - inicio, float(salida.split()[-1])
+
+def medir(modo, repeticiones):
+    # Mejor (proceso completo, solo import) de varias repeticiones
+    mejor = None
+    for _ in range(repeticiones):
+        with tempfile.TemporaryDirectory() as temporal:
+            # Copia de los fuentes para que el modo original no toque parsetab.py ni parser.out del repositorio
+            for nombre in ('sintactic.py', 'lexico.py', 'token_buffer.py', 'parser_descendente.py', 'arena.py'):
+                with open(os.path.join(DIRECTORIO, nombre), 'rb') as origen, open(os.path.join(temporal, nombre), 'wb') as destino:
+                    destino.write(origen.read())
+            entorno = dict(os.environ, COMPILADOR_TABLAS=os.path.join(temporal, 'tablas'))
+            entorno.pop('COMPILADOR_DEPURAR', None)
+            if modo == 'original':
+                entorno['COMPILADOR_DEPURAR'] = '1'
+                importar(entorno, temporal)  # Genera parsetab.py como en un checkout ya usado
+            elif modo == 'cache_llena':
+                importar(entorno, temporal)
+            tiempos = importar(entorno, temporal)
+        mejor = tiempos if mejor is None else tuple(map(min, mejor, tiempos))
+    return mejor
+
+if __name__ == "__main__":
+    repeticiones = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'modo':<12} {'proceso':>10} {'import':>10}")
+    base_proceso, base_import = medir('original', repeticiones)
+    print(f"{'original':<12} {base_proceso * 1000:8.1f} ms {base_import * 1000:8.1f} ms")
+    for modo in ('cache_vacia', 'cache_llena'):
+        proceso, importacion = medir(modo, repeticiones)
+        print(f"{modo:<12} {proceso * 1000:8.1f} ms {importacion * 1000:8.1f} ms  ({base_import / importacion:.2f}x en el import)")
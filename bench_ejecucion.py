@@ -0,0 +1,161 @@
+import sys
+import time
+from compilacion import compile_source
+from constantes import Plegador, convertir
+from maquina import traducir_bytecode, MaquinaVirtual
+from semantic import clase_nodo, TIPOS_ENTEROS, TIPOS_REALES
+from traductor_python import compilar_python, CACHE
+
+# Compara tres formas de ejecutar el mismo programa con ciclos numéricos:
+#   arbol     interpretación directa del árbol anotado (recorrido nodo por nodo)
+#   maquina   bytecode de registros (maquina.py) sobre el código optimizado
+#   python    objeto de código de Python (traductor_python.py)
+# Uso: python bench_ejecucion.py [iteraciones]
+
+PROGRAMA = """main {
+    integer i, j, s, x;
+    double a, h;
+    i = 0;
+    s = 0;
+    a = 0.0;
+    while (i < %d) {
+        x = i %% 7;
+        if (x > 3 and x != 5) {
+            s = s + x * 2;
+        } else {
+            s = s - 1;
+        }
+        j = 0;
+        h = 0.0;
+        do {
+            a = a + h / 2.0;
+            j++;
+        } while (j < 3) {
+            h = h + 1.0;
+        }
+        i++;
+    }
+    cout s;
+    cout a;
+}
+"""
+
+
+class InterpreteArbol:
+    # Intérprete de referencia: evalúa el árbol anotado recursivamente, con
+    # la misma semántica de operadores que el plegado de constantes
+    def __init__(self, entrada=''):
+        self.valores = {}
+        self.tipos = {}
+        self.salida = []
+        self.entradas = iter(entrada.split())
+        self.plegador = Plegador()
+
+    def ejecutar(self, nodo):
+        clase = clase_nodo(nodo)
+        if clase == 'lista':
+            for sentencia in nodo:
+                self.ejecutar(sentencia)
+        elif clase == 'main' or clase == 'else':
+            self.ejecutar(nodo['children'])
+        elif clase == 'declaracion':
+            for variable in nodo['children']:
+                self.tipos[variable['label']] = nodo['label']
+                self.valores[variable['label']] = 0.0 if nodo['label'] in TIPOS_REALES else 0
+                if variable['children']:
+                    self.guardar(variable['label'], self.evaluar(variable['children'][1]))
+        elif clase == 'asignacion':
+            if nodo['children'][1] is not None:
+                self.guardar(nodo['children'][0], self.evaluar(nodo['children'][1]))
+        elif clase == 'if':
+            if self.evaluar(nodo['children'][0]):
+                self.ejecutar(nodo['children'][1])
+            elif len(nodo['children']) > 2:
+                self.ejecutar(nodo['children'][2])
+        elif clase == 'while':
+            while self.evaluar(nodo['children'][0]):
+                if len(nodo['children']) > 1:
+                    self.ejecutar(nodo['children'][1])
+        elif clase == 'do':
+            # do { A } while c { B }: A; si c es falsa se sale; B; otra vez
+            bloque, condicion = nodo['children']
+            while True:
+                self.ejecutar(bloque)
+                if not self.evaluar(condicion['children'][0]):
+                    break
+                if len(condicion['children']) > 1:
+                    self.ejecutar(condicion['children'][1])
+        elif clase == 'cin':
+            nombre = nodo['children'][0]
+            texto = next(self.entradas)
+            self.guardar(nombre, float(texto) if self.tipos.get(nombre) in TIPOS_REALES else int(texto))
+        elif clase == 'cout':
+            self.salida.append(self.evaluar(nodo['children'][0]))
+        elif clase != 'nulo':
+            self.evaluar(nodo)
+
+    def guardar(self, nombre, valor):
+        self.valores[nombre] = convertir(valor, self.tipos.get(nombre) in TIPOS_REALES)
+
+    def evaluar(self, nodo):
+        if isinstance(nodo, str):
+            return int(nodo) if nodo.isdigit() else self.valores[nodo]
+        clase = clase_nodo(nodo)
+        if clase == 'literal':
+            return nodo['label']
+        if clase == 'variable':
+            return self.valores[nodo['label']]
+        izquierdo = self.evaluar(nodo['children'][0])
+        label = nodo['label']
+        if label == 'and' and not izquierdo or label == 'or' and izquierdo:
+            return izquierdo
+        derecho = self.evaluar(nodo['children'][1])
+        valor, error = self.plegador.plegar(label, nodo.get('type') in TIPOS_ENTEROS, izquierdo, derecho)
+        if error is not None:
+            raise ZeroDivisionError(error)
+        return valor
+
+
+def mejor_tiempo(funcion, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return resultado, mejor
+
+
+def interpretar(arbol):
+    interprete = InterpreteArbol()
+    interprete.ejecutar(arbol)
+    return ''.join(f'{valor!r}\n' if isinstance(valor, float) else f'{valor}\n' for valor in interprete.salida)
+
+
+if __name__ == "__main__":
+    iteraciones = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    text = PROGRAMA % iteraciones
+    resultado = compile_source(text)
+    if not resultado.exito:
+        sys.exit('\n'.join(resultado.errores()))
+
+    salida_arbol, t_arbol = mejor_tiempo(lambda: interpretar(resultado.arbol_anotado))
+
+    bytecode = traducir_bytecode(resultado.optimizado, resultado.tabla_simbolos)
+    ejecucion, t_maquina = mejor_tiempo(lambda: MaquinaVirtual(bytecode).ejecutar())
+
+    # La primera compilación llena la caché; las siguientes la reutilizan
+    CACHE.clear()
+    inicio = time.perf_counter()
+    programa = compilar_python(text)
+    t_traduccion = time.perf_counter() - inicio
+    _, t_cache = mejor_tiempo(lambda: compilar_python(text))
+    python, t_python = mejor_tiempo(lambda: programa.ejecutar())
+
+    print(f"{iteraciones} iteraciones, {ejecucion.instrucciones} instrucciones de bytecode")
+    print(f"{'backend':<10} {'tiempo':>10} {'vs árbol':>10}")
+    for nombre, segundos in (('arbol', t_arbol), ('maquina', t_maquina), ('python', t_python)):
+        print(f"{nombre:<10} {segundos * 1000:8.1f} ms {t_arbol / segundos:9.1f}x")
+    print(f"traducción a Python {t_traduccion * 1000:.1f} ms, desde la caché {t_cache * 1e6:.1f} µs")
+    if not (salida_arbol == ejecucion.salida == python.salida):
+        print("Las salidas no coinciden:", repr(salida_arbol), repr(ejecucion.salida), repr(python.salida))
@@ -0,0 +1,74 @@
+import io
+import random
+import re
+import sys
+import time
+from contextlib import redirect_stdout
+import sintactic
+from arena import Texto
+from incremental import ParserIncremental
+
+# Mide el análisis incremental (incremental.py) sobre un programa grande,
+# armado repitiendo el cuerpo de codigo.txt: cambia números al azar, como
+# quien escribe en el editor, y compara el tiempo de cada edición con el de
+# volver a analizar todo. Al final verifica que el árbol y los tokens sean
+# los mismos que da un análisis completo del texto editado.
+# Uso: python bench_incremental.py [kilobytes] [ediciones]
+
+NUMERO = re.compile(r'\d+')
+
+def firma(nodo):
+    # Estructura y rangos de un árbol con rangos, para comparar
+    if isinstance(nodo, dict):
+        return (nodo['label'], nodo['inicio'], nodo['fin'], tuple(firma(hijo) for hijo in nodo['children']))
+    if isinstance(nodo, list):
+        return tuple(firma(hijo) for hijo in nodo)
+    if isinstance(nodo, Texto):
+        return (str(nodo), nodo.inicio, nodo.fin)
+    return nodo
+
+def percentil(tiempos, fraccion):
+    return sorted(tiempos)[min(len(tiempos) - 1, int(len(tiempos) * fraccion))]
+
+if __name__ == "__main__":
+    kilobytes = float(sys.argv[1]) if len(sys.argv) > 1 else 256.0
+    ediciones = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    with open('codigo.txt', 'r') as file:
+        base = file.read()
+    cuerpo = base[base.index('{') + 1:base.rindex('}')]
+    grande = 'main {' + cuerpo * max(1, int(kilobytes * 1024 / len(cuerpo))) + '}'
+
+    random.seed(0)
+    parser = ParserIncremental()
+    with redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        parser.analizar(grande)
+        t_completo = time.perf_counter() - inicio
+
+        tiempos = []
+        incrementales = 0
+        for _ in range(ediciones):
+            # El primer número a partir de una posición al azar
+            numero = NUMERO.search(parser.text, random.randrange(len(parser.text))) or NUMERO.search(parser.text)
+            inicio = time.perf_counter()
+            parser.editar(numero.start(), numero.end(), str(random.randint(0, 999)))
+            tiempos.append(time.perf_counter() - inicio)
+            incrementales += parser.modo == 'incremental'
+
+        inicio = time.perf_counter()
+        arbol = parser.arbol()
+        t_normalizar = time.perf_counter() - inicio
+        tokens = [(token.type, token.value, token.lineno, token.lexpos) for token in parser.lista_tokens()]
+
+        referencia, exito = sintactic.parse(parser.text, rangos=True)
+        tokens_referencia = [(token.type, token.value, token.lineno, token.lexpos) for token in sintactic.tokenize(parser.text)]
+
+    print(f"Programa de prueba: {len(grande) / 1024:.0f} KB, {len(parser.tokens)} tokens")
+    print(f"Análisis completo: {t_completo * 1000:.1f} ms")
+    print(f"{ediciones} ediciones ({incrementales} incrementales): mediana {percentil(tiempos, 0.5) * 1000:.2f} ms, "
+          f"p95 {percentil(tiempos, 0.95) * 1000:.2f} ms, máximo {max(tiempos) * 1000:.1f} ms")
+    print(f"Corregir posiciones al pedir el árbol: {t_normalizar * 1000:.1f} ms")
+    if exito != parser.exito or firma(referencia) != firma(arbol) or tokens_referencia != tokens:
+        print("El árbol incremental no coincide con el análisis completo")
+        sys.exit(1)
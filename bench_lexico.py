@@ -0,0 +1,47 @@
+import sys
+import time
+from lexico import Lexer, comparar_motores
+
+# Compara el motor léxico clásico (carácter por carácter) con el motor de
+# expresión regular maestra sobre codigo.txt repetido hasta el tamaño pedido.
+# Uso: python bench_lexico.py [megabytes] [archivo]
+
+def contar_tokens(text, motor, repeticiones=3):
+    # Devuelve el número de tokens y el mejor tiempo de varias pasadas
+    mejor = None
+    for _ in range(repeticiones):
+        lexer = Lexer(text, motor=motor)
+        total = 0
+        inicio = time.perf_counter()
+        while lexer.get_next_token().token_type != 'EOF':
+            total += 1
+        segundos = time.perf_counter() - inicio
+        if mejor is None or segundos < mejor:
+            mejor = segundos
+    return total, mejor
+
+if __name__ == "__main__":
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    archivo = sys.argv[2] if len(sys.argv) > 2 else 'codigo.txt'
+
+    with open(archivo, 'r') as file:
+        base = file.read()
+
+    diferencia = comparar_motores(base)
+    if diferencia is not None:
+        a, b = diferencia
+        print(f"Los motores difieren: clasico={(a.token_type, a.value, a.line, a.column)} "
+              f"regex={(b.token_type, b.value, b.line, b.column)}")
+        sys.exit(1)
+
+    repeticiones = max(1, int(megabytes * 1024 * 1024 / len(base)))
+    text = base * repeticiones
+    print(f"Texto de prueba: {len(text) / (1024 * 1024):.2f} MB")
+
+    resultados = {}
+    for motor in ('clasico', 'regex'):
+        total, segundos = contar_tokens(text, motor)
+        resultados[motor] = segundos
+        print(f"{motor:<8} {total} tokens en {segundos:.3f} s ({total / segundos:,.0f} tokens/s)")
+
+    print(f"Aceleración: {resultados['clasico'] / resultados['regex']:.1f}x")
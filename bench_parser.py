@@ -0,0 +1,64 @@
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+import sintactic
+
+# Compara el parser LALR de PLY con el parser descendente (parser_descendente.py):
+# primero verifica que ambos den el mismo resultado sobre los programas de
+# ejemplo y luego mide su rendimiento sobre un programa grande, armado
+# repitiendo el cuerpo de codigo.txt hasta el tamaño pedido.
+# Uso: python bench_parser.py [kilobytes] [archivo...]
+
+def solo_parser(tokens, motor):
+    if motor == 'descendente':
+        return sintactic.parser_descendente.parse(tokens, sintactic.ConstructorDicts())
+    sintactic.parser.errorok = True
+    return sintactic.parser.parse(lexer=sintactic.ListaTokens(tokens))
+
+def mejor_tiempo(funcion, repeticiones=3):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        segundos = time.perf_counter() - inicio
+        if mejor is None or segundos < mejor:
+            mejor = segundos
+    return mejor
+
+if __name__ == "__main__":
+    kilobytes = float(sys.argv[1]) if len(sys.argv) > 1 else 256.0
+    archivos = sys.argv[2:] or ['codigo.txt', 'documento1.txt']
+
+    textos = []
+    for archivo in archivos:
+        with open(archivo, 'r') as file:
+            textos.append(file.read())
+
+    base = textos[0]
+    cuerpo = base[base.index('{') + 1:base.rindex('}')]
+    repeticiones = max(1, int(kilobytes * 1024 / len(cuerpo)))
+    grande = 'main {' + cuerpo * repeticiones + '}'
+    textos.append(grande)
+
+    with redirect_stdout(io.StringIO()):
+        for archivo, text in zip(archivos + ['(programa grande)'], textos):
+            diferencia = sintactic.comparar_parsers(text)
+            if diferencia is not None:
+                sys.__stdout__.write(f"Los parsers difieren en {archivo}:\n  ply={diferencia[0]}\n  descendente={diferencia[1]}\n")
+                sys.exit(1)
+        tokens = sintactic.tokenize(grande)
+        tiempos = {}
+        for motor in sintactic.MOTORES_PARSER:
+            tiempos[motor] = (
+                mejor_tiempo(lambda: sintactic.parse(grande, motor=motor)),
+                mejor_tiempo(lambda: solo_parser(tokens, motor)),
+            )
+
+    print(f"Programa de prueba: {len(grande) / 1024:.0f} KB, {len(tokens)} tokens")
+    print(f"{'parser':<12} {'léxico+parser':>22} {'solo parser':>22}")
+    for motor, (total, parser) in tiempos.items():
+        print(f"{motor:<12} {total:8.3f} s {len(tokens) / total:9.0f} tok/s {parser:8.3f} s {len(tokens) / parser:9.0f} tok/s")
+    total_ply, parser_ply = tiempos['ply']
+    total_descendente, parser_descendente = tiempos['descendente']
+    print(f"Aceleración: {total_ply / total_descendente:.2f}x con léxico, {parser_ply / parser_descendente:.2f}x solo parser")
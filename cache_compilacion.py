@@ -0,0 +1,183 @@
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+import time
+from ply.lex import LexToken
+import compilacion
+import sintactic
+from compilacion import compile_source, ResultadoCompilacion, FASES
+from posiciones import IndiceLineas
+
+# Caché en disco de compilaciones, direccionada por contenido. La clave es el
+# sha256 del texto, las fases pedidas, la firma de la gramática (la misma que
+# PLY guarda como _lr_signature) y compilacion.VERSION, así que un cambio en
+# la gramática o en el compilador invalida las entradas viejas sin borrarlas.
+# Cada entrada es un pickle en DIR_CACHE/<2 primeros caracteres>/<clave>.
+# Se escribe en un archivo temporal y se mueve con os.replace (otro proceso
+# nunca lee una entrada a medio escribir). Al leer una entrada se actualiza
+# su fecha de modificación; cuando el directorio pasa del tamaño máximo se
+# borran las entradas usadas hace más tiempo (LRU). Los temporales que dejó
+# un proceso que murió a medio escribir cuentan en el tamaño y se borran al
+# recortar cuando tienen más de EDAD_TEMPORAL segundos.
+
+DIR_CACHE = os.environ.get('COMPILADOR_CACHE') or os.path.join(os.path.expanduser('~'), '.cache', 'compilador', 'compilaciones')
+TAMANO_MAXIMO = 256 * 1024 * 1024
+# Al recortar se baja hasta esta fracción del máximo, para no recortar en cada escritura
+FRACCION_RECORTE = 0.8
+# Un temporal sin tocar desde hace este tiempo ya no lo está escribiendo nadie
+EDAD_TEMPORAL = 3600
+
+FIRMA_GRAMATICA = sintactic.firma_gramatica()[0]
+
+
+def empaquetar(resultado):
+    # Los LexToken de PLY guardan referencias al lexer: se guardan como tuplas
+    datos = dict(vars(resultado))
+    datos['tokens'] = [(token.type, token.value, token.lineno, token.lexpos) for token in resultado.tokens]
+    datos['lineas'] = None
+    return datos
+
+
+def desempaquetar(datos, text):
+    resultado = ResultadoCompilacion()
+    vars(resultado).update(datos)
+    tokens = []
+    for tipo, valor, lineno, lexpos in datos['tokens']:
+        token = LexToken()
+        token.type, token.value, token.lineno, token.lexpos = tipo, valor, lineno, lexpos
+        tokens.append(token)
+    resultado.tokens = tokens
+    resultado.lineas = IndiceLineas(text)
+    return resultado
+
+
+class CacheCompilacion:
+    def __init__(self, directorio=DIR_CACHE, tamano_maximo=TAMANO_MAXIMO):
+        self.directorio = directorio
+        self.tamano_maximo = tamano_maximo
+        self.tamano = None  # Bytes en disco; se cuenta al primer guardado
+        self.aciertos = 0
+        self.fallos = 0
+
+    def clave(self, text, phases=FASES):
+        hash_texto = hashlib.sha256()
+        hash_texto.update(f"{compilacion.VERSION}\0{FIRMA_GRAMATICA}\0{','.join(phases)}\0".encode('utf-8'))
+        hash_texto.update(text.encode('utf-8'))
+        return hash_texto.hexdigest()
+
+    def ruta(self, clave):
+        return os.path.join(self.directorio, clave[:2], clave + '.pickle')
+
+    def obtener(self, clave, text):
+        ruta = self.ruta(clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                datos = pickle.load(archivo)
+            resultado = desempaquetar(datos, text)
+            os.utime(ruta)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Entrada dañada o de otra versión del código: un pickle roto
+            # puede fallar con casi cualquier excepción, todas se descartan
+            self.borrar(ruta)
+            return None
+        return resultado
+
+    def guardar(self, clave, resultado):
+        ruta = self.ruta(clave)
+        directorio = os.path.dirname(ruta)
+        os.makedirs(directorio, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as archivo:
+                pickle.dump(empaquetar(resultado), archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+        except BaseException:
+            self.borrar(temporal)
+            raise
+        if self.tamano is None:
+            self.tamano = sum(tamano for _, _, tamano in self.entradas())
+        else:
+            self.tamano += os.path.getsize(ruta)
+        if self.tamano > self.tamano_maximo:
+            self.recortar()
+
+    def compilar(self, text, phases=FASES):
+        # compilacion.compile_source con caché. Si el disco falla se compila igual.
+        clave = self.clave(text, phases)
+        try:
+            resultado = self.obtener(clave, text)
+        except OSError:
+            resultado = None
+        if resultado is not None:
+            self.aciertos += 1
+            return resultado
+        self.fallos += 1
+        resultado = compile_source(text, phases=phases)
+        try:
+            self.guardar(clave, resultado)
+        except OSError as e:
+            print(f"No se pudo usar la caché de compilación en '{self.directorio}': {e}", file=sys.stderr)
+        return resultado
+
+    def entradas(self):
+        # (fecha de último uso, ruta, tamaño) de cada entrada y de cada temporal
+        if not os.path.isdir(self.directorio):
+            return
+        for subdirectorio in os.scandir(self.directorio):
+            if not subdirectorio.is_dir():
+                continue
+            for entrada in os.scandir(subdirectorio.path):
+                if entrada.name.endswith(('.pickle', '.tmp')):
+                    try:
+                        informacion = entrada.stat()
+                    except FileNotFoundError:
+                        continue  # Otro proceso la borró
+                    yield informacion.st_mtime, entrada.path, informacion.st_size
+
+    def recortar(self):
+        # Borra los temporales abandonados y las entradas menos usadas hasta
+        # bajar de FRACCION_RECORTE del máximo. Los temporales recientes
+        # pueden estar escribiéndose y no se tocan.
+        entradas = sorted(self.entradas())
+        self.tamano = sum(tamano for _, _, tamano in entradas)
+        limite = self.tamano_maximo * FRACCION_RECORTE
+        abandonados = time.time() - EDAD_TEMPORAL
+        conservadas = []
+        for fecha, ruta, tamano in entradas:
+            if ruta.endswith('.tmp'):
+                if fecha < abandonados:
+                    self.borrar(ruta)
+                    self.tamano -= tamano
+            else:
+                conservadas.append((ruta, tamano))
+        for ruta, tamano in conservadas:
+            if self.tamano <= limite:
+                break
+            self.borrar(ruta)
+            self.tamano -= tamano
+
+    def limpiar(self):
+        for _, ruta, _ in list(self.entradas()):
+            self.borrar(ruta)
+        self.tamano = 0
+
+    def borrar(self, ruta):
+        try:
+            os.remove(ruta)
+        except OSError:
+            pass
+
+
+# Una caché por directorio en cada proceso (trabajadores del lote y del servidor)
+CACHES = {}
+
+
+def cache_en(directorio):
+    cache = CACHES.get(directorio)
+    if cache is None:
+        cache = CACHES[directorio] = CacheCompilacion(directorio)
+    return cache
@@ -0,0 +1,117 @@
+import sintactic
+import semantic
+from intermedio import generar_intermedio
+from optimizador import optimizar
+from posiciones import IndiceLineas
+
+# Fases disponibles, en el orden en que se ejecutan
+FASES = ('lexico', 'sintactico', 'semantico', 'intermedio', 'optimizacion')
+
+# Versión de lo que produce compile_source: cambiarla invalida la caché de
+# compilaciones (cache_compilacion.py)
+VERSION = 2
+
+
+class ResultadoCompilacion:
+    # Todo lo que produce una compilación, en memoria
+    def __init__(self):
+        self.tokens = []           # LexToken de PLY
+        self.ast = None
+        self.arbol_anotado = None
+        self.tabla_simbolos = None  # semantic.SymbolTable
+        self.intermedio = None     # intermedio.CodigoIntermedio
+        self.optimizado = None     # intermedio.CodigoIntermedio después de optimizador.py
+        self.reporte_optimizacion = []  # (ronda, pasada, instrucciones antes, después)
+        self.lineas = None         # posiciones.IndiceLineas del texto compilado
+        self.diagnosticos = []     # Lista de (fase, mensaje)
+        self.exito = True
+
+    def errores(self, fase=None):
+        return [mensaje for f, mensaje in self.diagnosticos if fase is None or f == fase]
+
+    def texto_tokens(self):
+        # Mismo formato que sintactic.write_token_info (analisisSyntax.txt)
+        return ''.join(f'Tipo: {token.type}, Valor: {token.value}, Linea: {token.lineno}\n' for token in self.tokens)
+
+    def a_dict(self):
+        # Representación serializable a JSON (servidor de compilación, reportes)
+        return {
+            'exito': self.exito,
+            'tokens': [[token.type, token.value, token.lineno, token.lexpos] for token in self.tokens],
+            'ast': self.ast,
+            'arbol_anotado': self.arbol_anotado,
+            'tabla_simbolos': self.tabla_simbolos.a_dict() if self.tabla_simbolos is not None else None,
+            'intermedio': self.texto_intermedio() if self.intermedio is not None else None,
+            'optimizado': self.optimizado.texto() if self.optimizado is not None else None,
+            'optimizacion': [{'ronda': ronda, 'pasada': pasada, 'antes': antes, 'despues': despues}
+                             for ronda, pasada, antes, despues in self.reporte_optimizacion],
+            'diagnosticos': [{'fase': fase, 'mensaje': mensaje} for fase, mensaje in self.diagnosticos],
+        }
+
+    def texto_tabla_simbolos(self):
+        # Mismo formato que tabla_hash.txt
+        if self.tabla_simbolos is None:
+            return ''
+        return semantic.format_symbol_table(self.tabla_simbolos)
+
+    def texto_intermedio(self):
+        # Volcado del código de tres direcciones
+        if self.intermedio is None:
+            return ''
+        return self.intermedio.texto()
+
+
+def compile_source(text, phases=FASES):
+    # Ejecuta las fases pedidas dentro del proceso actual, sin archivos
+    # temporales ni subprocesos. Una fase que falla detiene las siguientes.
+    desconocidas = [fase for fase in phases if fase not in FASES]
+    if desconocidas:
+        raise ValueError(f"Fases desconocidas: {', '.join(desconocidas)}. Opciones: {', '.join(FASES)}")
+
+    resultado = ResultadoCompilacion()
+    resultado.lineas = IndiceLineas(text)
+    # El código intermedio se genera a partir del árbol ya verificado
+    intermedio = 'intermedio' in phases or 'optimizacion' in phases
+    semantico = 'semantico' in phases or intermedio
+
+    sintactico = 'sintactico' in phases or semantico
+    if 'lexico' in phases or sintactico:
+        # El parser usa los mismos tokens: el texto se analiza una sola vez
+        resultado.tokens = sintactic.tokenize(text)
+        resultado.diagnosticos.extend(('lexico', mensaje) for mensaje in sintactic.errores_lexicos)
+        if sintactic.errores_lexicos:
+            resultado.exito = False
+
+    if sintactico:
+        # Con rangos, para que el análisis semántico y el editor ubiquen cada
+        # nodo en el texto (con resultado.lineas)
+        ast, sin_errores = sintactic.parse(text, rangos=True, tokens_leidos=resultado.tokens)
+        resultado.diagnosticos.extend(('sintactico', mensaje) for mensaje in sintactic.errores_sintacticos)
+        resultado.ast = ast
+        if not sin_errores:
+            resultado.exito = False
+    if not resultado.exito:
+        # Los errores léxicos también detienen las fases siguientes
+        return resultado
+
+    if semantico:
+        errores_semanticos = []
+        try:
+            resultado.tabla_simbolos, resultado.arbol_anotado = semantic.run_semantic_analysis(
+                resultado.ast, resultado.lineas, errores_semanticos.append)
+        except Exception as e:
+            errores_semanticos.append(str(e))
+            resultado.exito = False
+        resultado.diagnosticos.extend(('semantico', mensaje) for mensaje in errores_semanticos)
+        if errores_semanticos:
+            resultado.exito = False
+            return resultado
+
+    if intermedio:
+        resultado.intermedio = generar_intermedio(resultado.arbol_anotado)
+
+    if 'optimizacion' in phases:
+        resultado.optimizado, optimizador = optimizar(resultado.intermedio)
+        resultado.reporte_optimizacion = optimizador.reporte
+
+    return resultado
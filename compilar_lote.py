@@ -0,0 +1,147 @@
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from cache_compilacion import DIR_CACHE, cache_en
+from compilacion import FASES
+from servidor_compilacion import iniciar_trabajador
+
+# Compilación por lotes: recorre directorios, patrones glob o archivos
+# sueltos y compila cada programa en un grupo de procesos (uno por núcleo).
+# Cada resultado se imprime en cuanto termina y al final se escribe un
+# reporte JSON con los diagnósticos y el tiempo de cada archivo.
+# Uso: python compilar_lote.py [opciones] ruta_o_patron...
+
+PATRON_POR_DEFECTO = '*.txt'
+FASES_POR_DEFECTO = ('lexico', 'sintactico', 'semantico')
+REPORTE_POR_DEFECTO = 'reporte_lote.json'
+# Archivos por tarea: con decenas de miles de programas pequeños, enviar
+# uno por tarea gasta más en comunicación entre procesos que en compilar
+ARCHIVOS_POR_TAREA = 16
+
+
+def expandir_rutas(rutas, patron=PATRON_POR_DEFECTO):
+    # Lista ordenada y sin repetir de los archivos a compilar
+    archivos = set()
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for directorio, _, nombres in os.walk(ruta):
+                archivos.update(os.path.join(directorio, nombre) for nombre in fnmatch.filter(nombres, patron))
+        elif glob.has_magic(ruta):
+            archivos.update(archivo for archivo in glob.glob(ruta, recursive=True) if os.path.isfile(archivo))
+        else:
+            archivos.add(ruta)
+    return sorted(archivos)
+
+
+def compilar_archivo(ruta, phases, directorio_cache=None):
+    import compilacion
+    inicio = time.perf_counter()
+    desde_cache = False
+    try:
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            text = archivo.read()
+        if directorio_cache is None:
+            resultado = compilacion.compile_source(text, phases=phases)
+        else:
+            cache = cache_en(directorio_cache)
+            aciertos = cache.aciertos
+            resultado = cache.compilar(text, phases)
+            desde_cache = cache.aciertos > aciertos
+    except Exception as e:
+        # Archivo ilegible o fallo interno: no detiene el lote
+        return {'archivo': ruta, 'exito': False, 'segundos': time.perf_counter() - inicio,
+                'desde_cache': False, 'diagnosticos': [], 'error': f'{type(e).__name__}: {e}'}
+    return {'archivo': ruta, 'exito': resultado.exito, 'segundos': time.perf_counter() - inicio,
+            'desde_cache': desde_cache,
+            'diagnosticos': [{'fase': fase, 'mensaje': mensaje} for fase, mensaje in resultado.diagnosticos]}
+
+
+def compilar_grupo(rutas, phases, directorio_cache=None):
+    return [compilar_archivo(ruta, phases, directorio_cache) for ruta in rutas]
+
+
+def compilar_lote(archivos, phases=FASES_POR_DEFECTO, trabajadores=None, al_terminar=None, directorio_cache=None):
+    # Compila los archivos en paralelo y devuelve los resultados en el orden
+    # de archivos. al_terminar(resultado) se llama en cuanto termina cada uno.
+    # Con directorio_cache, los archivos sin cambios se leen de la caché.
+    trabajadores = trabajadores or os.cpu_count() or 1
+    grupos = [archivos[i:i + ARCHIVOS_POR_TAREA] for i in range(0, len(archivos), ARCHIVOS_POR_TAREA)]
+    resultados = {}
+    with ProcessPoolExecutor(max_workers=trabajadores, initializer=iniciar_trabajador) as pool:
+        # Pocas tareas en vuelo a la vez: la memoria no crece con el tamaño del lote
+        pendientes = set()
+        siguiente = 0
+        while siguiente < len(grupos) or pendientes:
+            while siguiente < len(grupos) and len(pendientes) < 2 * trabajadores:
+                pendientes.add(pool.submit(compilar_grupo, grupos[siguiente], phases, directorio_cache))
+                siguiente += 1
+            terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+            for futuro in terminados:
+                for resultado in futuro.result():
+                    resultados[resultado['archivo']] = resultado
+                    if al_terminar is not None:
+                        al_terminar(resultado)
+    return [resultados[archivo] for archivo in archivos]
+
+
+def reporte_lote(resultados, segundos, trabajadores, phases):
+    return {
+        'archivos': len(resultados),
+        'exitosos': sum(1 for resultado in resultados if resultado['exito']),
+        'con_errores': sum(1 for resultado in resultados if not resultado['exito'] and 'error' not in resultado),
+        'fallidos': sum(1 for resultado in resultados if 'error' in resultado),
+        'desde_cache': sum(1 for resultado in resultados if resultado['desde_cache']),
+        'fases': list(phases),
+        'trabajadores': trabajadores,
+        'segundos_total': segundos,
+        'segundos_compilando': sum(resultado['segundos'] for resultado in resultados),
+        'resultados': resultados,
+    }
+
+
+def imprimir_resultado(resultado):
+    if 'error' in resultado:
+        estado = f"FALLO {resultado['error']}"
+    elif resultado['exito']:
+        estado = 'OK'
+    else:
+        estado = f"{len(resultado['diagnosticos'])} errores"
+    if resultado['desde_cache']:
+        estado += ' [caché]'
+    print(f"{resultado['archivo']}: {estado} ({resultado['segundos'] * 1000:.1f} ms)", flush=True)
+
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Compila en paralelo directorios, patrones o archivos de programas")
+    argumentos.add_argument('rutas', nargs='+', help="Directorios, patrones glob (entre comillas) o archivos")
+    argumentos.add_argument('--patron', default=PATRON_POR_DEFECTO, help="Archivos que se buscan dentro de los directorios")
+    argumentos.add_argument('--fases', nargs='+', default=list(FASES_POR_DEFECTO), choices=FASES, help="Fases a ejecutar")
+    argumentos.add_argument('--workers', type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+    argumentos.add_argument('--reporte', default=REPORTE_POR_DEFECTO, help="Archivo JSON del reporte")
+    argumentos.add_argument('--cache', default=DIR_CACHE, help="Directorio de la caché de compilación")
+    argumentos.add_argument('--sin-cache', action='store_true', help="Compilar todo sin leer ni escribir la caché")
+    argumentos.add_argument('--silencioso', action='store_true', help="No imprimir cada archivo al terminar")
+    opciones = argumentos.parse_args()
+
+    archivos = expandir_rutas(opciones.rutas, opciones.patron)
+    if not archivos:
+        sys.exit("No se encontraron archivos para compilar")
+    trabajadores = opciones.workers or os.cpu_count() or 1
+    fases = tuple(opciones.fases)
+
+    inicio = time.perf_counter()
+    resultados = compilar_lote(archivos, fases, trabajadores, None if opciones.silencioso else imprimir_resultado,
+                               None if opciones.sin_cache else opciones.cache)
+    reporte = reporte_lote(resultados, time.perf_counter() - inicio, trabajadores, fases)
+
+    with open(opciones.reporte, 'w', encoding='utf-8') as archivo:
+        json.dump(reporte, archivo, indent=2, ensure_ascii=False)
+    print(f"{reporte['archivos']} archivos: {reporte['exitosos']} sin errores, {reporte['con_errores']} con errores, "
+          f"{reporte['fallidos']} fallidos ({reporte['desde_cache']} desde la caché) en {reporte['segundos_total']:.2f} s. "
+          f"Reporte en {opciones.reporte}")
+    sys.exit(0 if reporte['exitosos'] == reporte['archivos'] else 1)
@@ -0,0 +1,122 @@
+import math
+import operator
+
+# Evaluación de expresiones constantes para el análisis semántico. Cada
+# operador tiene una función para operandos enteros y otra para reales, con la
+# semántica del lenguaje (no la de Python):
+#   /  entre enteros es división entera truncada hacia cero
+#   %  toma el signo del dividendo, como en C
+#   ^  es potencia (no el xor de Python)
+# La división entre cero no lanza excepción: plegar devuelve el error para
+# que el análisis lo reporte como diagnóstico.
+
+DIVISION_POR_CERO = 'división entre cero'
+
+# Potencias enteras más grandes se dejan para la ejecución
+LIMITE_BITS = 64
+# Rango de los enteros en la ejecución (int64). Un resultado entero fuera de
+# él no se pliega: la ejecución reporta el desbordamiento.
+MINIMO_ENTERO = -2 ** 63
+MAXIMO_ENTERO = 2 ** 63 - 1
+
+
+def division_entera(a, b):
+    cociente = abs(a) // abs(b)
+    return cociente if (a < 0) == (b < 0) else -cociente
+
+
+def resto_entero(a, b):
+    return a - b * division_entera(a, b)
+
+
+def potencia_entera(base, exponente):
+    if exponente < 0:
+        # 1/base^n truncado: solo 1 y -1 dan algo distinto de cero
+        if base == 1:
+            return 1
+        if base == -1:
+            return -1 if exponente % 2 else 1
+        return 0
+    if abs(base) > 1 and (abs(base).bit_length() - 1) * exponente > LIMITE_BITS:
+        return None
+    return base ** exponente
+
+
+def potencia_real(base, exponente):
+    try:
+        resultado = math.pow(base, exponente)
+    except (OverflowError, ValueError):
+        # Desbordamiento o base negativa con exponente fraccionario
+        return None
+    return resultado
+
+
+def clave_valor(valor):
+    # Clave de un valor constante en un diccionario: type() distingue 1, 1.0
+    # y True, y repr distingue 0.0 de -0.0, que son iguales como claves
+    return (type(valor), repr(valor) if type(valor) is float else valor)
+
+
+def y_logico(a, b):
+    return a and b
+
+
+def o_logico(a, b):
+    return a or b
+
+
+COMPARACIONES = {
+    '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+    'and': y_logico, 'or': o_logico,
+}
+
+OPERACIONES_ENTERAS = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul,
+    '/': division_entera, '%': resto_entero, '^': potencia_entera,
+}
+OPERACIONES_ENTERAS.update(COMPARACIONES)
+
+OPERACIONES_REALES = {
+    '+': operator.add, '-': operator.sub, '*': operator.mul,
+    '/': operator.truediv, '%': math.fmod, '^': potencia_real,
+}
+OPERACIONES_REALES.update(COMPARACIONES)
+
+
+def convertir(valor, real):
+    # Valor guardado en una variable: los enteros se promueven en variables reales
+    if real and isinstance(valor, int) and not isinstance(valor, bool):
+        return float(valor)
+    return valor
+
+
+class Plegador:
+    # Plegado de constantes con memoria: las subexpresiones que se repiten
+    # con los mismos operandos se calculan una sola vez
+    def __init__(self):
+        self.memo = {}
+
+    def plegar(self, op, entero, izquierdo, derecho):
+        # Devuelve (valor, error). valor es None si algún operando no es
+        # constante o el resultado no se puede calcular en compilación.
+        if izquierdo is None or derecho is None:
+            return None, None
+        if entero and not (type(izquierdo) is int and type(derecho) is int):
+            # Operandos de otro tipo (un valor ya reportado como incompatible):
+            # no se pliega
+            return None, None
+        if (op == '/' or op == '%') and derecho == 0:
+            return None, DIVISION_POR_CERO
+        clave = (op, entero, clave_valor(izquierdo), clave_valor(derecho))
+        valor = self.memo.get(clave)
+        if valor is None and clave not in self.memo:
+            operaciones = OPERACIONES_ENTERAS if entero else OPERACIONES_REALES
+            try:
+                valor = operaciones[op](izquierdo, derecho)
+            except (OverflowError, TypeError):
+                valor = None
+            if type(valor) is int and not MINIMO_ENTERO <= valor <= MAXIMO_ENTERO:
+                valor = None
+            self.memo[clave] = valor
+        return valor, None
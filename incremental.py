@@ -0,0 +1,314 @@
+from bisect import bisect_left, bisect_right
+import sintactic
+from arena import ConstructorRangos, Texto, rango
+from parser_descendente import ErrorSintactico
+
+# Análisis sintáctico incremental para el editor. Guarda el texto, los
+# tokens y el árbol (forma de diccionarios con rangos, como
+# sintactic.parse(..., rangos=True)) del último análisis. Ante una edición
+# vuelve a analizar solo la sentencia (o declaración de variables) más
+# pequeña que la contiene, con parser_descendente, y la reemplaza dentro de
+# la misma lista del árbol: las demás sentencias, listas y bloques siguen
+# siendo los mismos objetos.
+#
+# Las posiciones de los tokens y nodos posteriores a una edición no se
+# corrigen en el momento: cada edición queda en self.pendientes y cada token
+# o sentencia nueva recuerda después de cuántas ediciones se creó (su época).
+# La posición actual de algo se obtiene aplicando solo las ediciones
+# posteriores a su época. arbol() y lista_tokens() corrigen todo de una vez;
+# editar() solo toca el camino hasta la sentencia editada.
+#
+# Si la edición cruza varias sentencias, el fragmento no se puede analizar
+# por separado (por ejemplo, un if nuevo que absorbería el else siguiente) o
+# el análisis anterior tenía errores, se analiza todo el texto como siempre.
+
+# Con más ediciones pendientes se corrigen las posiciones de todo
+MAX_PENDIENTES = 64
+
+# Caracteres que pueden rodear un fragmento sin que sus tokens se peguen a los vecinos
+SEPARADORES_INICIO = ' \t\n;{}'
+SEPARADORES_FIN = ' \t\n;}'
+
+
+def fin_de(elemento):
+    r = rango(elemento)
+    return r[1] if r is not None else -1
+
+
+class Candidato:
+    # Sentencia lista[indice] que ocupa los tokens [primero, siguiente)
+    def __init__(self, lista, indice, primero, siguiente, declaraciones, ruta, nivel_superior):
+        self.lista = lista
+        self.indice = indice
+        self.primero = primero
+        self.siguiente = siguiente
+        self.declaraciones = declaraciones
+        self.ruta = ruta  # Nodos que contienen a la lista, desde main
+        self.nivel_superior = nivel_superior  # lista es hija directa de main
+
+
+class ParserIncremental:
+    def __init__(self):
+        self.text = ''
+        self.tokens = []     # Con posiciones de su época: usar lista_tokens()
+        self.raiz = None     # Con posiciones de su época: usar arbol()
+        self.exito = False
+        self.incremental_posible = False
+        self.pendientes = []  # (límite, desplazamiento, líneas) de cada edición sin aplicar
+        self.epocas = {}      # id(sentencia nueva) -> (sentencia, época)
+        self.sucios = []      # (profundidad, nodo) cuyo fin se recalcula al corregir las posiciones
+        self.modo = None      # 'completo' o 'incremental': cómo se hizo el último análisis
+
+    def analizar(self, text):
+        # Análisis completo, como sintactic.parse
+        self.text = text
+        self.tokens = sintactic.tokenize(text)
+        sin_errores_lexicos = not sintactic.errores_lexicos
+        self.raiz, self.exito = sintactic.parse(text, rangos=True)
+        # Con errores léxicos los tokens saltan caracteres: no se edita sobre ellos
+        self.incremental_posible = self.exito and sin_errores_lexicos and self.raiz is not None
+        self.pendientes = []
+        self.epocas = {}
+        self.sucios = []
+        self.modo = 'completo'
+        return self.raiz, self.exito
+
+    def editar(self, inicio, fin, texto):
+        # Reemplaza text[inicio:fin] por texto y devuelve si el programa es válido
+        nuevo = self.text[:inicio] + texto + self.text[fin:]
+        if self.incremental_posible:
+            for candidato in self.candidatos(inicio, fin):
+                if self.reemplazar(candidato, inicio, fin, texto, nuevo):
+                    self.modo = 'incremental'
+                    if len(self.pendientes) > MAX_PENDIENTES:
+                        self.normalizar()
+                    return self.exito
+        self.analizar(nuevo)
+        return self.exito
+
+    def arbol(self):
+        self.normalizar()
+        return self.raiz
+
+    def lista_tokens(self):
+        self.normalizar()
+        return self.tokens
+
+    # Posiciones
+
+    def actual(self, posicion, epoca):
+        # Posición de hoy de algo creado después de epoca ediciones
+        for limite, desplazamiento, _ in self.pendientes[epoca:]:
+            if posicion >= limite:
+                posicion += desplazamiento
+        return posicion
+
+    def lexpos(self, token):
+        return self.actual(token.lexpos, getattr(token, 'epoca', 0))
+
+    def lineno(self, token):
+        posicion, lineno = token.lexpos, token.lineno
+        for limite, desplazamiento, lineas in self.pendientes[getattr(token, 'epoca', 0):]:
+            if posicion >= limite:
+                posicion += desplazamiento
+                lineno += lineas
+        return lineno
+
+    def epoca_de(self, nodo, heredada):
+        entrada = self.epocas.get(id(nodo))
+        return entrada[1] if entrada is not None else heredada
+
+    def inicio_de(self, elemento, heredada):
+        # Posición actual del primer token de una sentencia, declaración o lista de sentencias
+        if isinstance(elemento, list):
+            elemento = elemento[0] if elemento else None
+        if elemento is None:
+            return -1
+        return self.actual(elemento['inicio'], self.epoca_de(elemento, heredada))
+
+    def tablas(self):
+        # Para cada época, tramos (desde, desplazamiento, líneas) ordenados que
+        # llevan una posición de esa época a la de hoy. Se arman de la última
+        # edición hacia atrás, así cada posición se corrige con una búsqueda
+        # binaria en lugar de recorrer todas las ediciones pendientes.
+        tramos = [(-1, 0, 0)]
+        tablas = [tramos]
+        for limite, desplazamiento, lineas in reversed(self.pendientes):
+            # Desde limite, la posición pasa a limite + desplazamiento en la época siguiente
+            j = bisect_right(tramos, limite + desplazamiento, key=lambda tramo: tramo[0]) - 1
+            tramos = ([tramo for tramo in tramos if tramo[0] < limite]
+                      + [(limite, tramos[j][1] + desplazamiento, tramos[j][2] + lineas)]
+                      + [(desde - desplazamiento, total + desplazamiento, total_lineas + lineas)
+                         for desde, total, total_lineas in tramos[j + 1:]])
+            tablas.append(tramos)
+        tablas.reverse()
+        return [([tramo[0] for tramo in tramos], tramos) for tramos in tablas]
+
+    def normalizar(self):
+        # Aplica las ediciones pendientes a todos los tokens y nodos
+        if not self.pendientes:
+            return
+        tablas = self.tablas()
+
+        def tramo(posicion, epoca):
+            desde, tramos = tablas[epoca]
+            return tramos[bisect_right(desde, posicion) - 1]
+
+        pila = [(self.raiz, 0)]
+        while pila:
+            nodo, epoca = pila.pop()
+            if isinstance(nodo, dict):
+                epoca = self.epoca_de(nodo, epoca)
+                nodo['inicio'] += tramo(nodo['inicio'], epoca)[1]
+                nodo['fin'] += tramo(nodo['fin'], epoca)[1]
+                pila.append((nodo['children'], epoca))
+            elif isinstance(nodo, list):
+                pila.extend((hijo, epoca) for hijo in nodo)
+            elif isinstance(nodo, Texto):
+                nodo.inicio += tramo(nodo.inicio, epoca)[1]
+                nodo.fin += tramo(nodo.fin, epoca)[1]
+        # Los nodos que contenían una sentencia reemplazada pueden terminar en
+        # otra posición; primero los más profundos
+        self.sucios.sort(key=lambda sucio: -sucio[0])
+        for _, nodo in self.sucios:
+            final = max((fin_de(hijo) for hijo in nodo['children']), default=-1)
+            if final >= 0:
+                nodo['fin'] = final
+        for token in self.tokens:
+            _, desplazamiento, lineas = tramo(token.lexpos, getattr(token, 'epoca', 0))
+            token.lexpos += desplazamiento
+            token.lineno += lineas
+            token.epoca = 0
+        self.pendientes = []
+        self.epocas = {}
+        self.sucios = []
+
+    # Búsqueda de la sentencia que contiene la edición
+
+    def indice_token(self, posicion):
+        return bisect_left(self.tokens, posicion, key=self.lexpos)
+
+    def buscar(self, lista, posicion, heredada):
+        # Índice del último elemento de lista que empieza en posicion o antes
+        return bisect_right(lista, posicion, key=lambda elemento: self.inicio_de(elemento, heredada)) - 1
+
+    def contiene(self, primero, siguiente, inicio, fin):
+        return self.lexpos(self.tokens[primero]) <= inicio and fin <= self.lexpos(self.tokens[siguiente])
+
+    def candidatos(self, inicio, fin):
+        # Sentencias que contienen [inicio, fin], de la más interna a la de nivel superior
+        raiz = self.raiz
+        items = raiz['children']
+        j = self.buscar(items, inicio, 0)
+        if j < 0:
+            return []
+        # El último token es la llave que cierra main
+        fin_item = self.indice_token(self.inicio_de(items[j + 1], 0)) if j + 1 < len(items) else len(self.tokens) - 1
+        item = items[j]
+        if isinstance(item, dict):
+            primero = self.indice_token(self.inicio_de(item, 0))
+            if self.contiene(primero, fin_item, inicio, fin):
+                return [Candidato(items, j, primero, fin_item, True, [raiz], True)]
+            return []
+
+        resultado = []
+        lista, fin_lista, epoca, ruta = item, fin_item, 0, [raiz]
+        while True:
+            k = self.buscar(lista, inicio, epoca)
+            if k < 0 or lista[k] is None:
+                break
+            nodo = lista[k]
+            primero = self.indice_token(self.inicio_de(nodo, epoca))
+            siguiente = self.indice_token(self.inicio_de(lista[k + 1], epoca)) if k + 1 < len(lista) else fin_lista
+            if not self.contiene(primero, siguiente, inicio, fin):
+                break
+            resultado.append(Candidato(lista, k, primero, siguiente, False, list(ruta), len(ruta) == 1))
+            epoca = self.epoca_de(nodo, epoca)
+            bloque = self.bloque_con(nodo, siguiente, epoca, inicio, fin)
+            if bloque is None:
+                break
+            lista, fin_lista, contenedores = bloque
+            ruta.extend(contenedores)
+        resultado.reverse()
+        return resultado
+
+    def bloque_con(self, nodo, siguiente, epoca, inicio, fin):
+        # (lista de sentencias, índice de su llave de cierre, nodos que la
+        # contienen) del bloque de nodo donde está la edición, o None
+        label = nodo['label']
+        hijos = nodo['children']
+        bloques = []
+        if label == 'if' and len(hijos) > 1:
+            if len(hijos) > 2:
+                otro = hijos[2]
+                bloques.append((hijos[1], self.indice_token(self.inicio_de(otro, epoca)) - 1, [nodo]))
+                bloques.append((otro['children'], siguiente - 1, [nodo, otro]))
+            else:
+                bloques.append((hijos[1], siguiente - 1, [nodo]))
+        elif label == 'else':
+            bloques.append((hijos, siguiente - 1, [nodo]))
+        elif label == 'while' and len(hijos) > 1:
+            bloques.append((hijos[1], siguiente - 1, [nodo]))
+        elif label == 'do':
+            bloques.append((hijos[0], self.indice_token(self.inicio_de(hijos[1], epoca)) - 1, [nodo]))
+        for lista, cierre, contenedores in bloques:
+            if isinstance(lista, list) and lista and lista[0] is not None:
+                if self.contiene(self.indice_token(self.inicio_de(lista, epoca)), cierre, inicio, fin):
+                    return lista, cierre, contenedores
+        return None
+
+    # Reemplazo
+
+    def reemplazar(self, candidato, inicio, fin, texto, nuevo):
+        tokens = self.tokens
+        comienzo = self.lexpos(tokens[candidato.primero])
+        final_viejo = self.lexpos(tokens[candidato.siguiente])
+        delta = len(texto) - (fin - inicio)
+        final_nuevo = final_viejo + delta
+        if comienzo > 0 and nuevo[comienzo - 1] not in SEPARADORES_INICIO:
+            return False
+        if final_nuevo > comienzo and nuevo[final_nuevo - 1] not in SEPARADORES_FIN:
+            return False
+
+        # Tokens del fragmento, con posiciones del texto completo
+        errores = len(sintactic.errores_lexicos)
+        lexer = sintactic.nuevo_lexer()
+        lexer.lineno = self.lineno(tokens[candidato.primero])
+        lexer.input(nuevo[comienzo:final_nuevo])
+        fragmento = list(lexer)
+        if len(sintactic.errores_lexicos) != errores:
+            del sintactic.errores_lexicos[errores:]
+            return False
+        for token in fragmento:
+            token.lexpos += comienzo
+        if fragmento and fragmento[0].type == 'ELSE' and not candidato.declaraciones:
+            # Un else al inicio se uniría al if anterior
+            return False
+
+        # El token siguiente solo sirve para ver dónde termina el fragmento
+        try:
+            nuevos = sintactic.parser_descendente.parse_fragmento(
+                fragmento + [tokens[candidato.siguiente]], ConstructorRangos(), len(fragmento), candidato.declaraciones)
+        except ErrorSintactico:
+            return False
+        lista = candidato.lista
+        if not nuevos:
+            if candidato.declaraciones or (len(lista) == 1 and candidato.nivel_superior):
+                # Quitar el elemento cambiaría cómo se agrupan las listas de main
+                return False
+            if len(lista) == 1:
+                nuevos = [None]  # Bloque vacío
+
+        lineas = nuevo.count('\n', comienzo, final_nuevo) - self.text.count('\n', comienzo, final_viejo)
+        self.pendientes.append((final_viejo, delta, lineas))
+        epoca = len(self.pendientes)
+        for token in fragmento:
+            token.epoca = epoca
+        for nodo in nuevos:
+            if nodo is not None:
+                self.epocas[id(nodo)] = (nodo, epoca)
+        tokens[candidato.primero:candidato.siguiente] = fragmento
+        lista[candidato.indice:candidato.indice + 1] = nuevos
+        self.sucios.extend(enumerate(candidato.ruta))
+        self.text = nuevo
+        return True
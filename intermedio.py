@@ -0,0 +1,377 @@
+from array import array
+from constantes import clave_valor
+from semantic import clase_nodo, EXPRESIONES, TIPOS_ENTEROS
+
+# Código intermedio de tres direcciones. Cada instrucción es un código de
+# operación y tres operandos (destino, a, b) guardados en arreglos paralelos,
+# como las columnas de arena.ArenaAST:
+#
+#   COPIAR            destino = a
+#   SUMA ... DISTINTO destino = a op b
+#   SALTAR            goto a
+#   SALTAR_SI_FALSO   ifFalse a goto b
+#   SALTAR_SI         if a goto b
+#   ETIQUETA          a:
+#   LEER              cin destino
+#   ESCRIBIR          cout a
+#
+# Un operando es un entero: (índice << 2) | clase, o NINGUNO si la
+# instrucción no usa esa posición.
+
+(COPIAR, SUMA, RESTA, MULT, DIV, DIV_ENTERA, MOD, MOD_ENTERO, POT, POT_ENTERA,
+ MENOR, MENOR_IGUAL, MAYOR, MAYOR_IGUAL, IGUAL, DISTINTO,
+ SALTAR, SALTAR_SI_FALSO, SALTAR_SI, ETIQUETA, LEER, ESCRIBIR) = range(22)
+
+VARIABLE = 0
+TEMPORAL = 1
+CONSTANTE = 2
+ETIQUETA_OPERANDO = 3
+NINGUNO = -1
+
+# Operador del árbol -> código de operación, según el tipo del resultado
+ARITMETICOS_ENTEROS = {'+': SUMA, '-': RESTA, '*': MULT, '/': DIV_ENTERA, '%': MOD_ENTERO, '^': POT_ENTERA}
+ARITMETICOS_REALES = {'+': SUMA, '-': RESTA, '*': MULT, '/': DIV, '%': MOD, '^': POT}
+COMPARACIONES = {'<': MENOR, '<=': MENOR_IGUAL, '>': MAYOR, '>=': MAYOR_IGUAL, '==': IGUAL, '!=': DISTINTO}
+
+# Símbolo de cada operación binaria en el volcado de texto
+SIMBOLOS = {op: simbolo for tabla in (ARITMETICOS_REALES, ARITMETICOS_ENTEROS, COMPARACIONES)
+            for simbolo, op in tabla.items()}
+BINARIAS = frozenset(SIMBOLOS)
+
+
+def operando(clase, indice):
+    return indice << 2 | clase
+
+
+def clase_operando(valor):
+    return valor & 3
+
+
+def indice_operando(valor):
+    return valor >> 2
+
+
+class CodigoIntermedio:
+    def __init__(self):
+        self.ops = array('B')
+        self.destinos = array('i')
+        self.primeros = array('i')
+        self.segundos = array('i')
+        # Tablas de los operandos
+        self.variables = []        # nombre de cada variable
+        self.tipos_variables = []  # tipo declarado de cada variable
+        self.indice_variables = {}
+        self.constantes = []
+        self.indice_constantes = {}
+        self.n_temporales = 0
+        self.n_etiquetas = 0
+
+    def __len__(self):
+        return len(self.ops)
+
+    def emitir(self, op, destino=NINGUNO, a=NINGUNO, b=NINGUNO):
+        self.ops.append(op)
+        self.destinos.append(destino)
+        self.primeros.append(a)
+        self.segundos.append(b)
+
+    def instruccion(self, i):
+        return self.ops[i], self.destinos[i], self.primeros[i], self.segundos[i]
+
+    def variable(self, nombre, tipo=None):
+        indice = self.indice_variables.get(nombre)
+        if indice is None:
+            indice = self.indice_variables[nombre] = len(self.variables)
+            self.variables.append(nombre)
+            self.tipos_variables.append(tipo)
+        elif tipo is not None and self.tipos_variables[indice] is None:
+            self.tipos_variables[indice] = tipo
+        return operando(VARIABLE, indice)
+
+    def constante(self, valor):
+        clave = clave_valor(valor)
+        indice = self.indice_constantes.get(clave)
+        if indice is None:
+            indice = self.indice_constantes[clave] = len(self.constantes)
+            self.constantes.append(valor)
+        return operando(CONSTANTE, indice)
+
+    def temporal(self):
+        self.n_temporales += 1
+        return operando(TEMPORAL, self.n_temporales - 1)
+
+    def etiqueta(self):
+        self.n_etiquetas += 1
+        return operando(ETIQUETA_OPERANDO, self.n_etiquetas - 1)
+
+    def nombre_operando(self, valor):
+        clase = clase_operando(valor)
+        indice = indice_operando(valor)
+        if clase == VARIABLE:
+            return self.variables[indice]
+        if clase == TEMPORAL:
+            return f"t{indice}"
+        if clase == CONSTANTE:
+            return repr(self.constantes[indice])
+        return f"L{indice}"
+
+    def texto_instruccion(self, i):
+        op, destino, a, b = self.instruccion(i)
+        nombre = self.nombre_operando
+        if op == ETIQUETA:
+            return f"{nombre(a)}:"
+        if op == COPIAR:
+            return f"    {nombre(destino)} = {nombre(a)}"
+        if op in BINARIAS:
+            return f"    {nombre(destino)} = {nombre(a)} {SIMBOLOS[op]} {nombre(b)}"
+        if op == SALTAR:
+            return f"    goto {nombre(a)}"
+        if op == SALTAR_SI_FALSO:
+            return f"    ifFalse {nombre(a)} goto {nombre(b)}"
+        if op == SALTAR_SI:
+            return f"    if {nombre(a)} goto {nombre(b)}"
+        if op == LEER:
+            return f"    cin {nombre(destino)}"
+        return f"    cout {nombre(a)}"
+
+    def texto(self):
+        return ''.join(self.texto_instruccion(i) + '\n' for i in range(len(self.ops)))
+
+    def instrucciones(self):
+        # Lista de tuplas (op, destino, a, b), para las pasadas que reordenan código
+        return list(zip(self.ops, self.destinos, self.primeros, self.segundos))
+
+    def con_instrucciones(self, instrucciones):
+        # Copia con las mismas tablas de operandos y otras instrucciones
+        codigo = CodigoIntermedio()
+        codigo.variables = list(self.variables)
+        codigo.tipos_variables = list(self.tipos_variables)
+        codigo.indice_variables = dict(self.indice_variables)
+        codigo.constantes = list(self.constantes)
+        codigo.indice_constantes = dict(self.indice_constantes)
+        codigo.n_temporales = self.n_temporales
+        codigo.n_etiquetas = self.n_etiquetas
+        for instruccion in instrucciones:
+            codigo.emitir(*instruccion)
+        return codigo
+
+
+class GeneradorIntermedio:
+    # Traduce el árbol anotado (semantic.annotate_tree) a código de tres
+    # direcciones. Igual que semantic.VerificadorSemantico, recorre el árbol
+    # con una pila explícita de marcos (función, dato): las expresiones dejan
+    # su operando en self.operandos.
+    def __init__(self):
+        self.codigo = CodigoIntermedio()
+        self.operandos = []
+        self.logicas = []  # (temporal, etiqueta final) de cada and/or abierto
+        self.entradas = {clase: getattr(self, nombre) for clase, nombre in self.ENTRADAS.items()}
+
+    def generar(self, arbol):
+        pila = [(self.visitar, arbol)]
+        while pila:
+            funcion, dato = pila.pop()
+            funcion(dato, pila)
+        return self.codigo
+
+    def visitar(self, nodo, pila):
+        self.entradas[clase_nodo(nodo)](nodo, pila)
+
+    # Marcos auxiliares
+
+    def descartar(self, dato, pila):
+        self.operandos.pop()
+
+    def marcar(self, etiqueta, pila):
+        self.codigo.emitir(ETIQUETA, a=etiqueta)
+
+    def saltar(self, etiqueta, pila):
+        self.codigo.emitir(SALTAR, a=etiqueta)
+
+    def saltar_si_falso(self, etiqueta, pila):
+        self.codigo.emitir(SALTAR_SI_FALSO, a=self.operandos.pop(), b=etiqueta)
+
+    def saltar_si(self, etiqueta, pila):
+        self.codigo.emitir(SALTAR_SI, a=self.operandos.pop(), b=etiqueta)
+
+    def copiar_en(self, destino):
+        # destino = valor de la pila; si el valor es el temporal que acaba de
+        # calcular la última instrucción, se calcula directamente en destino
+        codigo = self.codigo
+        valor = self.operandos.pop()
+        if clase_operando(valor) == TEMPORAL and codigo.destinos and codigo.destinos[-1] == valor:
+            codigo.destinos[-1] = destino
+        else:
+            codigo.emitir(COPIAR, destino, valor)
+
+    # Sentencias
+
+    def entrar_nulo(self, nodo, pila):
+        pass
+
+    def entrar_lista(self, nodo, pila):
+        for sentencia in reversed(nodo):
+            if clase_nodo(sentencia) in EXPRESIONES:
+                pila.append((self.descartar, sentencia))
+            pila.append((self.visitar, sentencia))
+
+    def entrar_bloque(self, nodo, pila):
+        # main y else
+        self.entrar_lista(nodo['children'], pila)
+
+    def entrar_declaracion(self, nodo, pila):
+        tipo = nodo['label']
+        for variable in nodo['children']:
+            self.codigo.variable(variable['label'], tipo)
+        for variable in reversed(nodo['children']):
+            if variable['children']:
+                pila.append((self.inicializar, variable))
+                pila.append((self.visitar, variable['children'][1]))
+
+    def inicializar(self, variable, pila):
+        self.copiar_en(self.codigo.variable(variable['label']))
+
+    def entrar_asignacion(self, nodo, pila):
+        pila.append((self.salir_asignacion, nodo))
+        if nodo['children'][1] is not None:
+            pila.append((self.visitar, nodo['children'][1]))
+
+    def salir_asignacion(self, nodo, pila):
+        nombre, valor = nodo['children']
+        destino = self.codigo.variable(nombre)
+        if valor is not None:
+            self.copiar_en(destino)
+        # Una asignación también es una expresión: su valor es la variable
+        self.operandos.append(destino)
+
+    def entrar_if(self, nodo, pila):
+        # ifFalse c goto L_else; bloque; [goto L_fin; L_else: else; L_fin:]
+        children = nodo['children']
+        codigo = self.codigo
+        otro = codigo.etiqueta()
+        if len(children) > 2:
+            fin = codigo.etiqueta()
+            pila.append((self.marcar, fin))
+            pila.append((self.visitar, children[2]))
+            pila.append((self.marcar, otro))
+            pila.append((self.saltar, fin))
+        else:
+            pila.append((self.marcar, otro))
+        pila.append((self.visitar, children[1]))
+        pila.append((self.saltar_si_falso, otro))
+        pila.append((self.visitar, children[0]))
+
+    def entrar_while(self, nodo, pila):
+        # L_inicio: ifFalse c goto L_fin; bloque; goto L_inicio; L_fin:
+        children = nodo['children']
+        inicio = self.codigo.etiqueta()
+        fin = self.codigo.etiqueta()
+        pila.append((self.marcar, fin))
+        pila.append((self.saltar, inicio))
+        if len(children) > 1:
+            pila.append((self.visitar, children[1]))
+        pila.append((self.saltar_si_falso, fin))
+        pila.append((self.visitar, children[0]))
+        pila.append((self.marcar, inicio))
+
+    def entrar_do(self, nodo, pila):
+        # do { A } while c:       L_inicio: A; if c goto L_inicio
+        # do { A } while c { B }: L_inicio: A; ifFalse c goto L_fin; B; goto L_inicio; L_fin:
+        bloque, condicion = nodo['children']
+        codigo = self.codigo
+        inicio = codigo.etiqueta()
+        if len(condicion['children']) > 1:
+            fin = codigo.etiqueta()
+            pila.append((self.marcar, fin))
+            pila.append((self.saltar, inicio))
+            pila.append((self.visitar, condicion['children'][1]))
+            pila.append((self.saltar_si_falso, fin))
+        else:
+            pila.append((self.saltar_si, inicio))
+        pila.append((self.visitar, condicion['children'][0]))
+        pila.append((self.visitar, bloque))
+        pila.append((self.marcar, inicio))
+
+    def entrar_cin(self, nodo, pila):
+        self.codigo.emitir(LEER, self.codigo.variable(nodo['children'][0]))
+
+    def entrar_cout(self, nodo, pila):
+        pila.append((self.escribir, nodo))
+        pila.append((self.visitar, nodo['children'][0]))
+
+    def escribir(self, nodo, pila):
+        self.codigo.emitir(ESCRIBIR, a=self.operandos.pop())
+
+    def entrar_desconocido(self, nodo, pila):
+        raise ValueError(f"Nodo desconocido '{nodo['label']}' en el árbol anotado")
+
+    # Expresiones
+
+    def entrar_literal(self, nodo, pila):
+        self.operandos.append(self.codigo.constante(nodo['label']))
+
+    def entrar_variable(self, nodo, pila):
+        self.operandos.append(self.codigo.variable(nodo['label']))
+
+    def entrar_texto(self, nodo, pila):
+        # x++ / x--: el nombre de la variable y la constante '1'
+        if nodo.isdigit():
+            self.operandos.append(self.codigo.constante(int(nodo)))
+        else:
+            self.operandos.append(self.codigo.variable(str(nodo)))
+
+    def entrar_binaria(self, nodo, pila):
+        izquierdo, derecho = nodo['children']
+        pila.append((self.salir_binaria, nodo))
+        pila.append((self.visitar, derecho))
+        pila.append((self.visitar, izquierdo))
+
+    def salir_binaria(self, nodo, pila):
+        derecho = self.operandos.pop()
+        izquierdo = self.operandos.pop()
+        label = nodo['label']
+        if label in COMPARACIONES:
+            op = COMPARACIONES[label]
+        elif nodo.get('type') in TIPOS_ENTEROS:
+            op = ARITMETICOS_ENTEROS[label]
+        else:
+            op = ARITMETICOS_REALES[label]
+        temporal = self.codigo.temporal()
+        self.codigo.emitir(op, temporal, izquierdo, derecho)
+        self.operandos.append(temporal)
+
+    def entrar_logica(self, nodo, pila):
+        # Cortocircuito: t = a; ifFalse t goto L (and) / if t goto L (or); t = b; L:
+        izquierdo, derecho = nodo['children']
+        pila.append((self.salir_logica, nodo))
+        pila.append((self.visitar, derecho))
+        pila.append((self.medio_logica, nodo))
+        pila.append((self.visitar, izquierdo))
+
+    def medio_logica(self, nodo, pila):
+        codigo = self.codigo
+        temporal = codigo.temporal()
+        fin = codigo.etiqueta()
+        self.copiar_en(temporal)
+        codigo.emitir(SALTAR_SI_FALSO if nodo['label'] == 'and' else SALTAR_SI, a=temporal, b=fin)
+        self.logicas.append((temporal, fin))
+
+    def salir_logica(self, nodo, pila):
+        temporal, fin = self.logicas.pop()
+        self.copiar_en(temporal)
+        self.codigo.emitir(ETIQUETA, a=fin)
+        self.operandos.append(temporal)
+
+    # Tabla de despacho: clase de nodo (semantic.clase_nodo) -> método
+    ENTRADAS = {
+        'nulo': 'entrar_nulo', 'lista': 'entrar_lista', 'main': 'entrar_bloque', 'else': 'entrar_bloque',
+        'declaracion': 'entrar_declaracion', 'asignacion': 'entrar_asignacion',
+        'if': 'entrar_if', 'while': 'entrar_while', 'do': 'entrar_do',
+        'cin': 'entrar_cin', 'cout': 'entrar_cout', 'desconocido': 'entrar_desconocido',
+        'literal': 'entrar_literal', 'variable': 'entrar_variable', 'texto': 'entrar_texto',
+        'aritmetica': 'entrar_binaria', 'relacional': 'entrar_binaria', 'logica': 'entrar_logica',
+    }
+
+
+def generar_intermedio(arbol_anotado):
+    return GeneradorIntermedio().generar(arbol_anotado)
@@ -1,24 +1,116 @@
 import sys
+import re
+import mmap
+import codecs
+from itertools import product
 
 class Token:
-    def __init__(self, token_type, value, line, column):
+    __slots__ = ('token_type', 'value', 'line', 'column', 'longitud')
+
+    def __init__(self, token_type, value, line, column, longitud=None):
         self.token_type = token_type
         self.value = value
         self.line = line
         self.column = column
+        self.longitud = longitud  # Longitud del lexema en caracteres (el valor puede ser otro texto)
+
+PALABRAS_RESERVADAS = {'if','else','do','while','switch','case','double','int','float','char','string','main','cin','cout'}
+OPERADORES_LOGICOS = {'and','or'}
+
+# Expresión regular maestra del motor 'regex'. Los espacios que no son salto
+# de línea se consumen como prefijo de cada token; cada grupo corresponde a una
+# rama de get_next_token_clasico y el número de grupo (lastindex) elige la acción.
+# Las alternativas están ordenadas por frecuencia en programas típicos.
+PATRON_TOKENS = re.compile(r"""
+    [^\S\n]*(?:
+      ((?:[^\W\d_]\d*|_)+)                    # 1 identificador (dígitos solo después de letra o dígito)
+    | ([(){}\[\],;:])                        # 2 símbolo
+    | (\n\s*)                                # 3 saltos de línea y espacios siguientes
+    | (\d+(?:\.\d*)?)                         # 4 número
+    | (==|[<>]=?)                             # 5 operador relacional
+    | (=)                                     # 6 asignación
+    | (\+\+|--|[+\-])                        # 7 operador aritmético
+    | (//[^\n]*)                             # 8 comentario de una línea
+    | (/\*.*?\*/)                             # 9 comentario de varias líneas
+    | (/\*.*)                                 # 10 comentario de varias líneas sin cerrar
+    | (/)                                     # 11 división
+    | ([*%^])                                 # 12 operador aritmético que el motor clásico reporta como relacional
+    | (\S)                                    # 13 cualquier otro carácter
+    )
+""", re.DOTALL | re.VERBOSE)
+
+def _variantes_mayusculas(palabra):
+    # Todas las combinaciones de mayúsculas/minúsculas de una palabra
+    return {''.join(letras) for letras in product(*[(c.lower(), c.upper()) for c in palabra])}
+
+# Clasificación de identificadores con una sola consulta al diccionario: se
+# guardan de antemano todas las variantes de mayúsculas para no llamar a lower().
+CLASE_IDENTIFICADOR = {}
+for _palabra in PALABRAS_RESERVADAS:
+    for _variante in _variantes_mayusculas(_palabra):
+        CLASE_IDENTIFICADOR[_variante] = 'PALABRA_RESERVADA'
+for _palabra in OPERADORES_LOGICOS:
+    for _variante in _variantes_mayusculas(_palabra):
+        CLASE_IDENTIFICADOR[_variante] = 'OPERADOR_LOGICO'
+
+MOTORES = ('clasico', 'regex')
+
+TAM_BLOQUE = 64 * 1024  # Tamaño de bloque por defecto al leer de un archivo o mmap
+
+def leer_bloques(fuente, tam_bloque=TAM_BLOQUE):
+    # Lee un archivo de texto, un archivo binario o un mmap en bloques de tamaño
+    # fijo. Los bytes se decodifican como UTF-8 de forma incremental para no
+    # partir caracteres multibyte entre bloques.
+    decodificador = None
+    while True:
+        bloque = fuente.read(tam_bloque)
+        if not bloque:
+            break
+        if isinstance(bloque, bytes):
+            if decodificador is None:
+                decodificador = codecs.getincrementaldecoder('utf-8')()
+            bloque = decodificador.decode(bloque)
+        if bloque:
+            yield bloque
+    if decodificador is not None:
+        resto = decodificador.decode(b'', final=True)
+        if resto:
+            yield resto
 
 class Lexer:
-    def __init__(self, text):
+    # text puede ser una cadena o, con el motor 'regex', cualquier objeto con
+    # read() (archivo de texto, archivo binario o mmap). En ese caso se lee en
+    # bloques de tam_bloque y la memoria usada no depende del tamaño del archivo.
+    # Sin motor se usa el clásico para cadenas y 'regex' para archivos: sobre
+    # una cadena el motor 'regex' no es más rápido (bench_lexico.py), porque
+    # crear cada Token cuesta casi lo mismo que reconocerlo.
+    def __init__(self, text, motor=None, tam_bloque=TAM_BLOQUE):
+        if motor is None:
+            motor = 'clasico' if isinstance(text, str) else 'regex'
+        if motor not in MOTORES:
+            raise ValueError(f"Motor léxico desconocido '{motor}'. Opciones: {', '.join(MOTORES)}")
+        if not isinstance(text, str):
+            if motor != 'regex':
+                raise ValueError("El motor 'clasico' necesita el texto completo; use el motor 'regex' para leer en bloques")
+            bloques = leer_bloques(text, tam_bloque)
+            text = None
+        else:
+            bloques = (text,)
+        self.motor = motor
         self.text = text
         self.pos = 0
         self.line = 1
         self.column = 1
-        self.current_char = self.text[self.pos]
-        self.palabrasC = {'if','else','do','while','switch','case','double','int','float','char','string','main','cin','cout'}
+        self.palabrasC = PALABRAS_RESERVADAS
         self.operador_aritmetico = {'+','-','*','/','%','^','++','--'}
         self.operador_relacional= {'<','>','!=','<=','>=','=='}
-        self.operador_logico = {'and','or'}
+        self.operador_logico = OPERADORES_LOGICOS
         self.simbolos = {'(',')','{','}','[',']',',',';',':'}
+        if motor == 'regex':
+            # get_next_token pasa a ser directamente el __next__ del generador
+            self.get_next_token = self.generar_tokens_regex(bloques).__next__
+        else:
+            self.current_char = self.text[self.pos]
     
     def next(self):
         self.pos += 1
@@ -37,41 +129,193 @@ class Lexer:
             self.next()
 
     def get_next_token(self):
+        return self.get_next_token_clasico()
+
+    def __iter__(self):
+        # Recorre los tokens hasta EOF (sin incluirlo)
+        while True:
+            token = self.get_next_token()
+            if token.token_type == 'EOF':
+                return
+            yield token
+
+    def generar_tokens_regex(self, bloques):
+        # Generador de tokens del motor 'regex' sobre una secuencia de bloques de
+        # texto. Un token que toca el final del bloque puede continuar en el
+        # siguiente, así que se deja pendiente hasta leer más. Al agotarse el
+        # texto devuelve EOF indefinidamente, igual que get_next_token_clasico.
+        clase_identificador = CLASE_IDENTIFICADOR
+        bloques = iter(bloques)
+        line = 1
+        inicio_linea = -1  # Posición absoluta del último salto de línea contado
+        base = 0           # Posición absoluta del inicio de buffer
+        buffer = next(bloques, '')
+        siguiente = next(bloques, None)
+
+        while True:
+            final = siguiente is None
+            limite = len(buffer)
+            consumido = 0
+            comentario_abierto = None
+
+            for m in PATRON_TOKENS.finditer(buffer):
+                grupo = m.lastindex
+                inicio, fin = m.span(grupo)
+                if fin == limite and not final:
+                    if grupo == 10:
+                        # Comentario /* que sigue en los bloques siguientes
+                        comentario_abierto = inicio
+                    break
+                consumido = fin
+                self.pos = base + fin
+
+                if grupo == 1:
+                    valor = m.group(1)
+                    yield Token(clase_identificador.get(valor, 'ID'), valor, line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 2:
+                    yield Token('SIMBOLO', m.group(2), line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 3 or grupo == 9 or grupo == 10:
+                    token_line = line
+                    column = base + inicio - inicio_linea
+                    # Igual que el motor clásico, un salto de línea en la posición 0 no se cuenta
+                    desde = inicio if base else (inicio or 1)
+                    saltos = buffer.count('\n', desde, fin)
+                    if saltos:
+                        line += saltos
+                        inicio_linea = base + buffer.rindex('\n', desde, fin)
+                    if grupo == 9:
+                        yield Token('COMENTARIO', 'Comentario de varias líneas', token_line, column, fin - inicio)
+                    elif grupo == 10:
+                        yield Token('ERROR', 'Comentario de varias líneas sin cerrar', token_line, column, fin - inicio)
+                elif grupo == 4:
+                    valor = m.group(4)
+                    column = base + inicio - inicio_linea
+                    if '.' not in valor:
+                        yield Token('NUMERO', int(valor), line, column, fin - inicio)
+                    elif buffer[fin:fin + 1] == '.':
+                        # Segundo punto decimal: el motor clásico devuelve el texto leído
+                        yield Token('NUMERO', valor, line, column, fin - inicio)
+                    elif valor[-1] == '.':
+                        yield Token('ERROR', valor, line, column, fin - inicio)
+                    else:
+                        yield Token('NUMERO', float(valor), line, column, fin - inicio)
+                elif grupo == 5:
+                    yield Token('OPERADOR_RELACIONAL', m.group(5), line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 6:
+                    yield Token('ASIGNACION', '=', line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 7:
+                    yield Token('OPERADOR_ARITMETICO', m.group(7), line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 8:
+                    yield Token('COMENTARIO', 'Comentario de una línea', line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 11:
+                    yield Token('OPERADOR_ARITMETICO', '/', line, base + inicio - inicio_linea, fin - inicio)
+                elif grupo == 12:
+                    yield Token('OPERADOR_RELACIONAL', m.group(12), line, base + inicio - inicio_linea, fin - inicio)
+                else:
+                    # Carácter no reconocido: los alfanuméricos que no son letra ni dígito se ignoran
+                    valor = m.group(13)
+                    if not valor.isalnum():
+                        yield Token('ERROR', valor, line, base + inicio - inicio_linea, fin - inicio)
+
+            if final:
+                break
+
+            if comentario_abierto is not None:
+                # Se busca el cierre bloque a bloque sin acumular el comentario en memoria
+                token_line = line
+                column = base + comentario_abierto - inicio_linea
+                inicio_comentario = base + comentario_abierto
+                pendiente = buffer[comentario_abierto + 2:]
+                base_pendiente = base + comentario_abierto + 2
+                while True:
+                    cierre = pendiente.find('*/')
+                    if cierre != -1:
+                        corte = cierre + 2
+                    elif siguiente is None:
+                        corte = len(pendiente)
+                    else:
+                        # Se conserva el último carácter por si es el '*' del cierre
+                        corte = max(len(pendiente) - 1, 0)
+                    saltos = pendiente.count('\n', 0, corte)
+                    if saltos:
+                        line += saltos
+                        inicio_linea = base_pendiente + pendiente.rindex('\n', 0, corte)
+                    if cierre != -1 or siguiente is None:
+                        break
+                    base_pendiente += corte
+                    pendiente = pendiente[corte:] + siguiente
+                    siguiente = next(bloques, None)
+
+                if cierre == -1:
+                    # El archivo terminó dentro del comentario
+                    base = base_pendiente + corte
+                    self.pos = base
+                    buffer = ''
+                    yield Token('ERROR', 'Comentario de varias líneas sin cerrar', token_line, column, base - inicio_comentario)
+                    break
+                buffer = pendiente[corte:]
+                base = base_pendiente + corte
+                self.pos = base
+                yield Token('COMENTARIO', 'Comentario de varias líneas', token_line, column, base - inicio_comentario)
+                continue
+
+            # El resto sin consumir se une al siguiente bloque
+            base += consumido
+            buffer = buffer[consumido:] + siguiente
+            siguiente = next(bloques, None)
+
+        # Igual que el motor clásico, EOF lleva la posición del último carácter
+        total = base + len(buffer)
+        self.pos = total
+        self.line = line
+        if total:
+            self.column = total - 1 - inicio_linea
+        while True:
+            yield Token('EOF', None, self.line, self.column)
+
+    def get_next_token_clasico(self):
         while self.current_char is not None:
             if self.current_char.isspace():
                 self.salto_espacio()
                 continue
 
             if self.current_char.isdigit():
-                return self.tokenize_numero()  # Reconocer números enteros y reales
+                return self.medir(self.tokenize_numero)  # Reconocer números enteros y reales
 
             if self.current_char.isalpha() or self.current_char == '_':
-                return self.tokenize_id()  # Reconocer identificadores y operador logico
+                return self.medir(self.tokenize_id)  # Reconocer identificadores y operador logico
 
             if self.current_char == '/':
-                return self.tokenize_comentario()
+                return self.medir(self.tokenize_comentario)
 
             if self.current_char in self.operador_aritmetico:
-                return self.tokenize_operador_aritmetico()  # Reconocer operadores aritméticos
+                return self.medir(self.tokenize_operador_aritmetico)  # Reconocer operadores aritméticos
             
             if self.current_char in self.operador_relacional:
-                return self.tokenize_operador_relacional()  # Reconocer operador relacional
+                return self.medir(self.tokenize_operador_relacional)  # Reconocer operador relacional
 
             if self.current_char in self.simbolos:
-                return self.tokenize_simbolo()  # Reconocer símbolos
+                return self.medir(self.tokenize_simbolo)  # Reconocer símbolos
 
             if self.current_char == '=':
-                return self.tokenize_asignacion()  # Reconocer asignación
+                return self.medir(self.tokenize_asignacion)  # Reconocer asignación
 
             # Manejar caracteres no válidos y tokens no reconocidos
             if not self.current_char.isalnum() and self.current_char not in ['_', '/', ' ', '\t', '\n']:
-                return self.tokenize_wrong()
+                return self.medir(self.tokenize_wrong)
 
             # Avanzar al siguiente carácter si no se ha reconocido ningún token
             self.next()
 
         return Token('EOF', None, self.line, self.column)
     
+    def medir(self, tokenize):
+        # Token con la longitud de su lexema: lo que avanzó la posición al leerlo
+        inicio = self.pos
+        token = tokenize()
+        token.longitud = self.pos - inicio
+        return token
+
     def tokenize_numero(self):
         token_start_line = self.line
         token_start_column = self.column
@@ -213,22 +457,40 @@ class Lexer:
         self.next()
         return Token('ERROR', result, token_start_line, token_start_column)
 
+def comparar_motores(text):
+    # Prueba diferencial: analiza el texto con ambos motores y devuelve el
+    # primer par de tokens distintos (clasico, regex) o None si coinciden.
+    clasico = Lexer(text, motor='clasico')
+    regex = Lexer(text, motor='regex')
+    while True:
+        a = clasico.get_next_token()
+        b = regex.get_next_token()
+        if (a.token_type, a.value, a.line, a.column) != (b.token_type, b.value, b.line, b.column):
+            return a, b
+        if a.token_type == 'EOF':
+            return None
+
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    if len(sys.argv) not in (2, 3):
         sys.exit(1)
 
     input_file = sys.argv[1]
-    
+    motor = sys.argv[2] if len(sys.argv) == 3 else 'regex'
+
     try:
-        with open(input_file, 'r') as file:
-            text = file.read()
+        file = open(input_file, 'rb')
     except FileNotFoundError:
         print(f"File '{input_file}' not found.")
         sys.exit(1)
 
-    lexer = Lexer(text)
-    while True:
-        token = lexer.get_next_token()
-        if token.token_type == 'EOF':
-            break
-        print(f'{token.token_type}: {token.value} (Line: {token.line}, Column: {token.column})')
+    with file:
+        if motor == 'clasico':
+            fuente = file.read().decode('utf-8')
+        elif file.seek(0, 2) == 0:
+            fuente = ''  # mmap no admite archivos vacíos
+        else:
+            # El motor 'regex' lee el archivo mapeado en memoria por bloques
+            fuente = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        for token in Lexer(fuente, motor=motor):
+            print(f'{token.token_type}: {token.value} (Line: {token.line}, Column: {token.column})')
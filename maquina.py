@@ -0,0 +1,432 @@
+import math
+import operator
+import time
+from array import array
+from constantes import potencia_entera
+from intermedio import (COPIAR, SUMA, RESTA, MULT, DIV, DIV_ENTERA, MOD, MOD_ENTERO, POT, POT_ENTERA,
+                        MENOR, MENOR_IGUAL, MAYOR, MAYOR_IGUAL, IGUAL, DISTINTO,
+                        SALTAR, SALTAR_SI_FALSO, SALTAR_SI, ETIQUETA, LEER, ESCRIBIR,
+                        VARIABLE, TEMPORAL, CONSTANTE, clase_operando, indice_operando)
+from semantic import TIPOS_ENTEROS, TIPOS_REALES
+
+# Máquina virtual de registros. El código de tres direcciones (optimizado o
+# no) se traduce a un bytecode de 4 enteros por instrucción (op, d, a, b) en
+# un array('i'). Los valores viven en tres bancos de registros con tipo:
+#
+#   enteros  array('q')  integer, int, boolean y resultados de comparaciones
+#   reales   array('d')  float y double
+#   objetos  lista       char y string
+#
+# Cada variable ocupa en el banco de su tipo el registro de su número de
+# registro (loc) en la tabla de símbolos; después van los temporales y las
+# constantes. Las operaciones mixtas entero/real convierten antes el entero a
+# un registro real auxiliar, así cada código de operación lee y escribe un
+# solo banco.
+
+ENTEROS = 0
+REALES = 1
+OBJETOS = 2
+
+(E_MOVER, R_MOVER, O_MOVER, E_A_R,
+ E_SUMA, E_RESTA, E_MULT, E_DIV, E_MOD, E_POT,
+ R_SUMA, R_RESTA, R_MULT, R_DIV, R_MOD, R_POT,
+ E_MENOR, E_MENOR_IGUAL, E_MAYOR, E_MAYOR_IGUAL, E_IGUAL, E_DISTINTO,
+ R_MENOR, R_MENOR_IGUAL, R_MAYOR, R_MAYOR_IGUAL, R_IGUAL, R_DISTINTO,
+ O_MENOR, O_MENOR_IGUAL, O_MAYOR, O_MAYOR_IGUAL, O_IGUAL, O_DISTINTO,
+ B_SALTAR, B_SALTAR_SI_FALSO, B_SALTAR_SI,
+ E_LEER, R_LEER, O_LEER, E_ESCRIBIR, R_ESCRIBIR, O_ESCRIBIR) = range(43)
+
+MOVER = {ENTEROS: E_MOVER, REALES: R_MOVER, OBJETOS: O_MOVER}
+LEER_BANCO = {ENTEROS: E_LEER, REALES: R_LEER, OBJETOS: O_LEER}
+ESCRIBIR_BANCO = {ENTEROS: E_ESCRIBIR, REALES: R_ESCRIBIR, OBJETOS: O_ESCRIBIR}
+ARITMETICAS = {
+    SUMA: (E_SUMA, R_SUMA), RESTA: (E_RESTA, R_RESTA), MULT: (E_MULT, R_MULT),
+    DIV: (None, R_DIV), DIV_ENTERA: (E_DIV, None), MOD: (None, R_MOD), MOD_ENTERO: (E_MOD, None),
+    POT: (None, R_POT), POT_ENTERA: (E_POT, None),
+}
+COMPARACIONES = {
+    MENOR: (E_MENOR, R_MENOR, O_MENOR), MENOR_IGUAL: (E_MENOR_IGUAL, R_MENOR_IGUAL, O_MENOR_IGUAL),
+    MAYOR: (E_MAYOR, R_MAYOR, O_MAYOR), MAYOR_IGUAL: (E_MAYOR_IGUAL, R_MAYOR_IGUAL, O_MAYOR_IGUAL),
+    IGUAL: (E_IGUAL, R_IGUAL, O_IGUAL), DISTINTO: (E_DISTINTO, R_DISTINTO, O_DISTINTO),
+}
+COMPARAR_OBJETOS = {O_MENOR: operator.lt, O_MENOR_IGUAL: operator.le, O_MAYOR: operator.gt,
+                    O_MAYOR_IGUAL: operator.ge, O_IGUAL: operator.eq, O_DISTINTO: operator.ne}
+
+# Límites de una ejecución: un ciclo infinito termina con un error en lugar
+# de ocupar para siempre el proceso que lo ejecuta. Se revisan en los saltos
+# hacia atrás, el reloj solo cada PASO_REVISION instrucciones.
+LIMITE_INSTRUCCIONES = 50_000_000
+LIMITE_SEGUNDOS = 2.0
+PASO_REVISION = 1 << 16
+
+
+def banco_de_tipo(tipo):
+    if tipo in TIPOS_ENTEROS or tipo == 'boolean':
+        return ENTEROS
+    if tipo in TIPOS_REALES:
+        return REALES
+    return OBJETOS
+
+
+def banco_aritmetica(op, banco_a, banco_b):
+    # Banco del resultado: la variante entera solo si existe y ambos son enteros
+    if ARITMETICAS[op][0] is not None and banco_a == ENTEROS and banco_b == ENTEROS:
+        return ENTEROS
+    return REALES
+
+
+def banco_de_valor(valor):
+    if isinstance(valor, int):
+        return ENTEROS
+    if isinstance(valor, float):
+        return REALES
+    return OBJETOS
+
+
+class Bytecode:
+    def __init__(self):
+        self.codigo = array('i')
+        self.tamanos = [0, 0, 0]   # registros de cada banco
+        self.iniciales = []        # (banco, registro, valor) de las constantes
+        self.variables = []        # (nombre, banco, registro)
+        self.lineas_intermedio = array('i')  # instrucción del código intermedio de cada una
+
+    def __len__(self):
+        return len(self.codigo) // 4
+
+
+class TraductorBytecode:
+    # Asigna registros a los operandos del código intermedio y elige la
+    # variante de cada operación según el banco de sus operandos
+    def __init__(self, intermedio, tabla_simbolos):
+        self.intermedio = intermedio
+        self.bytecode = Bytecode()
+        self.registros = {}  # operando del código intermedio -> (banco, registro)
+        tamanos = self.bytecode.tamanos
+        # Las variables van en el registro de su loc
+        locs = []
+        for indice, nombre in enumerate(intermedio.variables):
+            enlace = tabla_simbolos.get(nombre) if tabla_simbolos is not None else None
+            locs.append(enlace['loc'] if enlace is not None else None)
+        siguiente = max([loc for loc in locs if loc is not None], default=-1) + 1
+        for indice, nombre in enumerate(intermedio.variables):
+            loc = locs[indice]
+            if loc is None:
+                loc = siguiente
+                siguiente += 1
+            banco = banco_de_tipo(intermedio.tipos_variables[indice])
+            self.registros[(VARIABLE, indice)] = (banco, loc)
+            self.bytecode.variables.append((nombre, banco, loc))
+        for banco in (ENTEROS, REALES, OBJETOS):
+            tamanos[banco] = siguiente
+        self.bancos_temporales = self.tipar_temporales()
+
+    def tipar_temporales(self):
+        # Banco de cada temporal según la instrucción que lo define. Se
+        # repite hasta que no cambie por si un temporal se lee antes de la
+        # instrucción que lo define; sin definición queda en ENTEROS.
+        bancos = {}
+        instrucciones = self.intermedio.instrucciones()
+        cambio = True
+        while cambio:
+            cambio = False
+            for op, destino, a, b in instrucciones:
+                if op != COPIAR and op not in ARITMETICAS and op not in COMPARACIONES:
+                    continue
+                if clase_operando(destino) != TEMPORAL:
+                    continue
+                if op == COPIAR:
+                    banco = self.banco_operando(a, bancos)
+                elif op in ARITMETICAS:
+                    banco = banco_aritmetica(op, self.banco_operando(a, bancos), self.banco_operando(b, bancos))
+                else:
+                    banco = ENTEROS
+                if bancos.get(indice_operando(destino)) != banco:
+                    bancos[indice_operando(destino)] = banco
+                    cambio = True
+        return bancos
+
+    def banco_operando(self, operando, bancos_temporales):
+        clase, indice = clase_operando(operando), indice_operando(operando)
+        if clase == CONSTANTE:
+            return banco_de_valor(self.intermedio.constantes[indice])
+        if clase == TEMPORAL:
+            return bancos_temporales.get(indice, ENTEROS)
+        return self.registros[(VARIABLE, indice)][0]
+
+    def nuevo_registro(self, banco):
+        registro = self.bytecode.tamanos[banco]
+        self.bytecode.tamanos[banco] += 1
+        return registro
+
+    def registro(self, operando):
+        # (banco, registro) del operando; las constantes y los temporales se
+        # crean la primera vez que aparecen, en el banco de su tipo
+        clave = (clase_operando(operando), indice_operando(operando))
+        if clave in self.registros:
+            return self.registros[clave]
+        banco = self.banco_operando(operando, self.bancos_temporales)
+        registro = self.nuevo_registro(banco)
+        if clave[0] == CONSTANTE:
+            self.bytecode.iniciales.append((banco, registro, self.intermedio.constantes[clave[1]]))
+        self.registros[clave] = (banco, registro)
+        return banco, registro
+
+    def emitir(self, op, d=0, a=0, b=0):
+        self.bytecode.codigo.extend((op, d, a, b))
+        self.bytecode.lineas_intermedio.append(self.actual)
+
+    def como_real(self, banco, registro):
+        # Registro real con el valor del operando
+        if banco == REALES:
+            return registro
+        auxiliar = self.nuevo_registro(REALES)
+        self.emitir(E_A_R, auxiliar, registro)
+        return auxiliar
+
+    def destino(self, operando, banco):
+        # Registro donde escribir un resultado del banco dado. Si la variable
+        # es real y el resultado entero, se escribe en un auxiliar y se convierte.
+        banco_destino, registro = self.registro(operando)
+        if banco_destino == banco:
+            return registro, None
+        if banco == ENTEROS and banco_destino == REALES:
+            return self.nuevo_registro(ENTEROS), registro
+        raise ValueError(f"No se puede guardar un valor del banco {banco} en el banco {banco_destino}")
+
+    def escribir_en(self, op, operando, banco, a, b=0):
+        d, convertir_en = self.destino(operando, banco)
+        self.emitir(op, d, a, b)
+        if convertir_en is not None:
+            self.emitir(E_A_R, convertir_en, d)
+
+    def traducir(self):
+        intermedio = self.intermedio
+        instrucciones = intermedio.instrucciones()
+        # Primera pasada: bytecode con saltos a etiquetas; segunda: direcciones
+        posiciones = {}
+        saltos = []
+        for self.actual, (op, destino, a, b) in enumerate(instrucciones):
+            if op == ETIQUETA:
+                posiciones[a] = len(self.bytecode)
+            elif op == COPIAR:
+                banco, registro = self.registro(a)
+                self.escribir_en(MOVER[banco], destino, banco, registro)
+            elif op in ARITMETICAS:
+                banco_a, registro_a = self.registro(a)
+                banco_b, registro_b = self.registro(b)
+                enteros, reales = ARITMETICAS[op]
+                if banco_aritmetica(op, banco_a, banco_b) == ENTEROS:
+                    self.escribir_en(enteros, destino, ENTEROS, registro_a, registro_b)
+                else:
+                    self.escribir_en(reales, destino, REALES, self.como_real(banco_a, registro_a),
+                                     self.como_real(banco_b, registro_b))
+            elif op in COMPARACIONES:
+                banco_a, registro_a = self.registro(a)
+                banco_b, registro_b = self.registro(b)
+                variantes = COMPARACIONES[op]
+                if banco_a == banco_b:
+                    self.escribir_en(variantes[banco_a], destino, ENTEROS, registro_a, registro_b)
+                else:
+                    self.escribir_en(variantes[REALES], destino, ENTEROS, self.como_real(banco_a, registro_a),
+                                     self.como_real(banco_b, registro_b))
+            elif op == SALTAR:
+                saltos.append(len(self.bytecode))
+                self.emitir(B_SALTAR, 0, a)
+            elif op == SALTAR_SI_FALSO or op == SALTAR_SI:
+                saltos.append(len(self.bytecode))
+                self.emitir(B_SALTAR_SI_FALSO if op == SALTAR_SI_FALSO else B_SALTAR_SI, 0, self.registro(a)[1], b)
+            elif op == LEER:
+                banco, registro = self.registro(destino)
+                self.emitir(LEER_BANCO[banco], registro)
+            elif op == ESCRIBIR:
+                banco, registro = self.registro(a)
+                self.emitir(ESCRIBIR_BANCO[banco], 0, registro)
+        # El destino de un salto es la posición en palabras del array
+        codigo = self.bytecode.codigo
+        for instruccion in saltos:
+            ranura = 4 * instruccion + (2 if codigo[4 * instruccion] == B_SALTAR else 3)
+            codigo[ranura] = 4 * posiciones[codigo[ranura]]
+        return self.bytecode
+
+
+def traducir_bytecode(intermedio, tabla_simbolos=None):
+    return TraductorBytecode(intermedio, tabla_simbolos).traducir()
+
+
+class ErrorEjecucion(Exception):
+    pass
+
+
+class ResultadoEjecucion:
+    def __init__(self):
+        self.salida = ''
+        self.instrucciones = 0
+        self.segundos = 0.0
+        self.error = None
+        self.variables = {}  # nombre -> valor final
+
+    def instrucciones_por_segundo(self):
+        return self.instrucciones / self.segundos if self.segundos > 0 else 0.0
+
+
+class MaquinaVirtual:
+    def __init__(self, bytecode, limite=LIMITE_INSTRUCCIONES, segundos=LIMITE_SEGUNDOS):
+        self.bytecode = bytecode
+        self.limite = limite
+        self.segundos = segundos
+
+    def revisar_limites(self, ejecutadas, inicio):
+        # Devuelve cuántas instrucciones ejecutadas disparan la próxima revisión
+        if ejecutadas > self.limite:
+            raise ErrorEjecucion(f"Se alcanzó el límite de {self.limite} instrucciones")
+        if time.perf_counter() - inicio > self.segundos:
+            raise ErrorEjecucion(f"Se alcanzó el límite de {self.segundos} s de ejecución")
+        return min(ejecutadas + PASO_REVISION, self.limite)
+
+    def ejecutar(self, entrada=''):
+        # entrada: texto con los valores de cin separados por espacios o saltos de línea
+        bytecode = self.bytecode
+        tamanos = bytecode.tamanos
+        E = array('q', bytes(8 * tamanos[ENTEROS]))
+        R = array('d', bytes(8 * tamanos[REALES]))
+        O = [''] * tamanos[OBJETOS]
+        bancos = (E, R, O)
+
+        resultado = ResultadoEjecucion()
+        entradas = iter(entrada.split())
+        salida = []
+        escribir = salida.append
+        codigo = bytecode.codigo
+        fin = len(codigo)
+        revision = min(PASO_REVISION, self.limite)
+        pc = 0
+        ejecutadas = 0
+        inicio = time.perf_counter()
+        try:
+            for banco, registro, valor in bytecode.iniciales:
+                try:
+                    bancos[banco][registro] = valor
+                except OverflowError:
+                    raise ErrorEjecucion(f"La constante {valor} no cabe en un entero de 64 bits")
+            while pc < fin:
+                op = codigo[pc]
+                d = codigo[pc + 1]
+                a = codigo[pc + 2]
+                b = codigo[pc + 3]
+                pc += 4
+                ejecutadas += 1
+                if op == E_MOVER:
+                    E[d] = E[a]
+                elif op == E_SUMA:
+                    E[d] = E[a] + E[b]
+                elif op == E_MENOR:
+                    E[d] = E[a] < E[b]
+                elif op == B_SALTAR_SI_FALSO:
+                    if not E[a]:
+                        if b < pc and ejecutadas > revision:
+                            revision = self.revisar_limites(ejecutadas, inicio)
+                        pc = b
+                elif op == B_SALTAR_SI:
+                    if E[a]:
+                        if b < pc and ejecutadas > revision:
+                            revision = self.revisar_limites(ejecutadas, inicio)
+                        pc = b
+                elif op == B_SALTAR:
+                    # Los límites solo se revisan en los saltos hacia atrás
+                    if a < pc and ejecutadas > revision:
+                        revision = self.revisar_limites(ejecutadas, inicio)
+                    pc = a
+                elif op == E_RESTA:
+                    E[d] = E[a] - E[b]
+                elif op == E_MULT:
+                    E[d] = E[a] * E[b]
+                elif op == R_MOVER:
+                    R[d] = R[a]
+                elif op == R_SUMA:
+                    R[d] = R[a] + R[b]
+                elif op == R_RESTA:
+                    R[d] = R[a] - R[b]
+                elif op == R_MULT:
+                    R[d] = R[a] * R[b]
+                elif op == E_A_R:
+                    R[d] = E[a]
+                elif op == O_MOVER:
+                    O[d] = O[a]
+                elif op <= E_POT:
+                    # E_DIV, E_MOD, E_POT
+                    x = E[a]
+                    y = E[b]
+                    if op == E_POT:
+                        valor = potencia_entera(x, y)
+                        if valor is None:
+                            raise OverflowError
+                        E[d] = valor
+                        continue
+                    if y == 0:
+                        raise ErrorEjecucion("División entre cero")
+                    cociente = abs(x) // abs(y)
+                    if (x < 0) != (y < 0):
+                        cociente = -cociente
+                    E[d] = cociente if op == E_DIV else x - y * cociente
+                elif op <= R_POT:
+                    # R_DIV, R_MOD, R_POT
+                    x = R[a]
+                    y = R[b]
+                    if op == R_POT:
+                        R[d] = math.pow(x, y)
+                        continue
+                    if y == 0:
+                        raise ErrorEjecucion("División entre cero")
+                    R[d] = x / y if op == R_DIV else math.fmod(x, y)
+                elif op <= E_DISTINTO:
+                    x = E[a]
+                    y = E[b]
+                    E[d] = (x <= y if op == E_MENOR_IGUAL else x > y if op == E_MAYOR else
+                            x >= y if op == E_MAYOR_IGUAL else x == y if op == E_IGUAL else x != y)
+                elif op <= R_DISTINTO:
+                    x = R[a]
+                    y = R[b]
+                    E[d] = (x < y if op == R_MENOR else x <= y if op == R_MENOR_IGUAL else x > y if op == R_MAYOR else
+                            x >= y if op == R_MAYOR_IGUAL else x == y if op == R_IGUAL else x != y)
+                elif op <= O_DISTINTO:
+                    E[d] = COMPARAR_OBJETOS[op](O[a], O[b])
+                elif op == E_ESCRIBIR:
+                    escribir(str(E[a]))
+                elif op == R_ESCRIBIR:
+                    escribir(repr(R[a]))
+                elif op == O_ESCRIBIR:
+                    escribir(O[a])
+                else:
+                    # E_LEER, R_LEER, O_LEER
+                    texto = next(entradas, None)
+                    if texto is None:
+                        raise ErrorEjecucion("cin: no hay más datos de entrada")
+                    try:
+                        if op == E_LEER:
+                            E[d] = int(texto)
+                        elif op == R_LEER:
+                            R[d] = float(texto)
+                        else:
+                            O[d] = texto
+                    except ValueError:
+                        raise ErrorEjecucion(f"cin: '{texto}' no es un valor válido")
+        except ErrorEjecucion as e:
+            resultado.error = str(e)
+        except OverflowError:
+            resultado.error = "Desbordamiento numérico"
+        except ValueError:
+            # math.pow con base negativa y exponente fraccionario
+            resultado.error = "Operación no definida"
+        if resultado.error is not None and pc > 0:
+            # pc ya apunta a la instrucción siguiente a la que falló
+            resultado.error += f" (instrucción {bytecode.lineas_intermedio[pc // 4 - 1]} del código intermedio)"
+        resultado.segundos = time.perf_counter() - inicio
+        resultado.instrucciones = ejecutadas
+        resultado.salida = ''.join(texto + '\n' for texto in salida)
+        resultado.variables = {nombre: bancos[banco][registro] for nombre, banco, registro in bytecode.variables}
+        return resultado
+
+
+def ejecutar(intermedio, tabla_simbolos=None, entrada=''):
+    return MaquinaVirtual(traducir_bytecode(intermedio, tabla_simbolos)).ejecutar(entrada)
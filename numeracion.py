@@ -0,0 +1,78 @@
+import tkinter as tk
+from tkinter import font as tkfont
+
+# Numeración de líneas y eventos de cambio para el área de texto del editor.
+# En lugar de revisar el texto cada 100 ms, el Text avisa con <<Change>>
+# cuando se inserta, se borra o se mueve el cursor, y el canvas de números se
+# vuelve a dibujar solo si cambió el número de líneas o la parte visible.
+
+
+def generar_cambios(texto):
+    # Envuelve el comando Tcl del widget Text para que genere <<Change>> en
+    # cada insert, delete, replace o movimiento del cursor (mark set insert)
+    original = texto._w + '_original'
+    texto.tk.call('rename', texto._w, original)
+
+    def proxy(*argumentos):
+        resultado = texto.tk.call((original,) + argumentos)
+        if argumentos[0] in ('insert', 'delete', 'replace') or argumentos[:3] == ('mark', 'set', 'insert'):
+            texto.event_generate('<<Change>>', when='tail')
+        return resultado
+
+    texto.tk.createcommand(texto._w, proxy)
+
+
+class NumeracionLineas(tk.Canvas):
+    # Números de las líneas visibles de un Text (sin ajuste de línea). Los
+    # textos del canvas se reutilizan: al desplazarse solo cambian los números
+    # y las posiciones, y el ancho se ajusta cuando cambia la cantidad de dígitos.
+    def __init__(self, master, texto, **opciones):
+        opciones.setdefault('background', 'lightgrey')
+        super().__init__(master, highlightthickness=0, **opciones)
+        self.texto = texto
+        self.fuente = tkfont.Font(font=texto.cget('font'))
+        self.items = []
+        self.digitos = 0
+        self.ultimo = None     # (líneas, primera visible, desplazamiento en píxeles, alto) del último dibujo
+        self.pendiente = False
+        self.bind('<Configure>', self.programar)
+
+    def programar(self, event=None):
+        # Junta los eventos de un mismo ciclo en un solo dibujo
+        if not self.pendiente:
+            self.pendiente = True
+            self.after_idle(self.redibujar)
+
+    def redibujar(self):
+        self.pendiente = False
+        lineas = int(self.texto.index('end-1c').split('.')[0])
+        primera = self.texto.index('@0,0')
+        info = self.texto.dlineinfo(primera)
+        clave = (lineas, primera, info[1] if info else None, self.winfo_height())
+        if clave == self.ultimo:
+            return
+        self.ultimo = clave
+
+        digitos = len(str(lineas))
+        if digitos != self.digitos:
+            self.digitos = digitos
+            self.configure(width=self.fuente.measure('0' * (digitos + 1)))
+        ancho = int(self.cget('width')) - 2
+
+        k = 0
+        numero = int(primera.split('.')[0])
+        while numero <= lineas:
+            info = self.texto.dlineinfo(f'{numero}.0')
+            if info is None:
+                break
+            if k < len(self.items):
+                item = self.items[k]
+                self.itemconfigure(item, text=str(numero))
+                self.coords(item, ancho, info[1])
+            else:
+                self.items.append(self.create_text(ancho, info[1], anchor='ne', text=str(numero), font=self.fuente))
+            k += 1
+            numero += 1
+        if k < len(self.items):
+            self.delete(*self.items[k:])
+            del self.items[k:]
@@ -0,0 +1,516 @@
+from constantes import Plegador, convertir
+from intermedio import (COPIAR, SUMA, RESTA, MULT, DIV, DIV_ENTERA, MOD, MOD_ENTERO, POT, POT_ENTERA, IGUAL, DISTINTO,
+                        SALTAR, SALTAR_SI_FALSO, SALTAR_SI, ETIQUETA, LEER, ESCRIBIR,
+                        VARIABLE, TEMPORAL, CONSTANTE, NINGUNO, BINARIAS, SIMBOLOS, COMPARACIONES,
+                        clase_operando, indice_operando)
+from semantic import TIPOS_ENTEROS, TIPOS_REALES
+
+# Optimizaciones sobre el código de tres direcciones de intermedio.py:
+#
+#   constantes    propagación y plegado de constantes (flujo de datos global);
+#                 los saltos con condición constante se vuelven goto o desaparecen
+#   copias        propagación de copias dentro de cada bloque básico
+#   subexpresiones  eliminación de subexpresiones comunes dentro de cada bloque
+#   invariantes   saca de los ciclos while/do los temporales cuyo valor no
+#                 cambia dentro del ciclo; lo que puede fallar en la ejecución
+#                 solo si el ciclo lo calcula siempre al entrar
+#   codigo_muerto asignaciones que nadie lee (vivacidad global) y que no
+#                 pueden fallar, bloques inalcanzables, saltos a la instrucción siguiente y etiquetas sin uso
+#
+# Al terminar el programa se consideran vivas todas las variables (su valor
+# final es observable); los temporales mueren al salir del bloque que los usa.
+
+SALTOS = (SALTAR, SALTAR_SI_FALSO, SALTAR_SI)
+CONMUTATIVAS = (SUMA, MULT, IGUAL, DISTINTO)
+ENTERAS = (DIV_ENTERA, MOD_ENTERO, POT_ENTERA)
+USA_PRIMERO = (COPIAR, SALTAR_SI_FALSO, SALTAR_SI, ESCRIBIR)
+# Operaciones que con enteros pueden desbordar (con reales dan inf o nan)
+DESBORDAN = (SUMA, RESTA, MULT)
+# Operaciones con resultado real aunque los operandos sean enteros
+REALES = (DIV, MOD, POT)
+COMPARADORES = frozenset(COMPARACIONES.values())
+
+MAX_RONDAS = 10
+
+
+def es_lugar(operando):
+    # Variable o temporal: algo que se puede escribir
+    return operando != NINGUNO and clase_operando(operando) <= TEMPORAL
+
+
+def usos(instruccion):
+    op, destino, a, b = instruccion
+    if op in BINARIAS:
+        return (a, b)
+    if op in USA_PRIMERO:
+        return (a,)
+    return ()
+
+
+def definicion(instruccion):
+    op = instruccion[0]
+    if op == COPIAR or op == LEER or op in BINARIAS:
+        return instruccion[1]
+    return NINGUNO
+
+
+def destino_salto(instruccion):
+    # Etiqueta a la que salta la instrucción
+    return instruccion[2] if instruccion[0] == SALTAR else instruccion[3]
+
+
+def reemplazar_usos(instruccion, reemplazo):
+    # reemplazo: función operando -> operando
+    op, destino, a, b = instruccion
+    if op in BINARIAS:
+        return (op, destino, reemplazo(a), reemplazo(b))
+    if op in USA_PRIMERO:
+        return (op, destino, reemplazo(a), b)
+    return instruccion
+
+
+def bloques_basicos(instrucciones):
+    # Devuelve (inicios, sucesores): inicio de cada bloque y los índices de
+    # los bloques que pueden seguirle
+    n = len(instrucciones)
+    lideres = {0} if n else set()
+    for i, instruccion in enumerate(instrucciones):
+        op = instruccion[0]
+        if op == ETIQUETA:
+            lideres.add(i)
+        elif op in SALTOS and i + 1 < n:
+            lideres.add(i + 1)
+    inicios = sorted(lideres)
+    bloque_de_etiqueta = {}
+    for bloque, inicio in enumerate(inicios):
+        if instrucciones[inicio][0] == ETIQUETA:
+            bloque_de_etiqueta[instrucciones[inicio][2]] = bloque
+    sucesores = []
+    for bloque, inicio in enumerate(inicios):
+        fin = inicios[bloque + 1] if bloque + 1 < len(inicios) else n
+        ultima = instrucciones[fin - 1]
+        siguientes = []
+        if ultima[0] in SALTOS:
+            siguientes.append(bloque_de_etiqueta[destino_salto(ultima)])
+        if ultima[0] != SALTAR and bloque + 1 < len(inicios):
+            siguientes.append(bloque + 1)
+        sucesores.append(siguientes)
+    return inicios, sucesores
+
+
+def predecesores(sucesores):
+    resultado = [[] for _ in sucesores]
+    for bloque, siguientes in enumerate(sucesores):
+        for siguiente in siguientes:
+            resultado[siguiente].append(bloque)
+    return resultado
+
+
+def rangos(inicios, n):
+    return [(inicio, inicios[bloque + 1] if bloque + 1 < len(inicios) else n)
+            for bloque, inicio in enumerate(inicios)]
+
+
+class Optimizador:
+    def __init__(self, codigo):
+        self.codigo = codigo.con_instrucciones(())
+        self.instrucciones = codigo.instrucciones()
+        self.plegador = Plegador()
+        self.reporte = []  # (ronda, pasada, instrucciones antes, instrucciones después)
+
+    def optimizar(self):
+        pasadas = (('constantes', self.constantes), ('copias', self.copias),
+                   ('subexpresiones', self.subexpresiones), ('invariantes', self.invariantes),
+                   ('codigo_muerto', self.codigo_muerto))
+        for ronda in range(1, MAX_RONDAS + 1):
+            anteriores = list(self.instrucciones)
+            for nombre, pasada in pasadas:
+                antes = len(self.instrucciones)
+                pasada()
+                self.reporte.append((ronda, nombre, antes, len(self.instrucciones)))
+            if self.instrucciones == anteriores:
+                break
+        return self.codigo.con_instrucciones(self.instrucciones)
+
+    def texto_reporte(self):
+        return ''.join(f"Ronda {ronda}: {nombre:<15} {antes:>6} -> {despues:>6}\n"
+                       for ronda, nombre, antes, despues in self.reporte)
+
+    # Constantes
+
+    def valor_constante(self, operando, estado):
+        if operando != NINGUNO and clase_operando(operando) == CONSTANTE:
+            return operando
+        return estado.get(operando)
+
+    def guardar_constante(self, destino, constante, estado):
+        # Las variables reales guardan el valor convertido, como en la ejecución
+        if clase_operando(destino) == VARIABLE:
+            tipo = self.codigo.tipos_variables[indice_operando(destino)]
+            valor = self.codigo.constantes[indice_operando(constante)]
+            convertido = convertir(valor, tipo is not None and tipo not in TIPOS_ENTEROS)
+            if convertido is not valor:
+                constante = self.codigo.constante(convertido)
+        estado[destino] = constante
+
+    def plegar(self, instruccion, estado):
+        # Constante con el resultado de la operación, o None
+        op, destino, a, b = instruccion
+        a = self.valor_constante(a, estado)
+        b = self.valor_constante(b, estado)
+        if a is None or b is None:
+            return None
+        valor_a = self.codigo.constantes[indice_operando(a)]
+        valor_b = self.codigo.constantes[indice_operando(b)]
+        valor, error = self.plegador.plegar(SIMBOLOS[op], op in ENTERAS, valor_a, valor_b)
+        if valor is None or error is not None:
+            return None
+        return self.codigo.constante(valor)
+
+    def transferir(self, instruccion, estado):
+        op, destino = instruccion[0], instruccion[1]
+        if op == COPIAR:
+            constante = self.valor_constante(instruccion[2], estado)
+        elif op in BINARIAS:
+            constante = self.plegar(instruccion, estado)
+        elif op == LEER:
+            constante = None
+        else:
+            return
+        if constante is None:
+            estado.pop(destino, None)
+        else:
+            self.guardar_constante(destino, constante, estado)
+
+    def lugares_globales(self, instrucciones, bloques):
+        # Variables y temporales leídos en un bloque antes de definirse en él
+        globales = set()
+        for inicio, fin in bloques:
+            definidos = set()
+            for instruccion in instrucciones[inicio:fin]:
+                for x in usos(instruccion):
+                    if es_lugar(x) and (clase_operando(x) == VARIABLE or x not in definidos):
+                        globales.add(x)
+                destino = definicion(instruccion)
+                if destino != NINGUNO:
+                    definidos.add(destino)
+                    if clase_operando(destino) == VARIABLE:
+                        globales.add(destino)
+        return globales
+
+    def constantes(self):
+        instrucciones = self.instrucciones
+        inicios, sucesores = bloques_basicos(instrucciones)
+        if not inicios:
+            return
+        previos = predecesores(sucesores)
+        bloques = rangos(inicios, len(instrucciones))
+        # Solo las variables y los temporales que se leen en otro bloque pasan
+        # de un bloque a otro; los demás temporales se olvidan al salir
+        globales = self.lugares_globales(instrucciones, bloques)
+        # entradas[b]: lugar -> constante al entrar al bloque; None = aún no visitado
+        entradas = [None] * len(bloques)
+        salidas = [None] * len(bloques)
+        entradas[0] = {}
+        pendientes = [0]
+        while pendientes:
+            bloque = pendientes.pop()
+            estado = dict(entradas[bloque])
+            inicio, fin = bloques[bloque]
+            for instruccion in instrucciones[inicio:fin]:
+                self.transferir(instruccion, estado)
+            estado = {lugar: constante for lugar, constante in estado.items() if lugar in globales}
+            if estado == salidas[bloque]:
+                continue
+            salidas[bloque] = estado
+            for siguiente in sucesores[bloque]:
+                # Encuentro: se conservan las constantes en que coinciden todos los predecesores visitados
+                visitados = [salidas[previo] for previo in previos[siguiente] if salidas[previo] is not None]
+                entrada = dict(visitados[0])
+                for otro in visitados[1:]:
+                    entrada = {lugar: constante for lugar, constante in entrada.items() if otro.get(lugar) == constante}
+                if siguiente == 0:
+                    entrada = {}
+                if entrada != entradas[siguiente]:
+                    entradas[siguiente] = entrada
+                    pendientes.append(siguiente)
+                elif salidas[siguiente] is None:
+                    pendientes.append(siguiente)
+
+        nuevas = []
+        for bloque, (inicio, fin) in enumerate(bloques):
+            if entradas[bloque] is None:
+                # Inalcanzable: lo quita codigo_muerto
+                nuevas.extend(instrucciones[inicio:fin])
+                continue
+            estado = dict(entradas[bloque])
+            for instruccion in instrucciones[inicio:fin]:
+                op = instruccion[0]
+                reemplazada = reemplazar_usos(instruccion, lambda x: estado.get(x, x) if es_lugar(x) else x)
+                if op in BINARIAS:
+                    constante = self.plegar(reemplazada, estado)
+                    if constante is not None:
+                        reemplazada = (COPIAR, instruccion[1], constante, NINGUNO)
+                elif op == SALTAR_SI_FALSO or op == SALTAR_SI:
+                    condicion = reemplazada[2]
+                    if clase_operando(condicion) == CONSTANTE:
+                        verdadera = bool(self.codigo.constantes[indice_operando(condicion)])
+                        if verdadera == (op == SALTAR_SI):
+                            reemplazada = (SALTAR, NINGUNO, instruccion[3], NINGUNO)
+                        else:
+                            reemplazada = None
+                self.transferir(instruccion, estado)
+                if reemplazada is not None:
+                    nuevas.append(reemplazada)
+        self.instrucciones = nuevas
+
+    # Copias
+
+    def copias(self):
+        instrucciones = self.instrucciones
+        inicios, _ = bloques_basicos(instrucciones)
+        nuevas = []
+        for inicio, fin in rangos(inicios, len(instrucciones)):
+            copias = {}  # lugar -> lugar del que es copia
+            for instruccion in instrucciones[inicio:fin]:
+                instruccion = reemplazar_usos(instruccion, lambda x: copias.get(x, x))
+                destino = definicion(instruccion)
+                if destino != NINGUNO:
+                    copias.pop(destino, None)
+                    for lugar in [lugar for lugar, origen in copias.items() if origen == destino]:
+                        del copias[lugar]
+                    if instruccion[0] == COPIAR and es_lugar(instruccion[2]) and instruccion[2] != destino:
+                        copias[destino] = instruccion[2]
+                nuevas.append(instruccion)
+        self.instrucciones = nuevas
+
+    # Subexpresiones comunes
+
+    def subexpresiones(self):
+        instrucciones = self.instrucciones
+        inicios, _ = bloques_basicos(instrucciones)
+        nuevas = []
+        for inicio, fin in rangos(inicios, len(instrucciones)):
+            disponibles = {}  # (op, a, b) -> lugar que ya tiene el valor
+            for instruccion in instrucciones[inicio:fin]:
+                op, destino, a, b = instruccion
+                clave = None
+                if op in BINARIAS:
+                    clave = (op, min(a, b), max(a, b)) if op in CONMUTATIVAS else (op, a, b)
+                    if clave in disponibles:
+                        instruccion = (COPIAR, destino, disponibles[clave], NINGUNO)
+                        clave = None
+                destino = definicion(instruccion)
+                if destino != NINGUNO:
+                    for otra in [otra for otra, lugar in disponibles.items()
+                                 if lugar == destino or otra[1] == destino or otra[2] == destino]:
+                        del disponibles[otra]
+                    if clave is not None and destino != a and destino != b:
+                        disponibles[clave] = destino
+                nuevas.append(instruccion)
+        self.instrucciones = nuevas
+
+    # Código invariante de ciclos
+
+    def es_real(self, operando, reales):
+        clase = clase_operando(operando)
+        if clase == CONSTANTE:
+            return isinstance(self.codigo.constantes[indice_operando(operando)], float)
+        if clase == VARIABLE:
+            return self.codigo.tipos_variables[indice_operando(operando)] in TIPOS_REALES
+        return operando in reales
+
+    def temporales_reales(self):
+        # Temporales con valor real. Un temporal que se usa antes de su
+        # definición se toma por entero, que es lo que más restringe.
+        reales = set()
+        for op, destino, a, b in self.instrucciones:
+            if destino == NINGUNO or clase_operando(destino) != TEMPORAL:
+                continue
+            if op in REALES or (op == COPIAR or op in DESBORDAN) and any(
+                    x != NINGUNO and self.es_real(x, reales) for x in (a, b)):
+                reales.add(destino)
+        return reales
+
+    def puede_fallar(self, instruccion, reales):
+        # True si la instrucción puede detener la ejecución con un error
+        # (división entre cero, desbordamiento, potencia no definida)
+        op, destino, a, b = instruccion
+        if op == COPIAR or op in COMPARADORES:
+            return False
+        if op in DESBORDAN:
+            return not (self.es_real(a, reales) or self.es_real(b, reales))
+        if op == DIV or op == DIV_ENTERA or op == MOD_ENTERO:
+            if clase_operando(b) != CONSTANTE:
+                return True
+            divisor = self.codigo.constantes[indice_operando(b)]
+            # El menor entero entre -1 desborda
+            return divisor == 0 or op == DIV_ENTERA and divisor == -1
+        # MOD real (fmod de inf falla), POT y POT_ENTERA
+        return True
+
+    def invariantes(self):
+        # Un ciclo es un salto hacia atrás: desde su etiqueta hasta el salto.
+        # Se procesan de adentro hacia afuera. Sacar instrucciones de un ciclo
+        # solo las reordena dentro de su rango, así que los rangos de los
+        # ciclos que lo contienen siguen valiendo.
+        # Sacar una instrucción la ejecuta aunque el ciclo no dé ninguna
+        # vuelta o aunque esté en una rama que no se toma. Las que pueden
+        # fallar solo se sacan si están en el primer bloque del ciclo (la
+        # condición de un while, el comienzo de un do), que se ejecuta
+        # siempre al entrar, y antes de ellas no hay nada con efectos.
+        instrucciones = self.instrucciones
+        posicion = {instruccion[2]: i for i, instruccion in enumerate(instrucciones) if instruccion[0] == ETIQUETA}
+        ciclos = []
+        for j, instruccion in enumerate(instrucciones):
+            if instruccion[0] in SALTOS:
+                i = posicion[destino_salto(instruccion)]
+                if i < j:
+                    ciclos.append((j - i, i, j))
+        definiciones = {}
+        for instruccion in instrucciones:
+            destino = definicion(instruccion)
+            definiciones[destino] = definiciones.get(destino, 0) + 1
+
+        reales = self.temporales_reales()
+        for _, i, j in sorted(ciclos):
+            definidos = {definicion(instruccion) for instruccion in instrucciones[i:j + 1]}
+            sacadas = []
+            sacados = set()
+            al_entrar = True  # k está en el primer bloque y lo anterior no tiene efectos
+            for k in range(i + 1, j + 1):
+                instruccion = instrucciones[k]
+                op, destino, a, b = instruccion
+                if op in SALTOS or op == ETIQUETA:
+                    al_entrar = False
+                if self.invariante(instruccion, definiciones, definidos, sacados) and (
+                        al_entrar or not self.puede_fallar(instruccion, reales)):
+                    sacadas.append(k)
+                    sacados.add(destino)
+                elif op == LEER or op == ESCRIBIR or clase_operando(definicion(instruccion)) == VARIABLE or (
+                        op in BINARIAS and self.puede_fallar(instruccion, reales)):
+                    al_entrar = False
+            if sacadas:
+                movidas = [instrucciones[k] for k in sacadas]
+                sacadas = set(sacadas)
+                restantes = [instruccion for k, instruccion in enumerate(instrucciones[i:j + 1], i) if k not in sacadas]
+                instrucciones[i:j + 1] = movidas + restantes
+
+    def invariante(self, instruccion, definiciones, definidos, sacados):
+        op, destino, a, b = instruccion
+        if op != COPIAR and op not in BINARIAS:
+            return False
+        # Solo temporales definidos una vez en todo el programa
+        if clase_operando(destino) != TEMPORAL or definiciones.get(destino) != 1:
+            return False
+        return not any(es_lugar(x) and x in definidos and x not in sacados for x in usos(instruccion))
+
+    # Código muerto
+
+    def codigo_muerto(self):
+        while True:
+            antes = len(self.instrucciones)
+            self.inalcanzable()
+            self.saltos_inutiles()
+            self.asignaciones_muertas()
+            if len(self.instrucciones) == antes:
+                return
+
+    def inalcanzable(self):
+        instrucciones = self.instrucciones
+        inicios, sucesores = bloques_basicos(instrucciones)
+        if not inicios:
+            return
+        alcanzados = {0}
+        pendientes = [0]
+        while pendientes:
+            for siguiente in sucesores[pendientes.pop()]:
+                if siguiente not in alcanzados:
+                    alcanzados.add(siguiente)
+                    pendientes.append(siguiente)
+        nuevas = []
+        for bloque, (inicio, fin) in enumerate(rangos(inicios, len(instrucciones))):
+            if bloque in alcanzados:
+                nuevas.extend(instrucciones[inicio:fin])
+        self.instrucciones = nuevas
+
+    def saltos_inutiles(self):
+        # Saltos a la etiqueta que sigue (pasando solo por etiquetas) y etiquetas sin saltos
+        instrucciones = self.instrucciones
+        nuevas = []
+        for i, instruccion in enumerate(instrucciones):
+            if instruccion[0] in SALTOS:
+                destino = destino_salto(instruccion)
+                k = i + 1
+                while k < len(instrucciones) and instrucciones[k][0] == ETIQUETA and instrucciones[k][2] != destino:
+                    k += 1
+                if k < len(instrucciones) and instrucciones[k][0] == ETIQUETA:
+                    continue
+            nuevas.append(instruccion)
+        usadas = {destino_salto(instruccion) for instruccion in nuevas if instruccion[0] in SALTOS}
+        self.instrucciones = [instruccion for instruccion in nuevas
+                              if instruccion[0] != ETIQUETA or instruccion[2] in usadas]
+
+    def asignaciones_muertas(self):
+        instrucciones = self.instrucciones
+        inicios, sucesores = bloques_basicos(instrucciones)
+        if not inicios:
+            return
+        bloques = rangos(inicios, len(instrucciones))
+        variables = {lugar for instruccion in instrucciones for lugar in (definicion(instruccion),) + usos(instruccion)
+                     if es_lugar(lugar) and clase_operando(lugar) == VARIABLE}
+        # Vivacidad hacia atrás por bloques hasta el punto fijo
+        usa = []
+        define = []
+        for inicio, fin in bloques:
+            usados, definidos = set(), set()
+            for instruccion in instrucciones[inicio:fin]:
+                usados.update(x for x in usos(instruccion) if es_lugar(x) and x not in definidos)
+                destino = definicion(instruccion)
+                if destino != NINGUNO:
+                    definidos.add(destino)
+            usa.append(usados)
+            define.append(definidos)
+        # El último bloque puede terminar el programa si no acaba en goto
+        ultimo = len(bloques) - 1
+        termina = instrucciones[-1][0] != SALTAR
+        vivas_salida = [set() for _ in bloques]
+        vivas_entrada = [set() for _ in bloques]
+        cambio = True
+        while cambio:
+            cambio = False
+            for bloque in reversed(range(len(bloques))):
+                salida = set().union(*(vivas_entrada[s] for s in sucesores[bloque]))
+                if bloque == ultimo and termina:
+                    salida |= variables
+                entrada = usa[bloque] | (salida - define[bloque])
+                if salida != vivas_salida[bloque] or entrada != vivas_entrada[bloque]:
+                    vivas_salida[bloque] = salida
+                    vivas_entrada[bloque] = entrada
+                    cambio = True
+
+        # Una operación que puede fallar se conserva aunque su resultado no se
+        # use: quitarla cambiaría un error de ejecución por un programa que sigue
+        reales = self.temporales_reales()
+        nuevas = []
+        for bloque, (inicio, fin) in enumerate(bloques):
+            vivas = set(vivas_salida[bloque])
+            conservadas = []
+            for instruccion in reversed(instrucciones[inicio:fin]):
+                destino = definicion(instruccion)
+                op = instruccion[0]
+                muerta = destino != NINGUNO and op != LEER and (destino not in vivas or (op == COPIAR and instruccion[2] == destino))
+                if muerta and not (op in BINARIAS and self.puede_fallar(instruccion, reales)):
+                    continue
+                if destino != NINGUNO:
+                    vivas.discard(destino)
+                vivas.update(x for x in usos(instruccion) if es_lugar(x))
+                conservadas.append(instruccion)
+            nuevas.extend(reversed(conservadas))
+        self.instrucciones = nuevas
+
+
+def optimizar(codigo):
+    # Devuelve (código optimizado, optimizador con el reporte de cada pasada)
+    optimizador = Optimizador(codigo)
+    return optimizador.optimizar(), optimizador
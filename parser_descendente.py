@@ -0,0 +1,311 @@
+# Parser alternativo a las tablas LALR de PLY: descenso recursivo para las
+# sentencias y escalada de precedencia para las expresiones. Recibe la lista de
+# tokens del lexer de sintactic.py y construye, con el mismo constructor de
+# arena.py, exactamente el mismo árbol que las acciones p_* de la gramática,
+# incluidas las decisiones que PLY toma al resolver los conflictos
+# shift/reduce (siempre shift).
+
+TIPOS = ('INT', 'INTEGER', 'FLOAT', 'CHAR', 'STRING', 'BOOLEAN', 'DOUBLE')
+INICIO_SENTENCIA = ('IF', 'WHILE', 'DO', 'ELSE', 'CIN', 'COUT', 'ID', 'LPAREN', 'NUMBER')
+RELACIONALES = ('LESS', 'LESSEQUAL', 'GREATER', 'GREATEREQUAL', 'DEQUAL', 'NEQUAL')
+OPERADORES_UNARIOS = ('PLUSPLUS', 'MINUSMINUS')
+
+
+class ErrorSintactico(Exception):
+    # token es el LexToken donde se detectó el error, o None al final del archivo
+    def __init__(self, token):
+        super().__init__(token)
+        self.token = token
+
+
+def niveles_binarios(precedence):
+    # Nivel de cada operador binario a partir de la tabla precedence de PLY.
+    # Los relacionales no están en la tabla: son el nivel más bajo y no
+    # asociativos (expresion : expresionSimple relacionOp expresionSimple).
+    # Todos los demás asocian a la izquierda como en las reglas de la gramática
+    # (factor : factor POWER primario), aunque la tabla declare POWER 'right'.
+    niveles = {tipo: 0 for tipo in RELACIONALES}
+    nivel = 1
+    for asociatividad, *operadores in precedence:
+        operadores = [op for op in operadores if op not in OPERADORES_UNARIOS]
+        if operadores:
+            for op in operadores:
+                niveles[op] = nivel
+            nivel += 1
+    return niveles
+
+
+class ParserDescendente:
+    def __init__(self, precedence):
+        self.niveles = niveles_binarios(precedence)
+
+    def preparar(self, tokens, constructor):
+        self.constructor = constructor
+        self.tipos = [token.type for token in tokens]
+        self.valores = [token.value for token in tokens]
+        self.tokens = list(tokens)
+        # Fin de archivo
+        self.tipos.append(None)
+        self.valores.append(None)
+        self.tokens.append(None)
+        self.pos = 0
+
+    def liberar(self):
+        # No retener los tokens del último análisis
+        self.tokens = self.tipos = self.valores = self.constructor = None
+
+    def parse(self, tokens, constructor):
+        # Devuelve el AST o lanza ErrorSintactico con el primer token inválido
+        self.preparar(tokens, constructor)
+        try:
+            return self.programa()
+        finally:
+            self.liberar()
+
+    def parse_fragmento(self, tokens, constructor, fin, declaraciones=False):
+        # Para el análisis incremental: lista de las sentencias (o de las
+        # declaraciones de variables) que ocupan exactamente tokens[:fin]. Los
+        # tokens desde fin solo sirven para decidir dónde termina la última;
+        # si alguna los consume, el fragmento no se puede analizar por separado.
+        self.preparar(tokens, constructor)
+        try:
+            elementos = constructor.lista()
+            while self.pos < fin:
+                if self.tipos[self.pos] not in (TIPOS if declaraciones else INICIO_SENTENCIA):
+                    self.error()
+                constructor.agregar(elementos, self.declaracion_variable() if declaraciones else self.sentencia())
+            if self.pos != fin:
+                self.error()
+            return elementos
+        finally:
+            self.liberar()
+
+    def error(self):
+        raise ErrorSintactico(self.tokens[self.pos])
+
+    def esperar(self, tipo):
+        if self.tipos[self.pos] != tipo:
+            self.error()
+        valor = self.valores[self.pos]
+        self.pos += 1
+        return valor
+
+    def programa(self):
+        token = self.tokens[self.pos]
+        main = self.esperar('MAIN')
+        self.esperar('LBRACE')
+        declaraciones = self.lista_declaracion()
+        self.esperar('RBRACE')
+        if self.tipos[self.pos] is not None:
+            self.error()
+        return self.constructor.nodo(main, declaraciones, token)
+
+    def lista_declaracion(self):
+        # Las sentencias consecutivas forman una sola lista (shift en vez de
+        # cerrar la declaración); un programa vacío da [[None]].
+        constructor = self.constructor
+        declaraciones = constructor.lista()
+        vacia = True
+        while True:
+            tipo = self.tipos[self.pos]
+            if tipo in TIPOS:
+                constructor.agregar(declaraciones, self.declaracion_variable())
+            elif tipo in INICIO_SENTENCIA or vacia:
+                constructor.agregar(declaraciones, self.lista_sentencias())
+            else:
+                return declaraciones
+            vacia = False
+
+    def declaracion_variable(self):
+        constructor = self.constructor
+        tokens = self.tokens
+        token_tipo = tokens[self.pos]
+        self.pos += 1
+        token_nombre = tokens[self.pos]
+        nombre = self.esperar('ID')
+        if self.tipos[self.pos] == 'EQUAL':
+            token_igual = tokens[self.pos]
+            self.pos += 1
+            valor = self.expresion()
+            self.esperar('SEMICOLON')
+            variable = constructor.nodo(nombre, constructor.lista_de(constructor.texto(token_igual.value, token_igual), valor), token_nombre)
+            return constructor.nodo(token_tipo.value, constructor.lista_de(variable), token_tipo)
+        variables = constructor.lista_de(constructor.nodo(nombre, constructor.lista(), token_nombre))
+        while self.tipos[self.pos] == 'COMMA':
+            self.pos += 1
+            token_nombre = tokens[self.pos]
+            nombre = self.esperar('ID')
+            constructor.agregar(variables, constructor.nodo(nombre, constructor.lista(), token_nombre))
+        self.esperar('SEMICOLON')
+        return constructor.nodo(token_tipo.value, variables, token_tipo)
+
+    def lista_sentencias(self):
+        # Lista vacía: [None], igual que la regla listaSentencias : empty
+        constructor = self.constructor
+        if self.tipos[self.pos] not in INICIO_SENTENCIA:
+            return constructor.lista_de(constructor.nulo())
+        sentencias = constructor.lista()
+        while self.tipos[self.pos] in INICIO_SENTENCIA:
+            constructor.agregar(sentencias, self.sentencia())
+        return sentencias
+
+    def bloque(self):
+        self.esperar('LBRACE')
+        sentencias = self.lista_sentencias()
+        self.esperar('RBRACE')
+        return sentencias
+
+    def sentencia(self):
+        tipo = self.tipos[self.pos]
+        if tipo == 'ID':
+            siguiente = self.tipos[self.pos + 1]
+            if siguiente == 'EQUAL' or siguiente == 'DEQUAL':
+                return self.asignacion()
+            if siguiente in OPERADORES_UNARIOS:
+                return self.incremento()
+            return self.andor()
+        if tipo == 'IF':
+            return self.seleccion()
+        if tipo == 'WHILE':
+            return self.iteracion()
+        if tipo == 'DO':
+            return self.repeticion()
+        if tipo == 'ELSE':
+            return self.elseif()
+        constructor = self.constructor
+        token = self.tokens[self.pos]
+        if tipo == 'CIN':
+            self.pos += 1
+            token_nombre = self.tokens[self.pos]
+            nombre = self.esperar('ID')
+            self.esperar('SEMICOLON')
+            return constructor.nodo(token.value, constructor.lista_de(constructor.texto(nombre, token_nombre)), token)
+        if tipo == 'COUT':
+            self.pos += 1
+            valor = self.expresion()
+            self.esperar('SEMICOLON')
+            return constructor.nodo(token.value, constructor.lista_de(valor), token)
+        return self.andor()
+
+    def asignacion(self):
+        constructor = self.constructor
+        token_nombre = self.tokens[self.pos]
+        token_operador = self.tokens[self.pos + 1]
+        self.pos += 2
+        # sentExpresion
+        tipo = self.tipos[self.pos]
+        if tipo == 'SEMICOLON':
+            self.pos += 1
+            valor = constructor.nulo()
+        else:
+            if tipo == 'ID' and self.tipos[self.pos + 1] in OPERADORES_UNARIOS:
+                valor = self.incremento()
+            else:
+                valor = self.expresion()
+            self.esperar('SEMICOLON')
+        nombre = constructor.texto(token_nombre.value, token_nombre)
+        return constructor.nodo(token_operador.value, constructor.lista_de(nombre, valor), token_operador)
+
+    def incremento(self):
+        constructor = self.constructor
+        token_nombre = self.tokens[self.pos]
+        token_operador = self.tokens[self.pos + 1]
+        self.pos += 2
+        self.esperar('SEMICOLON')
+        nombre = token_nombre.value
+        operacion = constructor.nodo('+' if token_operador.value == '++' else '-', constructor.lista_de(
+            constructor.texto(nombre, token_nombre), constructor.texto('1')), token_operador)
+        return constructor.nodo('=', constructor.lista_de(constructor.texto(nombre, token_nombre), operacion))
+
+    def andor(self):
+        izquierda = self.expresion()
+        if self.tipos[self.pos] not in ('AND', 'OR'):
+            self.error()
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return self.constructor.nodo(token.value, self.constructor.lista_de(izquierda, self.expresion()), token)
+
+    def seleccion(self):
+        constructor = self.constructor
+        token = self.tokens[self.pos]
+        self.pos += 1
+        if self.tipos[self.pos] == 'LPAREN':
+            # IF LPAREN andor RPAREN ... o una expresión que empieza con paréntesis:
+            # se decide al ver AND/OR o RPAREN después de la primera expresión.
+            self.pos += 1
+            condicion = self.expresion()
+            if self.tipos[self.pos] in ('AND', 'OR'):
+                token_operador = self.tokens[self.pos]
+                self.pos += 1
+                condicion = constructor.nodo(token_operador.value, constructor.lista_de(condicion, self.expresion()), token_operador)
+                self.esperar('RPAREN')
+            else:
+                self.esperar('RPAREN')
+                condicion = self.expresion(condicion)
+        else:
+            condicion = self.expresion()
+        hijos = constructor.lista_de(condicion, self.bloque())
+        if self.tipos[self.pos] == 'ELSE':
+            constructor.agregar(hijos, self.elseif())
+        return constructor.nodo(token.value, hijos, token)
+
+    def elseif(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return self.constructor.nodo(token.value, self.bloque(), token)
+
+    def iteracion(self):
+        constructor = self.constructor
+        token = self.tokens[self.pos]
+        self.pos += 1
+        hijos = constructor.lista_de(self.expresion())
+        if self.tipos[self.pos] == 'LBRACE':
+            constructor.agregar(hijos, self.bloque())
+        return constructor.nodo(token.value, hijos, token)
+
+    def repeticion(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        sentencias = self.bloque()
+        if self.tipos[self.pos] != 'WHILE':
+            self.error()
+        return self.constructor.nodo(token.value, self.constructor.lista_de(sentencias, self.iteracion()), token)
+
+    def expresion(self, izquierda=None):
+        # izquierda: primario ya leído (la condición entre paréntesis de un if)
+        return self.binaria(0, izquierda)
+
+    def binaria(self, minimo, izquierda=None):
+        # Escalada de precedencia sobre self.niveles
+        if izquierda is None:
+            izquierda = self.primario()
+        tipos = self.tipos
+        niveles = self.niveles
+        constructor = self.constructor
+        while True:
+            tipo = tipos[self.pos]
+            nivel = niveles.get(tipo)
+            if nivel is None or nivel < minimo:
+                return izquierda
+            token = self.tokens[self.pos]
+            self.pos += 1
+            # Como en la gramática, solo POWER es un terminal en su regla; los
+            # demás operadores vienen de relacionOp, sumaOp y mulOp.
+            izquierda = constructor.nodo(token.value, constructor.lista_de(izquierda, self.binaria(nivel + 1)),
+                                         token if tipo == 'POWER' else None)
+            if nivel == 0:
+                # Relacionales no asociativos: a < b < c es un error en el segundo '<'
+                minimo = 1
+
+    def primario(self):
+        tipo = self.tipos[self.pos]
+        if tipo == 'ID' or tipo == 'NUMBER':
+            token = self.tokens[self.pos]
+            self.pos += 1
+            return self.constructor.nodo(token.value, self.constructor.lista(), token)
+        if tipo == 'LPAREN':
+            self.pos += 1
+            valor = self.expresion()
+            self.esperar('RPAREN')
+            return valor
+        self.error()
@@ -0,0 +1,39 @@
+import re
+from array import array
+from bisect import bisect_left
+
+# Índice de inicios de línea de un texto fuente. Convierte posiciones
+# absolutas (lexpos de PLY, rangos del árbol) en línea y columna por búsqueda
+# binaria, sin volver a leer el texto ni los archivos de tokens.
+
+SALTO = re.compile('\n')
+
+
+class IndiceLineas:
+    def __init__(self, text):
+        # saltos[i] es la posición del (i+1)-ésimo '\n'
+        self.saltos = array('I', [m.start() for m in SALTO.finditer(text)])
+        self.longitud = len(text)
+
+    def __len__(self):
+        # Número de líneas
+        return len(self.saltos) + 1
+
+    def linea(self, offset):
+        # Línea (desde 1) de la posición: uno más que los saltos anteriores a ella
+        return bisect_left(self.saltos, offset) + 1
+
+    def inicio_linea(self, linea):
+        return 0 if linea <= 1 else self.saltos[linea - 2] + 1
+
+    def posicion(self, offset):
+        # (línea desde 1, columna desde 0), como los índices "línea.columna" de Tk
+        linea = self.linea(offset)
+        return linea, offset - self.inicio_linea(linea)
+
+    def offset(self, linea, columna):
+        return self.inicio_linea(linea) + columna
+
+    def indice_tk(self, offset):
+        linea, columna = self.posicion(offset)
+        return f"{linea}.{columna}"
@@ -0,0 +1,148 @@
+import io
+import sys
+from contextlib import redirect_stdout
+from compilacion import compile_source
+from maquina import ejecutar
+from traductor_python import compilar_python
+
+# Programas que alguna vez rompieron el compilador y lo que se espera de cada
+# uno. Cada caso es (descripción, programa, errores): errores son fragmentos
+# de los diagnósticos esperados, en orden (una lista vacía si compila sin
+# errores). Una excepción dentro de una fase también cuenta como fallo.
+# EJECUCIONES son (descripción, programa, entrada, salida): el programa se
+# ejecuta en la máquina virtual con el código intermedio sin optimizar y
+# optimizado y como código de Python, y las tres salidas deben ser la esperada.
+# FALLOS son (descripción, programa, entrada, errores): la máquina virtual y
+# el código de Python deben terminar con un error que contenga alguno de los
+# fragmentos, sin lanzar excepciones.
+# Uso: python regresiones.py
+
+CASOS = [
+    ("potencia de un entero que recibió un real",
+     "main { integer x, y; x = 2.5; y = x ^ 2; }",
+     ["Incompatibilidad de tipos en asignación para 'x'"]),
+    ("divisor que cambia dentro del ciclo",
+     "main { integer d, i, y; d = 0; i = 0; while (i < 3) { if (i > 0) { y = 10 / d; } d = 2; i = i + 1; } }",
+     []),
+    ("divisor que depende de la rama",
+     "main { integer d, y; cin y; if (y > 0) { d = 0; } else { d = 1; } y = 10 / d; }",
+     []),
+    ("división entre cero conocida",
+     "main { integer d, y; d = 0; y = 10 / d; }",
+     ["División entre cero en la operación '/'"]),
+]
+
+EJECUCIONES = [
+    ("do con bloque en el while",
+     "main { integer x, y; x = 0; y = 0; do { x = x + 1; } while (x < 3) { y = y + 10; } cout x; cout y; }",
+     "", "3\n20\n"),
+    ("do sin bloque en el while",
+     "main { integer x; x = 0; do { x = x + 1; } while (x < 3) cout x; }",
+     "", "3\n"),
+    ("potencia invariante en un ciclo que no da ninguna vuelta",
+     "main { integer x, i, z; cin x; cin i; while (i > 0) { z = x ^ 100 + i; i = i - 1; } cout i; }",
+     "10 0", "0\n"),
+    ("multiplicación invariante en la condición del while",
+     "main { integer n, i, s; cin n; i = 0; s = 0; while (i < n * 2) { s = s + i; i = i + 1; } cout s; }",
+     "3", "15\n"),
+    ("cero negativo plegado",
+     "main { double p, q; cin q; p = 0.0 * (0.0 - 0.5); cout p; p = q * 0.0; cout p; }",
+     "2.0", "-0.0\n0.0\n"),
+]
+
+FALLOS = [
+    ("constante fuera del rango de los enteros",
+     "main { integer x; x = 99999999999999999999; cout x; }",
+     "", ("no cabe en un entero de 64 bits",)),
+    ("producto de variables conocidas fuera del rango de los enteros",
+     "main { integer a, b; b = 99999; a = b * (b ^ 3); cout a; }",
+     "", ("Desbordamiento numérico",)),
+    ("producto de constantes fuera del rango de los enteros",
+     "main { integer x; x = 3037000500 * 3037000500; cout x; }",
+     "", ("Desbordamiento numérico",)),
+    ("división entera entre cero con el resultado sin usar",
+     "main { integer a, b; cin b; a = 10 / b; a = 2; cout a; }",
+     "0", ("División entre cero",)),
+    ("división real entre cero con el resultado sin usar",
+     "main { double p, q; cin q; p = 1.0 / q; p = 2.0; cout p; }",
+     "0", ("División entre cero",)),
+    ("producto que desborda con el resultado sin usar",
+     "main { integer a, b; cin b; a = b * b * b * b * b; a = 1; cout a; }",
+     "100000", ("Desbordamiento numérico",)),
+    ("incremento del mayor entero",
+     "main { integer a; cin a; a++; cout a; }",
+     "9223372036854775807", ("Desbordamiento numérico",)),
+    ("cin de un entero fuera de rango",
+     "main { integer a; cin a; cout a; }",
+     "9223372036854775808", ("Desbordamiento numérico",)),
+]
+
+
+def revisar(programa, errores):
+    # Descripción de la diferencia con lo esperado, o None si coincide
+    with redirect_stdout(io.StringIO()):
+        try:
+            resultado = compile_source(programa)
+        except Exception as e:
+            return f"excepción {type(e).__name__}: {e}"
+    obtenidos = resultado.errores()
+    if len(obtenidos) != len(errores) or not all(fragmento in mensaje for fragmento, mensaje in zip(errores, obtenidos)):
+        return f"se esperaba {errores}, se obtuvo {obtenidos}"
+    return None
+
+
+def revisar_ejecucion(programa, entrada, salida):
+    with redirect_stdout(io.StringIO()):
+        resultado = compile_source(programa)
+    if not resultado.exito:
+        return f"no compila: {resultado.errores()}"
+    for nombre, codigo in (('sin optimizar', resultado.intermedio), ('optimizado', resultado.optimizado)):
+        ejecucion = ejecutar(codigo, resultado.tabla_simbolos, entrada)
+        if ejecucion.error is not None or ejecucion.salida != salida:
+            return f"{nombre}: se esperaba {salida!r}, se obtuvo {ejecucion.salida!r} (error: {ejecucion.error})"
+    with redirect_stdout(io.StringIO()):
+        ejecucion = compilar_python(programa).ejecutar(entrada)
+    if ejecucion.error is not None or ejecucion.salida != salida:
+        return f"python: se esperaba {salida!r}, se obtuvo {ejecucion.salida!r} (error: {ejecucion.error})"
+    return None
+
+
+def revisar_fallo(programa, entrada, errores):
+    with redirect_stdout(io.StringIO()):
+        resultado = compile_source(programa)
+    if not resultado.exito:
+        return f"no compila: {resultado.errores()}"
+    for nombre, codigo in (('sin optimizar', resultado.intermedio), ('optimizado', resultado.optimizado)):
+        try:
+            ejecucion = ejecutar(codigo, resultado.tabla_simbolos, entrada)
+        except Exception as e:
+            return f"{nombre}: excepción {type(e).__name__}: {e}"
+        if ejecucion.error is None or not any(fragmento in ejecucion.error for fragmento in errores):
+            return f"{nombre}: se esperaba un error con {errores}, se obtuvo {ejecucion.error!r}"
+    with redirect_stdout(io.StringIO()):
+        ejecucion = compilar_python(programa).ejecutar(entrada)
+    if ejecucion.error is None or not any(fragmento in ejecucion.error for fragmento in errores):
+        return f"python: se esperaba un error con {errores}, se obtuvo {ejecucion.error!r}"
+    return None
+
+
+if __name__ == "__main__":
+    fallos = 0
+    for descripcion, programa, errores in CASOS:
+        diferencia = revisar(programa, errores)
+        if diferencia is not None:
+            fallos += 1
+            print(f"FALLA  {descripcion}: {diferencia}")
+    for descripcion, programa, entrada, salida in EJECUCIONES:
+        diferencia = revisar_ejecucion(programa, entrada, salida)
+        if diferencia is not None:
+            fallos += 1
+            print(f"FALLA  {descripcion}: {diferencia}")
+    for descripcion, programa, entrada, errores in FALLOS:
+        diferencia = revisar_fallo(programa, entrada, errores)
+        if diferencia is not None:
+            fallos += 1
+            print(f"FALLA  {descripcion}: {diferencia}")
+    total = len(CASOS) + len(EJECUCIONES) + len(FALLOS)
+    print(f"{total - fallos} de {total} casos correctos")
+    sys.exit(1 if fallos else 0)
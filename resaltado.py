@@ -0,0 +1,175 @@
+from lexico import Lexer
+
+# Mensaje con el que el lexer marca un comentario /* que no se cierra
+COMENTARIO_SIN_CERRAR = 'Comentario de varias líneas sin cerrar'
+
+
+def lexear_linea(linea, en_comentario):
+    # Analiza una sola línea partiendo del estado guardado al inicio de la misma.
+    # Devuelve la lista de tokens (tipo, columna_inicio, columna_fin) y el
+    # estado con el que empieza la línea siguiente (True si seguimos dentro de /* */).
+    tokens = []
+    inicio = 0
+
+    if en_comentario:
+        cierre = linea.find('*/')
+        if cierre == -1:
+            if linea:
+                tokens.append(('COMENTARIO', 0, len(linea)))
+            return tokens, True
+        inicio = cierre + 2
+        tokens.append(('COMENTARIO', 0, inicio))
+
+    resto = linea[inicio:]
+    if not resto:
+        return tokens, False
+
+    lexer = Lexer(resto)
+    while True:
+        token = lexer.get_next_token()
+        if token.token_type == 'EOF':
+            break
+        col_inicio = inicio + token.column - 1
+        col_fin = inicio + lexer.pos
+
+        if token.token_type == 'ERROR' and token.value == COMENTARIO_SIN_CERRAR:
+            # El comentario continúa en las líneas siguientes
+            tokens.append(('COMENTARIO', col_inicio, len(linea)))
+            return tokens, True
+
+        tokens.append((token.token_type, col_inicio, col_fin))
+
+    return tokens, False
+
+
+class ResaltadorIncremental:
+    # Guarda, para cada línea del buffer, su texto, el estado del lexer al
+    # inicio de la línea (dentro o fuera de un comentario de varias líneas) y
+    # los tokens encontrados en ella. Al editar solo se vuelve a analizar
+    # desde la primera línea modificada hasta que el estado vuelve a coincidir.
+    # Las líneas se analizan bajo demanda, hasta la última que se pidió (la
+    # parte visible del editor): abrir un archivo grande no lo recorre entero.
+    def __init__(self):
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.lineas = []
+        self.estados = [False]  # estados[i] = estado al inicio de la línea i, para i <= validas
+        self.tokens = []        # Tokens de las líneas ya analizadas, [0, validas)
+        self.validas = 0
+        self.pintadas = []      # pintadas[i]: el editor ya tiene las etiquetas de la línea i
+
+    def actualizar(self, texto, hasta=None):
+        # Devuelve (linea_inicio, linea_fin, tokens) con las líneas (base 0,
+        # fin exclusivo) que se volvieron a analizar, o None si no hubo cambios.
+        # No analiza más allá de la línea hasta (todas si es None); lo que sigue
+        # queda pendiente para asegurar().
+        nuevas = texto.split('\n')
+        viejas = self.lineas
+
+        # Prefijo común
+        limite = min(len(nuevas), len(viejas))
+        ini = 0
+        while ini < limite and nuevas[ini] == viejas[ini]:
+            ini += 1
+        if ini == len(nuevas) == len(viejas):
+            return None
+
+        # Sufijo común (sin cruzarse con el prefijo)
+        fin_viejo = len(viejas)
+        fin_nuevo = len(nuevas)
+        while fin_viejo > ini and fin_nuevo > ini and nuevas[fin_nuevo - 1] == viejas[fin_viejo - 1]:
+            fin_viejo -= 1
+            fin_nuevo -= 1
+
+        self.lineas = nuevas
+        self.pintadas[ini:fin_viejo] = [False] * (fin_nuevo - ini)
+        if ini >= self.validas:
+            # El cambio está después de lo analizado
+            return ini, ini, []
+
+        hasta = len(nuevas) if hasta is None else hasta
+        desplazamiento = fin_nuevo - fin_viejo
+        estado = self.estados[ini]
+        nuevos_tokens = []
+        nuevos_estados = []
+        coincide = False
+        i = ini
+
+        while i < len(nuevas):
+            if i >= fin_nuevo:
+                # Línea sin cambios: si el estado coincide con el que tenía
+                # antes, el resto del flujo de tokens es idéntico.
+                j = i - desplazamiento
+                if j >= self.validas:
+                    break
+                if self.estados[j] == estado:
+                    coincide = True
+                    break
+            if i >= hasta:
+                break
+            tokens_linea, estado = lexear_linea(nuevas[i], estado)
+            nuevos_tokens.append(tokens_linea)
+            nuevos_estados.append(estado)
+            i += 1
+
+        self.pintadas[ini:i] = [False] * (i - ini)
+        if coincide:
+            # i es la primera línea nueva que se reutiliza; en el buffer viejo es i - desplazamiento
+            fin_reemplazo = i - desplazamiento
+            self.tokens[ini:fin_reemplazo] = nuevos_tokens
+            self.estados[ini + 1:fin_reemplazo + 1] = nuevos_estados
+            self.validas += desplazamiento
+        else:
+            # Desde i los tokens guardados ya no sirven: se analizan cuando se pidan
+            self.tokens[ini:] = nuevos_tokens
+            self.estados[ini + 1:] = nuevos_estados
+            self.validas = i
+            self.pintadas[i:] = [False] * (len(nuevas) - i)
+
+        return ini, i, nuevos_tokens
+
+    def asegurar(self, hasta):
+        # Analiza las líneas pendientes hasta la línea hasta (exclusiva)
+        hasta = min(hasta, len(self.lineas))
+        estado = self.estados[self.validas]
+        while self.validas < hasta:
+            tokens_linea, estado = lexear_linea(self.lineas[self.validas], estado)
+            self.tokens.append(tokens_linea)
+            self.estados.append(estado)
+            self.validas += 1
+
+    def rangos_sin_pintar(self, inicio, fin):
+        # Líneas de [inicio, fin) que el editor todavía no resaltó. Devuelve
+        # los tramos de líneas (base 0, fin exclusivo) a limpiar y, por tipo de
+        # token, la lista plana de índices de Tk "línea.columna" inicio, fin,
+        # inicio, fin... lista para un solo tag_add. Las marca como pintadas.
+        inicio = max(inicio, 0)
+        fin = min(fin, len(self.lineas))
+        self.asegurar(fin)
+        tramos = []
+        rangos = {}
+        pintadas = self.pintadas
+        for i in range(inicio, fin):
+            if pintadas[i]:
+                continue
+            pintadas[i] = True
+            if tramos and tramos[-1][1] == i:
+                tramos[-1][1] = i + 1
+            else:
+                tramos.append([i, i + 1])
+            numero = i + 1
+            for tipo, col_inicio, col_fin in self.tokens[i]:
+                indices = rangos.get(tipo)
+                if indices is None:
+                    indices = rangos[tipo] = []
+                indices.append(f"{numero}.{col_inicio}")
+                indices.append(f"{numero}.{col_fin}")
+        return tramos, rangos
+
+    def todos_los_tokens(self):
+        # Recorre todos los tokens como (linea base 1, col_inicio, col_fin, tipo)
+        self.asegurar(len(self.lineas))
+        for numero, tokens_linea in enumerate(self.tokens, start=1):
+            for tipo, col_inicio, col_fin in tokens_linea:
+                yield numero, col_inicio, col_fin, tipo
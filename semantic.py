@@ -1,257 +1,564 @@
 import json
+from array import array
+from bisect import bisect_left
+from ast import literal_eval
+from arena import ArenaAST, es_arbol_binario
+from constantes import Plegador, convertir
 
 class SymbolTable:
+    # Tabla de símbolos con ámbitos anidados. indice lleva cada nombre a la
+    # pila de sus enlaces visibles (el último es el del ámbito más interno) y
+    # ambitos guarda los nombres declarados en cada ámbito abierto, para
+    # cerrarlo sacando solo esos nombres.
     def __init__(self):
-        self.symbols = {}
+        self.indice = {}
+        self.ambitos = [[]]
+        self.registros = []  # Todos los enlaces, en orden de registro
         self.loc_counter = 0  # Contador para el número de registro
 
+    def entrar_ambito(self):
+        self.ambitos.append([])
+
+    def salir_ambito(self):
+        for name in self.ambitos.pop():
+            enlaces = self.indice[name]
+            enlaces.pop()
+            if not enlaces:
+                del self.indice[name]
+
     def add(self, name, var_type, value=None, line=None):
-        if name in self.symbols:
-            # Si el tipo es diferente, generar error
-            if self.symbols[name]['type'] != var_type:
-                first_declared_line = self.symbols[name]['line'][0]  # Obtener la primera línea de declaración
-                raise Exception(f"Error: Variable '{name}' redeclarada con un tipo diferente en la línea {line}."
-                                f"La declaración original fue en la línea {first_declared_line}.")
-            else:               
-                # Actualizar línea si es el mismo tipo
-                if line is not None and line not in self.symbols[name]['line']:  # Asegurarse de que no se repita
-                    print(f"Actualizando línea para la variable '{name}': {line}")
-                    self.symbols[name]['line'].append(line)
-        else:
-            print(f"Añadiendo nueva variable '{name}' de tipo '{var_type}' en línea {line}.")
-            self.symbols[name] = {
-                'type': var_type,
-                'value': value,
-                'line': [line] if line is not None else [],  # Lista de líneas donde aparece
-                'loc': self.loc_counter  # Usar loc_counter como el número de registro
-            }
-            self.loc_counter += 1  # Incrementar el contador después de añadir una variable
-
-
-    def get(self, name, line):
-        if name in self.symbols:
-            return self.symbols[name]
-        else:
-            raise Exception(f"Error: Variable '{name}' no está declarada antes de su uso en la línea {line}.")
+        # Devuelve el enlace del nombre en el ámbito actual. Si ya existía con
+        # otro tipo se devuelve sin cambios: quien llama reporta la redeclaración.
+        nivel = len(self.ambitos) - 1
+        enlaces = self.indice.get(name)
+        if enlaces and enlaces[-1]['nivel'] == nivel:
+            enlace = enlaces[-1]
+            if enlace['type'] == var_type:
+                agregar_linea(enlace['line'], line)
+            return enlace
+        enlace = {
+            'name': name,
+            'type': var_type,
+            'value': value,
+            'line': array('I'),  # Líneas donde aparece, ordenadas y sin repetir
+            'loc': self.loc_counter,  # Usar loc_counter como el número de registro
+            'nivel': nivel,
+        }
+        agregar_linea(enlace['line'], line)
+        self.indice.setdefault(name, []).append(enlace)
+        self.ambitos[-1].append(name)
+        self.registros.append(enlace)
+        self.loc_counter += 1
+        return enlace
+
+    def get(self, name):
+        # Enlace visible del nombre, o None si no está declarado
+        enlaces = self.indice.get(name)
+        return enlaces[-1] if enlaces else None
 
     def update(self, name, value, line=None):
-        if name in self.symbols:
-            self.symbols[name]['value'] = value
-            if line is not None and line not in self.symbols[name]['line']:  # Agregar línea solo si no está ya presente
-                self.symbols[name]['line'].append(line)  # Agregar la nueva línea si se proporciona
-        else:
-            raise Exception(f"Error: Variable '{name}' no está declarada.")
+        enlace = self.get(name)
+        if enlace is not None:
+            enlace['value'] = value
+            agregar_linea(enlace['line'], line)
+        return enlace
+
+    def a_dict(self):
+        # Vista serializable: nombre -> datos del último enlace registrado con ese nombre
+        return {enlace['name']: {'type': enlace['type'], 'value': enlace['value'],
+                                 'line': list(enlace['line']), 'loc': enlace['loc']}
+                for enlace in self.registros}
 
     def __repr__(self):
-        return json.dumps(self.symbols, indent=2)
-
-# Cargar las líneas del archivo analisisSyntax.txt
-def load_lines_from_file(file_path):
-    line_mapping = {}
+        return json.dumps(self.a_dict(), indent=2)
+
+
+def agregar_linea(lineas, line):
+    # El recorrido es en orden del texto: casi siempre basta comparar con la
+    # última línea. Las líneas desconocidas (árbol sin rangos) no se guardan.
+    if not isinstance(line, int):
+        return
+    if not lineas or lineas[-1] < line:
+        lineas.append(line)
+        return
+    pos = bisect_left(lineas, line)
+    if lineas[pos] != line:
+        lineas.insert(pos, line)
+
+# Cargar el árbol sintáctico de arbol.txt, en texto o en binario (sintactic.py --binario).
+# El binario no se convierte entero: se devuelve una vista que decodifica
+# cada nodo al recorrerlo (arena.NodoArena), con los rangos de cada nodo. Las
+# columnas se copian y el archivo no queda mapeado (ArenaAST.leer).
+def load_ast_from_file(file_path):
+    if es_arbol_binario(file_path):
+        return ArenaAST.leer(file_path).vista()
     with open(file_path, 'r') as file:
-        for line in file:
-            parts = line.strip().split(",")
-            if len(parts) != 3:  # Asegurarse de que la línea tiene tres partes
-                print(f"Formato incorrecto en la línea: {line.strip()}")
-                continue
-
-            try:
-                tipo = parts[0].split(":")[1].strip()
-                valor = parts[1].split(":")[1].strip()
-                linea = int(parts[2].split(":")[1].strip())
-                line_mapping[valor] = linea
-            except (IndexError, ValueError) as e:
-                print(f"Error al procesar la línea: {line.strip()} - {e}")
+        text = file.read()
+    if not text.strip():
+        return None
+    # El texto es JSON con None en lugar de null: una expresión literal de Python
+    return literal_eval(text)
+
+# Nombres que se asignan (o se leen con cin) dentro de un subárbol
+def asignadas(nodo):
+    nombres = set()
+    pila = [nodo]
+    while pila:
+        nodo = pila.pop()
+        if isinstance(nodo, list):
+            pila.extend(nodo)
+        elif isinstance(nodo, dict):
+            clase = clase_nodo(nodo)
+            if clase == 'asignacion' or clase == 'cin':
+                nombres.add(nodo['children'][0])
+            pila.extend(nodo['children'])
+    return nombres
+
+# Línea de un nodo según su rango en el texto (sintactic.parse(..., rangos=True)).
+# lineas es el posiciones.IndiceLineas del mismo texto.
+def linea_de(nodo, lineas):
+    if isinstance(nodo, dict):
+        inicio = nodo.get('inicio', -1)
+    else:
+        inicio = getattr(nodo, 'inicio', -1)
+    if lineas is None or inicio < 0:
+        return 'desconocida'
+    return lineas.linea(inicio)
+
+
+# Tipos de la gramática (tipo : INT | INTEGER | ...) y familias numéricas
+TIPOS_DECLARACION = ('int', 'integer', 'float', 'double', 'char', 'string', 'boolean')
+TIPOS_ENTEROS = ('int', 'integer')
+TIPOS_REALES = ('float', 'double')
+ARITMETICOS = ('+', '-', '*', '/', '%', '^')
+RELACIONALES = ('<', '<=', '>', '>=', '==', '!=')
+LOGICOS = ('and', 'or')
+
+# Clase de cada etiqueta de nodo interno que produce sintactic.py. Las hojas
+# (ID, NUMBER) tienen hijos vacíos y las asignaciones ('=' o '==') tienen como
+# primer hijo el nombre de la variable como texto: ver clase_nodo.
+CLASES = {'main': 'main', 'if': 'if', 'while': 'while', 'do': 'do', 'else': 'else',
+          'cin': 'cin', 'cout': 'cout'}
+CLASES.update((tipo, 'declaracion') for tipo in TIPOS_DECLARACION)
+CLASES.update((op, 'aritmetica') for op in ARITMETICOS)
+CLASES.update((op, 'relacional') for op in RELACIONALES)
+CLASES.update((op, 'logica') for op in LOGICOS)
+
+# Clases que dejan un resultado (tipo, valor) en la pila de resultados
+EXPRESIONES = ('literal', 'variable', 'texto', 'asignacion', 'aritmetica', 'relacional', 'logica')
+
+RESULTADO_ERROR = ('error', None)
+
+
+def clase_nodo(nodo):
+    if nodo is None:
+        return 'nulo'
+    if isinstance(nodo, list):
+        return 'lista'
+    if isinstance(nodo, str):
+        # Texto suelto: nombre de variable o el '1' de x++ / x--
+        return 'texto'
+    label = nodo['label']
+    children = nodo['children']
+    if not children:
+        return 'literal' if isinstance(label, (int, float)) else 'variable'
+    if (label == '=' or label == '==') and isinstance(children[0], str):
+        return 'asignacion'
+    return CLASES.get(label, 'desconocido')
+
+
+def es_numerico(tipo):
+    return tipo in TIPOS_ENTEROS or tipo in TIPOS_REALES
+
+
+def tipo_literal(valor):
+    return 'integer' if isinstance(valor, int) else 'double'
+
+
+# Nombres de un mismo tipo en la gramática: int es integer y float es double
+SINONIMOS = {'int': 'integer', 'float': 'double'}
+
+
+def mismo_tipo(izquierdo, derecho):
+    # Los operandos de una operación o comparación y los dos lados de una
+    # asignación deben tener el mismo tipo: no hay promoción entre entero y real
+    return SINONIMOS.get(izquierdo, izquierdo) == SINONIMOS.get(derecho, derecho)
+
+
+class Diagnosticos:
+    # Colector de errores semánticos: los acumula y avisa a error_callback,
+    # sin lanzar excepciones
+    def __init__(self, lineas, error_callback=None):
+        self.lineas = lineas
+        self.error_callback = error_callback
+        self.mensajes = []
+
+    def linea(self, nodo):
+        return linea_de(nodo, self.lineas)
+
+    def error(self, mensaje):
+        self.mensajes.append(mensaje)
+        if self.error_callback is not None:
+            self.error_callback(mensaje)
+
+
+class VerificadorSemantico:
+    # Recorre el árbol con una pila explícita. Cada marco es (función, nodo):
+    # visitar despacha por la clase del nodo en la tabla ENTRADAS; las
+    # funciones salir_* se apilan debajo de los hijos y se ejecutan cuando
+    # estos ya dejaron sus resultados (tipo, valor) en self.resultados.
+    def __init__(self, symbol_table, diagnosticos):
+        self.tabla = symbol_table
+        self.diagnosticos = diagnosticos
+        self.resultados = []
+        # id(nodo) -> (tipo, valor) de asignaciones y operaciones, para annotate_tree
+        self.anotaciones = {}
+        self.plegador = Plegador()
+        # Métodos ya enlazados, para no buscarlos en cada nodo
+        self.entradas = {clase: getattr(self, nombre) for clase, nombre in self.ENTRADAS.items()}
+        self.salidas = {clase: getattr(self, nombre) for clase, nombre in self.SALIDAS.items()}
+
+    def verificar(self, ast):
+        pila = [(self.visitar, ast)]
+        while pila:
+            funcion, nodo = pila.pop()
+            funcion(nodo, pila)
+        return self.anotaciones
+
+    def visitar(self, nodo, pila):
+        self.entradas[clase_nodo(nodo)](nodo, pila)
+
+    def resultado(self, nodo, tipo, valor):
+        self.resultados.append((tipo, valor))
+        if isinstance(nodo, dict):
+            self.anotaciones[id(nodo)] = (tipo, valor)
+
+    def descartar(self, nodo, pila):
+        # Resultado de una expresión usada como sentencia
+        self.resultados.pop()
+
+    def no_declarada(self, nombre, nodo):
+        self.diagnosticos.error(f"Error: Variable '{nombre}' no está declarada antes de su uso "
+                                f"en la línea {self.diagnosticos.linea(nodo)}.")
+
+    # Sentencias
+
+    def entrar_nulo(self, nodo, pila):
+        pass
+
+    def entrar_lista(self, nodo, pila):
+        for sentencia in reversed(nodo):
+            if clase_nodo(sentencia) in EXPRESIONES:
+                pila.append((self.descartar, sentencia))
+            pila.append((self.visitar, sentencia))
+
+    def entrar_bloque(self, nodo, pila):
+        # main: sus hijos son una lista de sentencias
+        self.entrar_lista(nodo['children'], pila)
+
+    def entrar_declaracion(self, nodo, pila):
+        # Los valores iniciales se evalúan antes de declarar las variables
+        pila.append((self.salir_declaracion, nodo))
+        for variable in reversed(nodo['children']):
+            if variable['children']:
+                pila.append((self.visitar, variable['children'][1]))
+
+    def salir_declaracion(self, nodo, pila):
+        tipo = nodo['label']
+        variables = nodo['children']
+        iniciales = [self.resultados.pop() for variable in variables if variable['children']]
+        for variable in variables:
+            nombre = variable['label']
+            linea = self.diagnosticos.linea(variable)
+            enlace = self.tabla.add(nombre, tipo, line=linea)
+            if enlace['type'] != tipo:
+                primera = enlace['line'][0] if enlace['line'] else 'desconocida'
+                self.diagnosticos.error(f"Error: Variable '{nombre}' redeclarada con un tipo diferente en la línea {linea}."
+                                        f"La declaración original fue en la línea {primera}.")
+                if variable['children']:
+                    iniciales.pop()
                 continue
-    return line_mapping
+            if variable['children']:
+                tipo_valor, valor = iniciales.pop()
+                self.asignar(nombre, tipo, tipo_valor, valor, linea)
+            self.anotaciones[id(variable)] = (tipo, enlace['value'])
+
+    def asignar(self, nombre, tipo, tipo_valor, valor, linea):
+        if tipo_valor != 'error' and not mismo_tipo(tipo, tipo_valor):
+            self.diagnosticos.error(f"Error: Incompatibilidad de tipos en asignación para '{nombre}'. "
+                                    f"Esperado '{tipo}', recibido '{tipo_valor}' en la línea {linea}.")
+            # Un valor de otro tipo no se pliega en las operaciones siguientes
+            valor = None
+        self.tabla.update(nombre, convertir(valor, tipo in TIPOS_REALES), line=linea)
+
+    def entrar_asignacion(self, nodo, pila):
+        pila.append((self.salir_asignacion, nodo))
+        if nodo['children'][1] is not None:
+            pila.append((self.visitar, nodo['children'][1]))
+
+    def salir_asignacion(self, nodo, pila):
+        nombre, valor = nodo['children']
+        linea = self.diagnosticos.linea(nodo)
+        tipo_valor, valor = self.resultados.pop() if valor is not None else (None, None)
+        info = self.tabla.get(nombre)
+        if info is None:
+            self.no_declarada(nombre, nodo)
+            self.resultado(nodo, *RESULTADO_ERROR)
+            return
+        if tipo_valor is None:
+            self.diagnosticos.error(f"Error: Asignación sin valor para '{nombre}' en la línea {linea}.")
+        else:
+            self.asignar(nombre, info['type'], tipo_valor, valor, linea)
+        self.resultado(nodo, info['type'], valor)
+
+    def en_ambito(self, bloque, pila):
+        # Los bloques de if, else, while y do abren un ámbito propio
+        pila.append((self.cerrar_ambito, bloque))
+        pila.append((self.visitar, bloque))
+        pila.append((self.abrir_ambito, bloque))
+
+    def abrir_ambito(self, nodo, pila):
+        self.tabla.entrar_ambito()
+
+    def cerrar_ambito(self, nodo, pila):
+        self.tabla.salir_ambito()
+
+    def entrar_else(self, nodo, pila):
+        self.en_ambito(nodo['children'], pila)
+
+    def entrar_condicional(self, nodo, pila):
+        # if: [condición, bloque, else?]; while: [condición, bloque?]
+        # Después de la sentencia no se sabe qué rama o cuántas vueltas se
+        # hicieron: se olvidan los valores de lo que se asigna en ella. El else
+        # no ve lo asignado en el bloque del if, y un ciclo no conoce al
+        # entrar los valores que cambia (la condición se repite).
+        children = nodo['children']
+        nombres = asignadas(nodo)
+        pila.append((self.olvidar, nombres))
+        if len(children) > 2:
+            pila.append((self.visitar, children[2]))
+            pila.append((self.olvidar, asignadas(children[1])))
+        if len(children) > 1:
+            self.en_ambito(children[1], pila)
+        pila.append((self.salir_condicion, nodo))
+        pila.append((self.visitar, children[0]))
+        if nodo['label'] == 'while':
+            pila.append((self.olvidar, nombres))
+
+    def salir_condicion(self, nodo, pila):
+        tipo, valor = self.resultados.pop()
+        if tipo != 'boolean' and tipo != 'error':
+            self.diagnosticos.error(f"Error: La condición de la sentencia '{nodo['label']}' debe ser de tipo booleano "
+                                    f"en la línea {self.diagnosticos.linea(nodo)}.")
+
+    def entrar_do(self, nodo, pila):
+        # do: [bloque, while]. El while puede traer su propio bloque: en
+        # do { A } while c { B } se repite A, se sale si c es falsa y si no se hace B
+        bloque, condicion = nodo['children']
+        nombres = asignadas(nodo)
+        pila.append((self.olvidar, nombres))
+        pila.append((self.visitar, condicion))
+        self.en_ambito(bloque, pila)
+        pila.append((self.olvidar, nombres))
+
+    def olvidar(self, nombres, pila):
+        # Valores que dejan de conocerse en este punto del programa
+        for nombre in nombres:
+            self.tabla.update(nombre, None)
+
+    def entrar_cin(self, nodo, pila):
+        nombre = nodo['children'][0]
+        # El valor leído no se conoce en compilación
+        if self.tabla.update(nombre, None, line=self.diagnosticos.linea(nodo)) is None:
+            self.no_declarada(nombre, nodo)
+
+    def entrar_cout(self, nodo, pila):
+        pila.append((self.descartar, nodo))
+        pila.append((self.visitar, nodo['children'][0]))
+
+    def entrar_desconocido(self, nodo, pila):
+        self.diagnosticos.error(f"Error: Nodo desconocido '{nodo['label']}' en la línea {self.diagnosticos.linea(nodo)}.")
+
+    # Expresiones
+
+    def entrar_literal(self, nodo, pila):
+        self.resultado(nodo, tipo_literal(nodo['label']), nodo['label'])
+
+    def entrar_variable(self, nodo, pila):
+        self.referencia(nodo['label'], nodo)
+
+    def entrar_texto(self, nodo, pila):
+        if nodo.isdigit():
+            self.resultado(nodo, 'integer', int(nodo))
+        else:
+            self.referencia(nodo, nodo)
 
+    def referencia(self, nombre, nodo):
+        info = self.tabla.get(nombre)
+        if info is None:
+            self.no_declarada(nombre, nodo)
+            self.resultado(nodo, *RESULTADO_ERROR)
+        else:
+            self.resultado(nodo, info['type'], info['value'])
+
+    def entrar_binaria(self, nodo, pila):
+        izquierdo, derecho = nodo['children']
+        pila.append((self.salidas[clase_nodo(nodo)], nodo))
+        pila.append((self.visitar, derecho))
+        pila.append((self.visitar, izquierdo))
+
+    def operandos(self):
+        derecho = self.resultados.pop()
+        izquierdo = self.resultados.pop()
+        return izquierdo, derecho
+
+    def plegar(self, nodo, op, entero, izq, der):
+        valor, error = self.plegador.plegar(op, entero, izq, der)
+        if error is not None:
+            self.diagnosticos.error(f"Error: {error.capitalize()} en la operación '{op}' en la línea {self.diagnosticos.linea(nodo)}.")
+        return valor
+
+    def salir_aritmetica(self, nodo, pila):
+        (tipo_izq, izq), (tipo_der, der) = self.operandos()
+        op = nodo['label']
+        if tipo_izq == 'error' or tipo_der == 'error':
+            self.resultado(nodo, *RESULTADO_ERROR)
+        elif not (es_numerico(tipo_izq) and mismo_tipo(tipo_izq, tipo_der)):
+            self.diagnosticos.error(f"Error: Incompatibilidad de tipos en operación '{op}' entre '{tipo_izq}' y '{tipo_der}' "
+                                    f"en la línea {self.diagnosticos.linea(nodo)}.")
+            self.resultado(nodo, *RESULTADO_ERROR)
+        else:
+            # El resultado tiene el tipo de los operandos
+            self.resultado(nodo, tipo_izq, self.plegar(nodo, op, tipo_izq in TIPOS_ENTEROS, izq, der))
+
+    def salir_relacional(self, nodo, pila):
+        (tipo_izq, izq), (tipo_der, der) = self.operandos()
+        op = nodo['label']
+        if tipo_izq == 'error' or tipo_der == 'error':
+            self.resultado(nodo, *RESULTADO_ERROR)
+        elif not mismo_tipo(tipo_izq, tipo_der):
+            self.diagnosticos.error(f"Error: Incompatibilidad de tipos en comparación '{op}' entre '{tipo_izq}' y '{tipo_der}' "
+                                    f"en la línea {self.diagnosticos.linea(nodo)}.")
+            self.resultado(nodo, *RESULTADO_ERROR)
+        else:
+            self.resultado(nodo, 'boolean', self.plegar(nodo, op, False, izq, der))
+
+    def salir_logica(self, nodo, pila):
+        (tipo_izq, izq), (tipo_der, der) = self.operandos()
+        op = nodo['label']
+        if tipo_izq == 'error' or tipo_der == 'error':
+            self.resultado(nodo, *RESULTADO_ERROR)
+        elif tipo_izq != 'boolean' or tipo_der != 'boolean':
+            self.diagnosticos.error(f"Error: Los operandos de '{op}' deben ser de tipo booleano, se recibió '{tipo_izq}' y '{tipo_der}' "
+                                    f"en la línea {self.diagnosticos.linea(nodo)}.")
+            self.resultado(nodo, *RESULTADO_ERROR)
+        else:
+            self.resultado(nodo, 'boolean', self.plegar(nodo, op, False, izq, der))
 
-errors = []
+    # Tabla de despacho: clase de nodo -> manejador (nombre del método)
+    ENTRADAS = {
+        'nulo': 'entrar_nulo', 'lista': 'entrar_lista', 'main': 'entrar_bloque', 'else': 'entrar_else',
+        'declaracion': 'entrar_declaracion', 'asignacion': 'entrar_asignacion',
+        'if': 'entrar_condicional', 'while': 'entrar_condicional', 'do': 'entrar_do',
+        'cin': 'entrar_cin', 'cout': 'entrar_cout', 'desconocido': 'entrar_desconocido',
+        'literal': 'entrar_literal', 'variable': 'entrar_variable', 'texto': 'entrar_texto',
+        'aritmetica': 'entrar_binaria', 'relacional': 'entrar_binaria', 'logica': 'entrar_binaria',
+    }
+    SALIDAS = {'aritmetica': 'salir_aritmetica', 'relacional': 'salir_relacional', 'logica': 'salir_logica'}
 
-def semantic_check(ast, symbol_table, error_callback, line_mapping):
-    if ast is None:
-        return None
 
-    print("Processing node:", ast)
-
-    if isinstance(ast, dict):
-        label = ast['label']
-        children = ast.get('children', [])
-
-        # Asegúrate de que children sea una lista
-        if not isinstance(children, list):
-            error_message = f"Error: 'children' no es una lista: {children}"
-            print(error_message)
-            error_callback(error_message)
-            return None
-
-        try: 
-            if label == 'main':
-                print("Entering 'main' function.")
-                for child in children:
-                    semantic_check(child, symbol_table, error_callback, line_mapping)  # Procesar cada hijo del nodo 'main'
-                return None
-            
-            # Manejar declaraciones de variables
-            if label in ['integer', 'double', 'char', 'float', 'boolean', 'string']:
-                var_type = label
-                for var in children:
-                    var_name = var['label']
-                    line_number = line_mapping.get(var_name, 'desconocida')  # Obtener la línea del archivo
-                    symbol_table.add(var_name, var_type, line=line_number)  # Agregar variable con su línea
-                return None  # No es necesario devolver un valor ya que estamos declarando variables
-
-            # Asignaciones
-            elif label == '=':
-                var_name = children[0]['label']
-                line_number = line_mapping.get(var_name, 'desconocida')
-                
-                # Verificar si la variable ha sido declarada antes de usarla
-                try:
-                    var_info = symbol_table.get(var_name, line_number)
-                except Exception as e:
-                    error_callback(str(e))
-                    return {'type': 'error', 'value': None}
-
-                expr = semantic_check(children[1], symbol_table, error_callback, line_mapping)
-                var_type = var_info['type']
-
-                # Verificar la promoción de tipos si es necesario
-                if var_type != expr['type']:
-                    error_message = f"Error: Incompatibilidad de tipos en asignación para '{var_name}'. Esperado '{var_type}', recibido '{expr['type']}' en la línea {line_number}."
-                    error_callback(error_message)
-
-                # Actualizar la tabla de símbolos con el nuevo valor y línea
-                symbol_table.update(var_name, expr['value'], line=line_number)
-                return {'type': var_type, 'value': expr['value']}
-
-            # Operaciones aritméticas
-            elif label in ['+', '-', '*', '/', '%']:
-                left = semantic_check(children[0], symbol_table, error_callback, line_mapping)
-                right = semantic_check(children[1], symbol_table, error_callback, line_mapping)
-
-                # Verificar tipos en ambos lados
-                if left['type'] != right['type']:
-                    error_message = f"Error: Incompatibilidad de tipos en operación '{label}' entre '{left['type']}' y '{right['type']}'."
-                    print(error_message)
-                    error_callback(error_message)
-                    return {'type': 'error', 'value': None}
-
-                # Tipo resultante será el mismo que el de los operandos
-                return {'type': left['type'], 'value': eval(f"{left['value']} {label} {right['value']}")}
-
-            # Operaciones relacionales y comparaciones
-            elif label in ['<', '<=', '>', '>=', '==', '!=']:
-                left = semantic_check(children[0], symbol_table, error_callback, line_mapping)
-                right = semantic_check(children[1], symbol_table, error_callback, line_mapping)
-
-                # Verificar tipos en ambos lados
-                if left['type'] != right['type']:
-                    error_message = f"Error: Incompatibilidad de tipos en comparación '{label}' entre '{left['type']}' y '{right['type']}'."
-                    print(error_message)
-                    error_callback(error_message)
-                    return {'type': 'error', 'value': None}
-
-                result_value = eval(f"{left['value']} {label} {right['value']}")
-                return {'type': 'boolean', 'value': result_value}
-
-            # Condicionales (if)
-            elif label == 'if':
-                condition = semantic_check(children[0], symbol_table, error_callback, line_mapping)
-                if condition['type'] != 'boolean':
-                    error_message = "Error: La condición de la sentencia 'if' debe ser de tipo booleano."
-                    print(error_message)
-                    error_callback(error_message)
-                    return {'type': 'error', 'value': None}
-
-                # Procesar las sentencias dentro del bloque 'if'
-                semantic_check(children[1], symbol_table, error_callback, line_mapping)
-                if len(children) > 2:  # Procesar bloque 'else' si existe
-                    semantic_check(children[2], symbol_table, error_callback, line_mapping)
-
-            # Bucles (while)
-            elif label == 'while':
-                condition = semantic_check(children[0], symbol_table, error_callback, line_mapping)
-                if condition['type'] != 'boolean':
-                    error_message = "Error: La condición de la sentencia 'while' debe ser de tipo booleano."
-                    print(error_message)
-                    error_callback(error_message)
-                    return {'type': 'error', 'value': None}
-
-                # Procesar las sentencias dentro del bloque 'while'
-                semantic_check(children[1], symbol_table, error_callback, line_mapping)
-            else:
-                error_message = f"Error: Nodo desconocido '{label}'."
-                print(error_message)
-                error_callback(error_message)
-                return {'type': 'error', 'value': None}
-
-        except Exception as e:
-            error_message = str(e)
-            errors.append(error_message)
-            error_callback(error_message)
-            return {'type': 'error', 'value': None}
+def semantic_check(ast, symbol_table, error_callback, lineas):
+    # Devuelve las anotaciones (tipo, valor) por id de nodo para annotate_tree
+    diagnosticos = Diagnosticos(lineas, error_callback)
+    return VerificadorSemantico(symbol_table, diagnosticos).verificar(ast)
 
 
 def error_callback(message):
     print(f"Error encontrado: {message}")
-    
-def annotate_tree(ast, symbol_table):
-    if isinstance(ast, dict):
-        label = ast['label']
-        annotated_node = {'label': label, 'children': []}
 
-        # Si es un identificador (variable)
-        if label in symbol_table.symbols:
-            var_info = symbol_table.get(label, line=None)  # Pass 'None' or a valid line number
-            annotated_node['type'] = var_info['type']
-            annotated_node['value'] = var_info['value']
 
-        # Si es una operación o asignación
-        if label == '=' or label in ['+', '-', '*', '/', '%']:
-            expr_type = ast.get('type', 'Desconocido')
-            annotated_node['type'] = expr_type
-            annotated_node['value'] = ast.get('value', 'Desconocido')
-
-        # Recursión para los hijos
-        for child in ast.get('children', []):
-            annotated_node['children'].append(annotate_tree(child, symbol_table))
-
-        return annotated_node
-
-    elif isinstance(ast, list):
-        return [annotate_tree(child, symbol_table) for child in ast]
+def annotate_tree(ast, symbol_table, anotaciones=None):
+    # Copia del árbol con tipo y valor en identificadores, asignaciones y
+    # operaciones. Iterativa: pila de (nodo original, lista destino).
+    anotaciones = anotaciones or {}
+    # Identificadores por nombre (el último enlace registrado con ese nombre)
+    enlaces = {enlace['name']: enlace for enlace in symbol_table.registros}
+    raiz = []
+    pila = [(ast, raiz)]
+    while pila:
+        nodo, destino = pila.pop()
+        if isinstance(nodo, dict):
+            label = nodo['label']
+            annotated_node = {'label': label, 'children': []}
+
+            # Si es un identificador (variable)
+            info = enlaces.get(label)
+            if info is not None:
+                annotated_node['type'] = info['type']
+                annotated_node['value'] = info['value']
+
+            # Tipo y valor calculados por semantic_check (operaciones, asignaciones, hojas)
+            if id(nodo) in anotaciones or label == '=' or label in ARITMETICOS:
+                tipo, valor = anotaciones.get(id(nodo), (nodo.get('type', 'Desconocido'), nodo.get('value', 'Desconocido')))
+                annotated_node['type'] = tipo
+                annotated_node['value'] = valor
+
+            destino.append(annotated_node)
+            hijos = annotated_node['children']
+            for child in reversed(nodo.get('children', [])):
+                pila.append((child, hijos))
+        elif isinstance(nodo, list):
+            lista = []
+            destino.append(lista)
+            for child in reversed(nodo):
+                pila.append((child, lista))
+        else:
+            destino.append(nodo)
+    return raiz[0]
 
-    return ast
 
 
 
 
-def save_annotated_tree(ast, symbol_table, output_file):
-    annotated_tree = annotate_tree(ast, symbol_table)
+def save_annotated_tree(ast, symbol_table, output_file, anotaciones=None):
+    annotated_tree = annotate_tree(ast, symbol_table, anotaciones)
     with open(output_file, 'w') as file:
         json_str = json.dumps(annotated_tree, indent=2)
         file.write(json_str)
 
+def format_symbol_table(symbol_table):
+    # Encabezados de la tabla
+    lineas = [
+        f"{'Nombre de Variable':<20} | {'Tipo':<10} | {'Valor':<10} | {'Registro':<10} | {'Números de Línea':<20}\n",
+        "-" * 80 + "\n",
+    ]
+
+    # Cada entrada de la tabla de símbolos
+    for info in symbol_table.registros:
+        name = info['name']
+        line_numbers = " ".join(map(str, info['line']))
+        loc = info['loc'] if info['loc'] is not None else 'N/A'
+        value = info['value'] if info['value'] is not None else 'No asignado'
+        lineas.append(f"{name:<20} | {info['type']:<10} | {value:<10} | {loc:<10} | {line_numbers:<20}\n")
+    return ''.join(lineas)
+
 def save_symbol_table(symbol_table, output_file):
     with open(output_file, 'w') as file:
-        # Escribir los encabezados de la tabla
-        file.write(f"{'Nombre de Variable':<20} | {'Tipo':<10} | {'Valor':<10} | {'Registro':<10} | {'Números de Línea':<20}\n")
-        file.write("-" * 80 + "\n")
+        file.write(format_symbol_table(symbol_table))
 
-        # Escribir cada entrada de la tabla de símbolos
-        for name, info in symbol_table.symbols.items():
-            line_numbers = " ".join(map(str, info['line']))
-            loc = info['loc'] if info['loc'] is not None else 'N/A'
-            value = info['value'] if info['value'] is not None else 'No asignado'
-            file.write(f"{name:<20} | {info['type']:<10} | {value:<10} | {loc:<10} | {line_numbers:<20}\n")
 
+def run_semantic_analysis(ast, lineas, error_callback):
+    # Análisis en memoria: devuelve la tabla de símbolos y el árbol anotado sin escribir archivos
+    symbol_table = SymbolTable()
+    anotaciones = semantic_check(ast, symbol_table, error_callback, lineas)
+    annotated_tree = annotate_tree(ast, symbol_table, anotaciones)
+    return symbol_table, annotated_tree
 
-def perform_semantic_analysis(ast, output_annotated_file, output_symbol_table_file, line_mapping, error_callback=None):
+def perform_semantic_analysis(ast, output_annotated_file, output_symbol_table_file, lineas, error_callback=None):
     symbol_table = SymbolTable()  # Crear una instancia de SymbolTable
     try:
-        semantic_check(ast, symbol_table, error_callback, line_mapping)  # Pasar error_callback aquí
-        save_annotated_tree(ast, symbol_table, output_annotated_file)
+        anotaciones = semantic_check(ast, symbol_table, error_callback, lineas)  # Pasar error_callback aquí
+        save_annotated_tree(ast, symbol_table, output_annotated_file, anotaciones)
         save_symbol_table(symbol_table, output_symbol_table_file)
     except Exception as e:
         print(e)
@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Servidor de compilación de larga duración. Escucha en un socket Unix y
+# habla un protocolo JSON de una línea por mensaje:
+#
+#   petición:  {"id": 1, "source": "main { ... }", "phases": ["lexico", "sintactico", "semantico"]}
+#   respuesta: {"id": 1, "ok": true, "resultado": {...}}   (ver ResultadoCompilacion.a_dict)
+#              {"id": 1, "ok": false, "error": "..."}
+#
+# Las compilaciones se reparten en un grupo de procesos que importan
+# sintactic (tablas de PLY ya construidas) y semantic una sola vez al arrancar.
+
+SOCKET_POR_DEFECTO = '/tmp/compilador.sock'
+TIMEOUT_POR_DEFECTO = 10.0
+LIMITE_LINEA = 64 * 1024 * 1024  # Tamaño máximo de una petición
+
+
+def iniciar_trabajador():
+    # Se ejecuta una vez en cada proceso del grupo: importa el compilador y
+    # silencia los print de las fases para no llenar la salida del servidor.
+    sys.stdout = open(os.devnull, 'w')
+    import compilacion  # noqa: F401
+
+
+def compilar_en_trabajador(source, phases, directorio_cache=None):
+    import compilacion
+    if directorio_cache is not None:
+        from cache_compilacion import cache_en
+        return cache_en(directorio_cache).compilar(source, phases).a_dict()
+    return compilacion.compile_source(source, phases=phases).a_dict()
+
+
+class ServidorCompilacion:
+    def __init__(self, socket_path=SOCKET_POR_DEFECTO, trabajadores=None, timeout=TIMEOUT_POR_DEFECTO, max_en_curso=None,
+                 directorio_cache=None):
+        self.socket_path = socket_path
+        self.directorio_cache = directorio_cache  # Caché de compilación en disco (cache_compilacion.py)
+        self.trabajadores = trabajadores or os.cpu_count() or 1
+        self.timeout = timeout
+        # Límite de compilaciones en curso: cuando se alcanza se deja de leer
+        # de los clientes, que notan la contrapresión en el socket.
+        self.en_curso = asyncio.Semaphore(max_en_curso or 2 * self.trabajadores)
+        self.pool = None
+
+    def calentar(self):
+        # Fuerza el arranque de todos los procesos antes de aceptar peticiones
+        futuros = [self.pool.submit(compilar_en_trabajador, 'main { }', ('lexico',)) for _ in range(self.trabajadores)]
+        for futuro in futuros:
+            futuro.result()
+
+    async def atender_peticion(self, peticion):
+        if not isinstance(peticion, dict):
+            return {'id': None, 'ok': False, 'error': 'La petición debe ser un objeto JSON'}
+        id_peticion = peticion.get('id')
+        source = peticion.get('source')
+        phases = peticion.get('phases') or ('lexico', 'sintactico', 'semantico')
+        if not isinstance(source, str):
+            return {'id': id_peticion, 'ok': False, 'error': "Falta el campo 'source'"}
+        if not isinstance(phases, (list, tuple)) or not all(isinstance(fase, str) for fase in phases):
+            return {'id': id_peticion, 'ok': False, 'error': "El campo 'phases' debe ser una lista de nombres de fase"}
+        phases = tuple(phases)
+
+        loop = asyncio.get_running_loop()
+        try:
+            resultado = await asyncio.wait_for(
+                loop.run_in_executor(self.pool, compilar_en_trabajador, source, phases, self.directorio_cache),
+                self.timeout)
+        except asyncio.TimeoutError:
+            return {'id': id_peticion, 'ok': False, 'error': f'Tiempo agotado ({self.timeout} s)'}
+        except Exception as e:
+            return {'id': id_peticion, 'ok': False, 'error': str(e)}
+        return {'id': id_peticion, 'ok': True, 'resultado': resultado}
+
+    async def atender_cliente(self, reader, writer):
+        pendientes = set()
+        bloqueo_escritura = asyncio.Lock()
+
+        async def escribir(respuesta):
+            async with bloqueo_escritura:
+                writer.write(json.dumps(respuesta).encode('utf-8') + b'\n')
+                await writer.drain()
+
+        async def responder(peticion):
+            try:
+                respuesta = await self.atender_peticion(peticion)
+            finally:
+                self.en_curso.release()
+            await escribir(respuesta)
+
+        try:
+            while True:
+                await self.en_curso.acquire()
+                try:
+                    linea = await reader.readline()
+                except ValueError:
+                    # Línea más larga que LIMITE_LINEA: el resto de la petición
+                    # sigue llegando y no se puede separar de la siguiente, así
+                    # que se responde el error y se deja de leer a este cliente
+                    self.en_curso.release()
+                    await escribir({'id': None, 'ok': False, 'error': f'Petición demasiado larga (máximo {LIMITE_LINEA} bytes)'})
+                    break
+                if not linea:
+                    self.en_curso.release()
+                    break
+                try:
+                    peticion = json.loads(linea)
+                except json.JSONDecodeError as e:
+                    self.en_curso.release()
+                    await escribir({'id': None, 'ok': False, 'error': f'JSON inválido: {e}'})
+                    continue
+                tarea = asyncio.create_task(responder(peticion))
+                pendientes.add(tarea)
+                tarea.add_done_callback(pendientes.discard)
+
+            if pendientes:
+                await asyncio.gather(*pendientes, return_exceptions=True)
+        except (ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def ejecutar(self):
+        self.pool = ProcessPoolExecutor(max_workers=self.trabajadores, initializer=iniciar_trabajador)
+        self.calentar()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        servidor = await asyncio.start_unix_server(self.atender_cliente, path=self.socket_path, limit=LIMITE_LINEA)
+        print(f"Servidor de compilación en {self.socket_path} con {self.trabajadores} procesos")
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+
+async def compilar_remoto(source, socket_path=SOCKET_POR_DEFECTO, phases=None):
+    # Cliente mínimo: envía una petición y espera su respuesta
+    reader, writer = await asyncio.open_unix_connection(socket_path, limit=LIMITE_LINEA)
+    try:
+        peticion = {'id': 1, 'source': source}
+        if phases is not None:
+            peticion['phases'] = list(phases)
+        writer.write(json.dumps(peticion).encode('utf-8') + b'\n')
+        await writer.drain()
+        return json.loads(await reader.readline())
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    argumentos = argparse.ArgumentParser(description="Servidor de compilación sobre un socket Unix")
+    argumentos.add_argument('--socket', default=SOCKET_POR_DEFECTO, help="Ruta del socket Unix")
+    argumentos.add_argument('--workers', type=int, default=None, help="Número de procesos (por defecto, uno por núcleo)")
+    argumentos.add_argument('--timeout', type=float, default=TIMEOUT_POR_DEFECTO, help="Tiempo máximo por compilación en segundos")
+    argumentos.add_argument('--max-en-curso', type=int, default=None, help="Compilaciones simultáneas antes de aplicar contrapresión")
+    argumentos.add_argument('--cache', default=None, help="Directorio de la caché de compilación (por defecto no se usa)")
+    opciones = argumentos.parse_args()
+
+    servidor = ServidorCompilacion(opciones.socket, opciones.workers, opciones.timeout, opciones.max_en_curso, opciones.cache)
+    try:
+        asyncio.run(servidor.ejecutar())
+    except KeyboardInterrupt:
+        pass
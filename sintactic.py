@@ -1,6 +1,24 @@
 import ply.yacc as yacc
 import ply.lex as lex
-import json
+import os
+import sys
+import hashlib
+import tempfile
+import importlib.util
+from parser_descendente import ParserDescendente, ErrorSintactico
+from arena import ArenaAST, ConstructorDicts, ConstructorRangos, texto_arbol
+
+# Con COMPILADOR_DEPURAR=1 se usa el arranque original de PLY (parsetab.py y
+# parser.out junto a este archivo). Si no, las tablas del lexer y del parser se
+# cargan de DIR_TABLAS, en archivos identificados por la firma de la gramática,
+# y nunca se escribe salida de depuración.
+DEPURAR = os.environ.get('COMPILADOR_DEPURAR') == '1'
+DIR_TABLAS = os.environ.get('COMPILADOR_TABLAS') or os.path.join(os.path.expanduser('~'), '.cache', 'compilador', 'tablas')
+
+# Parsers disponibles: las tablas LALR de PLY o parser_descendente.ParserDescendente.
+# COMPILADOR_PARSER elige el que usa parse() cuando no se indica otro.
+MOTORES_PARSER = ('ply', 'descendente')
+MOTOR_PARSER = os.environ.get('COMPILADOR_PARSER', 'ply')
 
 tokens = (
     'ID', 'NUMBER', 'PLUS', 'MINUS', 'TIMES', 'DIVIDE', 'MOD', 'POWER',
@@ -58,6 +76,7 @@ t_ignore = ' \t'
 
 def t_NUMBER(t):
     r'\d+(\.\d+)?'
+    t.lexema = t.value  # Texto original, para el rango del nodo en el árbol
     if '.' in t.value:
         t.value = float(t.value)
     else:
@@ -73,11 +92,84 @@ def t_newline(t):
     r'\n+'
     t.lexer.lineno += len(t.value)
 
+# Mensajes de error del último análisis
+errores_lexicos = []
+errores_sintacticos = []
+
 def t_error(t):
-    print(f"Error léxico en el carácter: '{t.value[0]}' en la línea: {t.lineno}")
+    mensaje = f"Error léxico en el carácter: '{t.value[0]}' en la línea: {t.lineno}"
+    print(mensaje)
+    errores_lexicos.append(mensaje)
     t.lexer.skip(1)
 
-lexer = lex.lex()
+def cargar_modulo(nombre, ruta):
+    spec = importlib.util.spec_from_file_location(nombre, ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+def tabla_en_cache(archivo, construir):
+    # Devuelve la ruta DIR_TABLAS/<archivo>. Si no existe, construir(ruta) la
+    # genera en un directorio temporal y se mueve a su lugar con os.replace,
+    # así otro proceso nunca ve un archivo a medio escribir.
+    ruta = os.path.join(DIR_TABLAS, archivo)
+    if not os.path.exists(ruta):
+        os.makedirs(DIR_TABLAS, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=DIR_TABLAS) as temporal:
+            construir(os.path.join(temporal, archivo))
+            os.replace(os.path.join(temporal, archivo), ruta)
+    return ruta
+
+def clave(firma):
+    return hashlib.sha256(firma.encode('utf-8')).hexdigest()[:16]
+
+def firma_lexer():
+    # Las tablas del lexer solo dependen de los tokens y de las expresiones regulares
+    modulo = globals()
+    partes = [repr(tokens)]
+    for nombre in sorted(modulo):
+        if nombre.startswith('t_'):
+            regla = modulo[nombre]
+            partes.append(f"{nombre}={regla if isinstance(regla, str) else regla.__doc__}")
+    return '\n'.join(partes)
+
+def construir_lexer():
+    if DEPURAR:
+        return lex.lex()
+    este_modulo = sys.modules[__name__]
+    try:
+        nombre = 'lextab_' + clave(firma_lexer())
+        ruta = tabla_en_cache(
+            nombre + '.py',
+            lambda destino: lex.lex(module=este_modulo, optimize=True, lextab=nombre, outputdir=os.path.dirname(destino)))
+        lextab = cargar_modulo(nombre, ruta)
+    except OSError as e:
+        print(f"No se pudo usar la caché de tablas en '{DIR_TABLAS}': {e}", file=sys.stderr)
+        return lex.lex(module=este_modulo)
+    return lex.lex(module=este_modulo, optimize=True, lextab=lextab)
+
+lexer = construir_lexer()
+
+def nuevo_lexer():
+    # Copia del lexer con el contador de líneas en cero, para que varios
+    # análisis en el mismo proceso no arrastren el número de línea.
+    copia = lexer.clone()
+    copia.lineno = 1
+    return copia
+
+def tokenize(input_text):
+    del errores_lexicos[:]
+    copia = nuevo_lexer()
+    copia.input(input_text)
+    return list(copia)
+
+class ListaTokens:
+    # Lexer mínimo para PLY sobre tokens ya leídos con tokenize
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+
+    def token(self):
+        return next(self.tokens, None)
 
 precedence = (
     ('right', 'PLUSPLUS', 'MINUSMINUS'),
@@ -86,17 +178,22 @@ precedence = (
     ('right', 'POWER'),
 )
 
+# Las acciones construyen el árbol a través de constructor (ver arena.py):
+# ConstructorDicts produce los diccionarios de siempre y ArenaAST la forma
+# compacta. p.slice[n] es el token de un terminal, para su posición.
+constructor = ConstructorDicts()
+
 def p_programa(p):
     'programa : MAIN LBRACE listaDeclaracion RBRACE'
-    p[0] = {'label': p[1], 'children': p[3]}
+    p[0] = constructor.nodo(p[1], p[3], p.slice[1])
 
 def p_listaDeclaracion(p):
     '''listaDeclaracion : listaDeclaracion declaracion
                         | declaracion'''
     if len(p) == 3:
-        p[0] = p[1] + [p[2]]
+        p[0] = constructor.agregar(p[1], p[2])
     else:
-        p[0] = [p[1]]
+        p[0] = constructor.lista_de(p[1])
 
 def p_declaracion(p):
     '''declaracion : declaracionVariable
@@ -107,17 +204,22 @@ def p_declaracionVariable(p):
     '''declaracionVariable : tipo listaIdentificadores SEMICOLON
                            | tipo ID EQUAL expresion SEMICOLON'''
     if len(p) == 4:
-        p[0] = {'label': p[1], 'children': [{'label': id, 'children': []} for id in p[2]]}
+        variables = constructor.lista()
+        for token in p[2]:
+            constructor.agregar(variables, constructor.nodo(token.value, constructor.lista(), token))
+        p[0] = constructor.nodo(p[1].value, variables, p[1])
     else:
-        p[0] = {'label': p[1], 'children': [{'label': p[2], 'children': [p[3], p[4]]}]}
+        variable = constructor.nodo(p[2], constructor.lista_de(constructor.texto(p[3], p.slice[3]), p[4]), p.slice[2])
+        p[0] = constructor.nodo(p[1].value, constructor.lista_de(variable), p[1])
 
 def p_listaIdentificadores(p):
     '''listaIdentificadores : ID
                             | ID COMMA listaIdentificadores'''
+    # Lista de los tokens ID, para que cada variable tenga su posición
     if len(p) == 2:
-        p[0] = [p[1]]
+        p[0] = [p.slice[1]]
     else:
-        p[0] = [p[1]] + p[3]
+        p[0] = [p.slice[1]] + p[3]
 
 def p_tipo(p):
     '''tipo : INT
@@ -127,18 +229,18 @@ def p_tipo(p):
             | STRING
             | BOOLEAN
             | DOUBLE'''
-    p[0] = p[1]
+    p[0] = p.slice[1]  # El token, para la posición de la declaración
 
 def p_listaSentencias(p):
     '''listaSentencias : listaSentencias sentencia
                        | sentencia
                        | empty'''
     if len(p) == 3:
-        p[0] = p[1] + [p[2]]
+        p[0] = constructor.agregar(p[1], p[2])
     elif len(p) == 2:
-        p[0] = [p[1]]
+        p[0] = constructor.lista_de(constructor.nulo() if p[1] is None else p[1])
     else:
-        p[0] = []
+        p[0] = constructor.lista()
 
 def p_sentencia(p):
     '''sentencia : seleccion
@@ -155,15 +257,15 @@ def p_sentencia(p):
 def p_asignacion(p):
     '''asignacion : ID EQUAL sentExpresion
                   | ID DEQUAL sentExpresion'''
-    p[0] = {'label': p[2], 'children': [p[1], p[3]]}
+    valor = constructor.nulo() if p[3] is None else p[3]
+    p[0] = constructor.nodo(p[2], constructor.lista_de(constructor.texto(p[1], p.slice[1]), valor), p.slice[2])
 
 def p_incremento(p):
     '''incremento : ID PLUSPLUS SEMICOLON
                   | ID MINUSMINUS SEMICOLON'''
-    if p[2] == '++':
-        p[0] = {'label': '=', 'children': [p[1],{'label': '+', 'children': [p[1], '1']}]}
-    else:
-        p[0] = {'label': '=', 'children': [p[1],{'label': '-', 'children': [p[1], '1']}]}
+    operacion = constructor.nodo('+' if p[2] == '++' else '-', constructor.lista_de(
+        constructor.texto(p[1], p.slice[1]), constructor.texto('1')), p.slice[2])
+    p[0] = constructor.nodo('=', constructor.lista_de(constructor.texto(p[1], p.slice[1]), operacion))
 
 def p_sentExpresion(p):
     '''sentExpresion : expresion SEMICOLON
@@ -180,44 +282,42 @@ def p_seleccion(p):
                  | IF LPAREN andor RPAREN LBRACE listaSentencias RBRACE
                  | IF LPAREN andor RPAREN LBRACE listaSentencias RBRACE elseif'''
     if len(p) == 6:
-        p[0] = {'label': p[1], 'children': [p[2], p[4]]}
+        p[0] = constructor.nodo(p[1], constructor.lista_de(p[2], p[4]), p.slice[1])
     elif len(p) == 7:
-        p[0] = {'label': p[1], 'children': [p[2], p[4], p[6]]}
+        p[0] = constructor.nodo(p[1], constructor.lista_de(p[2], p[4], p[6]), p.slice[1])
     elif len(p) == 8:
-        p[0] = {'label': p[1], 'children': [p[3], p[6]]}
-    elif len(p) == 9:
-        p[0] = {'label': p[1], 'children': [p[3], p[6], p[8]]}
+        p[0] = constructor.nodo(p[1], constructor.lista_de(p[3], p[6]), p.slice[1])
     else:
-        p[0] = {'label': 'if', 'children': [p[2], p[4], p[6], p[8]]}
+        p[0] = constructor.nodo(p[1], constructor.lista_de(p[3], p[6], p[8]), p.slice[1])
 
 def p_elseif(p):
     '''elseif : ELSE LBRACE listaSentencias RBRACE'''
-    p[0] = {'label': p[1], 'children': p[3]}
+    p[0] = constructor.nodo(p[1], p[3], p.slice[1])
 
 def p_andor(p):
     '''andor : expresion AND expresion
              | expresion OR expresion'''
-    p[0] = {'label': p[2], 'children': [p[1], p[3]]}
+    p[0] = constructor.nodo(p[2], constructor.lista_de(p[1], p[3]), p.slice[2])
 
 def p_iteracion(p):
     '''iteracion : WHILE expresion
                  | WHILE expresion LBRACE listaSentencias RBRACE'''
     if len(p) == 3:
-        p[0] = {'label': p[1], 'children': [p[2]]}
+        p[0] = constructor.nodo(p[1], constructor.lista_de(p[2]), p.slice[1])
     else:
-        p[0] = {'label': p[1], 'children': [p[2], p[4]]}
+        p[0] = constructor.nodo(p[1], constructor.lista_de(p[2], p[4]), p.slice[1])
 
 def p_repeticion(p):
     'repeticion : DO LBRACE listaSentencias RBRACE iteracion'
-    p[0] = {'label': p[1], 'children': [p[3], p[5]]}
+    p[0] = constructor.nodo(p[1], constructor.lista_de(p[3], p[5]), p.slice[1])
 
 def p_sentIn(p):
     '''sentIn : CIN ID SEMICOLON'''
-    p[0] = {'label': p[1], 'children': [p[2]]}
+    p[0] = constructor.nodo(p[1], constructor.lista_de(constructor.texto(p[2], p.slice[2])), p.slice[1])
 
 def p_sentOut(p):
     '''sentOut : COUT expresion SEMICOLON'''
-    p[0] = {'label': p[1], 'children': [p[2]]}
+    p[0] = constructor.nodo(p[1], constructor.lista_de(p[2]), p.slice[1])
 
 def p_expresion(p):
     '''expresion : expresionSimple
@@ -225,7 +325,7 @@ def p_expresion(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'label': p[2], 'children': [p[1], p[3]]}
+        p[0] = constructor.nodo(p[2], constructor.lista_de(p[1], p[3]))
 
 def p_relacionOp(p):
     '''relacionOp : LESS
@@ -242,7 +342,7 @@ def p_expresionSimple(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'label': p[2], 'children': [p[1], p[3]]}
+        p[0] = constructor.nodo(p[2], constructor.lista_de(p[1], p[3]))
 
 def p_sumaOp(p):
     '''sumaOp : PLUS
@@ -255,7 +355,7 @@ def p_termino(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'label': p[2], 'children': [p[1], p[3]]}
+        p[0] = constructor.nodo(p[2], constructor.lista_de(p[1], p[3]))
 
 def p_mulOp(p):
     '''mulOp : TIMES
@@ -269,14 +369,14 @@ def p_factor(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'label': p[2], 'children': [p[1], p[3]]}
+        p[0] = constructor.nodo(p[2], constructor.lista_de(p[1], p[3]), p.slice[2])
 
 def p_primario(p):
     '''primario : LPAREN expresion RPAREN
                 | ID
                 | NUMBER'''
     if len(p) == 2:
-        p[0] = {'label': p[1], 'children': []}
+        p[0] = constructor.nodo(p[1], constructor.lista(), p.slice[1])
     else:
         p[0] = p[2]
 
@@ -285,31 +385,117 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    print(f"Error de sintaxis en '{p.value}' en la línea: {p.lineno}")
-
-parser = yacc.yacc()
-
-def parse(input_text):
-    result = parser.parse(input_text)
+    if p is None:
+        mensaje = "Error de sintaxis: fin de archivo inesperado"
+    else:
+        mensaje = f"Error de sintaxis en '{p.value}' en la línea: {p.lineno}"
+    print(mensaje)
+    errores_sintacticos.append(mensaje)
+
+def firma_gramatica():
+    # La misma firma que PLY guarda como _lr_signature en las tablas
+    informacion = yacc.ParserReflect(globals())
+    informacion.get_all()
+    if informacion.error:
+        raise yacc.YaccError('No se pudo construir el parser')
+    return informacion.signature(), informacion.error_func
+
+def construir_parser():
+    if DEPURAR:
+        return yacc.yacc()
+    firma, funcion_error = firma_gramatica()
+    este_modulo = sys.modules[__name__]
+    try:
+        # Las tablas LALR se guardan con pickle: cargarlas no obliga a compilar
+        # un módulo de Python de miles de líneas en cada arranque.
+        ruta = tabla_en_cache(
+            'parsetab_' + clave(firma) + '.pickle',
+            lambda destino: yacc.yacc(module=este_modulo, debug=False, picklefile=destino))
+        tabla = yacc.LRTable()
+        tabla.read_pickle(ruta)
+    except OSError as e:
+        print(f"No se pudo usar la caché de tablas en '{DIR_TABLAS}': {e}", file=sys.stderr)
+        return yacc.yacc(module=este_modulo, debug=False, write_tables=False)
+    # Tablas ya validadas por la firma: se enlazan las funciones sin volver a reflejar la gramática
+    tabla.bind_callables(globals())
+    return yacc.LRParser(tabla, funcion_error)
+
+parser = construir_parser()
+parser_descendente = ParserDescendente(precedence)
+
+def parse(input_text, motor=None, arena=False, rangos=False, tokens_leidos=None):
+    # Con arena=True el árbol se devuelve como arena.ArenaAST (ver a_dict). Con
+    # rangos=True cada diccionario lleva también 'inicio' y 'fin' en el texto.
+    # tokens_leidos son los de tokenize(input_text) si ya se leyeron: no se vuelve a
+    # analizar el texto y errores_lexicos queda como lo dejó tokenize.
+    global constructor
+    motor = motor or MOTOR_PARSER
+    if motor not in MOTORES_PARSER:
+        raise ValueError(f"Parser desconocido '{motor}'. Opciones: {', '.join(MOTORES_PARSER)}")
+    if arena:
+        constructor = ArenaAST()
+    else:
+        constructor = ConstructorRangos() if rangos else ConstructorDicts()
+    del errores_sintacticos[:]
+    if motor == 'descendente':
+        # Se detiene en el primer error, sin la recuperación de PLY
+        try:
+            result = parser_descendente.parse(tokenize(input_text) if tokens_leidos is None else tokens_leidos, constructor)
+        except ErrorSintactico as e:
+            p_error(e.token)
+            return None, False
+        return constructor.terminar(result), True
+
+    # PLY no reinicia errorok entre llamadas a parse()
+    parser.errorok = True
+    if tokens_leidos is not None:
+        result = parser.parse(lexer=ListaTokens(tokens_leidos))
+    else:
+        del errores_lexicos[:]
+        result = parser.parse(input_text, lexer=nuevo_lexer())
     if parser.errorok:
-        return result, True
+        return constructor.terminar(result), True
     else:
         return None, False
     
 
-def write_token_info(tokens, output_file):
+def comparar_parsers(text):
+    # Prueba diferencial: analiza el texto con ambos parsers, en las dos
+    # representaciones del árbol, y devuelve el primer par de resultados
+    # (ast, éxito, errores léxicos, primer error sintáctico) que difieren,
+    # o None si coinciden.
+    resultados = []
+    for motor in MOTORES_PARSER:
+        for arena in (False, True):
+            ast, exito = parse(text, motor=motor, arena=arena)
+            if arena and ast is not None:
+                ast = ast.a_dict()
+            resultados.append((ast, exito, list(errores_lexicos), errores_sintacticos[:1]))
+    for resultado in resultados[1:]:
+        if resultado != resultados[0]:
+            return resultados[0], resultado
+    return None
+
+def write_token_info(tokens, output_file, formato='texto'):
+    if formato == 'binario':
+        # Volcado compacto (token_buffer.TokenBuffer) en lugar de una línea de texto por token.
+        # Se importa aquí para que "import sintactic" no cargue NumPy.
+        from token_buffer import TokenBuffer
+        TokenBuffer.desde_tokens_ply(tokens).guardar(output_file)
+        return
     with open(output_file, 'w') as file:
         for token in tokens:
             file.write(f'Tipo: {token.type}, Valor: {token.value}, Linea: {token.lineno}\n')
 
-def write_ast_info(ast, output_file):
+def write_ast_info(ast, output_file, formato='texto'):
+    if formato == 'binario':
+        # Formato binario de arena.ArenaAST; ast viene de parse(..., arena=True)
+        ast.guardar(output_file)
+        return
+    if isinstance(ast, ArenaAST):
+        ast = ast.a_dict()
     with open(output_file, 'w') as file:
-        if ast is not None:
-            json_str = json.dumps(ast, indent=2)
-            json_str = json_str.replace('null', 'None') 
-            file.write(json_str)
-        else:
-            file.write("")
+        file.write(texto_arbol(ast))
 
 def clear_file_content(output_file):
     with open(output_file, 'w') as file:
@@ -317,10 +503,12 @@ def clear_file_content(output_file):
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
+    argumentos = [arg for arg in sys.argv[1:] if arg != '--binario']
+    formato = 'binario' if '--binario' in sys.argv[1:] else 'texto'
+    if len(argumentos) != 1:
         sys.exit(1)
 
-    input_file = sys.argv[1]
+    input_file = argumentos[0]
     token_output_file = 'analisisSyntax.txt'
     ast_output_file = 'arbol.txt'
 
@@ -331,13 +519,12 @@ if __name__ == "__main__":
         print(f"Archivo '{input_file}' no encontrado.")
         sys.exit(1)
 
-    lexer.input(text)
-    tokens = list(lexer)
-    result, no_syntax_error = parse(text)
+    tokens = tokenize(text)
+    result, no_syntax_error = parse(text, arena=formato == 'binario')
     
     if no_syntax_error:
-        write_token_info(tokens, token_output_file)
-        write_ast_info(result, ast_output_file)
+        write_token_info(tokens, token_output_file, formato)
+        write_ast_info(result, ast_output_file, formato)
 
     else:
         clear_file_content(token_output_file)
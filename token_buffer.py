@@ -0,0 +1,273 @@
+import mmap
+import struct
+import numpy as np
+from lexico import Token
+
+# Formato binario de volcado de tokens:
+#   cabecera  MAGIA, versión, n_tokens, n_cadenas, bytes de tipos, bytes de cadenas
+#   tipos     nombres de los tipos de token en UTF-8 separados por '\n'
+#   offsets   n_cadenas + 1 enteros uint64 con el inicio de cada cadena
+#   cadenas   tabla de lexemas compartida (UTF-8, sin separadores)
+#   registros n_tokens registros con el dtype REGISTRO
+MAGIA = b'TKBF'
+VERSION = 1
+CABECERA = struct.Struct('<4sHHQQQQ')
+
+REGISTRO = np.dtype([
+    ('tipo', '<u2'),      # índice en la tabla de tipos
+    ('clase', 'u1'),      # cómo reconstruir el valor (ver CLASE_*)
+    ('linea', '<u4'),
+    ('columna', '<u4'),
+    ('longitud', '<u4'),  # longitud del lexema en caracteres
+    ('valor', '<u4'),     # índice en la tabla de cadenas
+])
+
+# Clase de valor: el texto se guarda una sola vez y se convierte al leerlo
+CLASE_TEXTO = 0
+CLASE_ENTERO = 1
+CLASE_REAL = 2
+CLASE_NULO = 3
+
+
+def es_archivo_binario(file_path):
+    # True si el archivo empieza con la cabecera del formato binario de tokens
+    with open(file_path, 'rb') as file:
+        return file.read(len(MAGIA)) == MAGIA
+
+
+class TokenBuffer:
+    # Almacena tokens en un arreglo estructurado de NumPy (19 bytes por token)
+    # en lugar de un objeto Token por token. Los lexemas se guardan una sola vez
+    # en una tabla de cadenas compartida y los tipos en una tabla de nombres.
+    def __init__(self, capacidad=1024):
+        self.datos = np.zeros(capacidad, dtype=REGISTRO)
+        self.n = 0
+        self.tipos = []
+        self.indice_tipos = {}
+        self.cadenas = []
+        self.indice_cadenas = {}
+        self.offsets = None        # Tabla de cadenas de los buffers cargados desde disco
+        self.bytes_cadenas = None
+        self.solo_lectura = False  # Buffers cargados desde disco y vistas
+        self.mapa = None           # mmap de los buffers cargados desde disco
+
+    def __len__(self):
+        return self.n
+
+    def id_tipo(self, token_type):
+        indice = self.indice_tipos.get(token_type)
+        if indice is None:
+            indice = self.indice_tipos[token_type] = len(self.tipos)
+            self.tipos.append(token_type)
+        return indice
+
+    def id_cadena(self, texto):
+        indice = self.indice_cadenas.get(texto)
+        if indice is None:
+            indice = self.indice_cadenas[texto] = len(self.cadenas)
+            self.cadenas.append(texto)
+        return indice
+
+    def agregar(self, token_type, value, line, column, longitud=None):
+        # longitud es la del lexema en el texto; sin ella se usa la del valor,
+        # que no coincide en números como 1.50 ni en comentarios
+        if self.solo_lectura:
+            raise ValueError("El buffer de tokens es de solo lectura")
+        if self.n == len(self.datos):
+            datos = np.zeros(max(1, 2 * len(self.datos)), dtype=REGISTRO)
+            datos[:self.n] = self.datos
+            self.datos = datos
+
+        if value is None:
+            clase, texto = CLASE_NULO, ''
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            clase, texto = CLASE_TEXTO, str(value)
+        elif isinstance(value, int):
+            clase, texto = CLASE_ENTERO, str(value)
+        else:
+            clase, texto = CLASE_REAL, repr(value)
+
+        self.datos[self.n] = (
+            self.id_tipo(token_type),
+            clase,
+            line,
+            column,
+            len(texto) if longitud is None else longitud,
+            self.id_cadena(texto),
+        )
+        self.n += 1
+
+    def agregar_token(self, token):
+        # Token de lexico.Lexer
+        self.agregar(token.token_type, token.value, token.line, token.column, token.longitud)
+
+    def agregar_token_ply(self, token):
+        # LexToken de ply.lex (el que usa sintactic.py). PLY no calcula columnas,
+        # así que se guarda la posición absoluta en el texto (lexpos). t_NUMBER
+        # guarda el texto original del número en lexema.
+        lexema = getattr(token, 'lexema', token.value)
+        self.agregar(token.type, token.value, token.lineno, token.lexpos, len(str(lexema)))
+
+    @classmethod
+    def desde_lexer(cls, lexer):
+        buffer = cls()
+        for token in lexer:
+            buffer.agregar_token(token)
+        return buffer
+
+    @classmethod
+    def desde_tokens_ply(cls, tokens):
+        buffer = cls()
+        for token in tokens:
+            buffer.agregar_token_ply(token)
+        return buffer
+
+    # Vistas sin copia de cada columna
+    @property
+    def registros(self):
+        return self.datos[:self.n]
+
+    @property
+    def lineas(self):
+        return self.registros['linea']
+
+    @property
+    def columnas(self):
+        return self.registros['columna']
+
+    @property
+    def longitudes(self):
+        return self.registros['longitud']
+
+    @property
+    def ids_tipo(self):
+        return self.registros['tipo']
+
+    def cadena(self, indice):
+        if self.cadenas is not None:
+            return self.cadenas[indice]
+        inicio, fin = int(self.offsets[indice]), int(self.offsets[indice + 1])
+        return bytes(self.bytes_cadenas[inicio:fin]).decode('utf-8')
+
+    def valor(self, i):
+        registro = self.datos[i]
+        clase = registro['clase']
+        if clase == CLASE_NULO:
+            return None
+        texto = self.cadena(int(registro['valor']))
+        if clase == CLASE_ENTERO:
+            return int(texto)
+        if clase == CLASE_REAL:
+            return float(texto)
+        return texto
+
+    def tipo(self, i):
+        return self.tipos[int(self.datos[i]['tipo'])]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.vista(i.start, i.stop, i.step)
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        registro = self.datos[i]
+        return Token(self.tipos[int(registro['tipo'])], self.valor(i), int(registro['linea']), int(registro['columna']),
+                     int(registro['longitud']))
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield self[i]
+
+    def vista(self, inicio=None, fin=None, paso=None):
+        # Buffer que comparte los registros y las tablas con este (sin copia).
+        # Los índices son los de un slice sobre los n tokens, paso incluido.
+        vista = TokenBuffer.__new__(TokenBuffer)
+        vista.datos = self.registros[inicio:fin:paso]
+        vista.n = len(vista.datos)
+        vista.tipos = self.tipos
+        vista.indice_tipos = self.indice_tipos
+        vista.cadenas = self.cadenas
+        vista.indice_cadenas = self.indice_cadenas
+        vista.offsets = self.offsets
+        vista.bytes_cadenas = self.bytes_cadenas
+        vista.solo_lectura = True
+        vista.mapa = None
+        return vista
+
+    def guardar(self, output_file):
+        if self.cadenas is None:
+            # Buffer cargado desde disco: la tabla de cadenas ya está codificada
+            offsets = self.offsets
+            bytes_cadenas = bytes(self.bytes_cadenas)
+        else:
+            codificadas = [c.encode('utf-8') for c in self.cadenas]
+            offsets = np.zeros(len(codificadas) + 1, dtype='<u8')
+            np.cumsum([len(c) for c in codificadas], out=offsets[1:])
+            bytes_cadenas = b''.join(codificadas)
+        tipos = '\n'.join(self.tipos).encode('utf-8')
+
+        with open(output_file, 'wb') as file:
+            file.write(CABECERA.pack(MAGIA, VERSION, 0, self.n, len(offsets) - 1, len(tipos), len(bytes_cadenas)))
+            file.write(tipos)
+            file.write(offsets.tobytes())
+            file.write(bytes_cadenas)
+            file.write(self.registros.tobytes())
+
+    @classmethod
+    def cargar(cls, file_path):
+        # Mapea el archivo en memoria: los registros y la tabla de cadenas se
+        # leen directamente del mmap, sin copiarlos. cerrar() (o usar el
+        # buffer en un with) libera el mmap.
+        with open(file_path, 'rb') as file:
+            mapa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magia, version, _, n_tokens, n_cadenas, tam_tipos, tam_cadenas = CABECERA.unpack_from(mapa, 0)
+        if magia != MAGIA or version != VERSION:
+            mapa.close()
+            if magia != MAGIA:
+                raise ValueError(f"'{file_path}' no es un volcado binario de tokens")
+            raise ValueError(f"Versión de volcado de tokens no soportada: {version}")
+
+        pos = CABECERA.size
+        buffer = cls.__new__(cls)
+        buffer.tipos = mapa[pos:pos + tam_tipos].decode('utf-8').split('\n') if tam_tipos else []
+        buffer.indice_tipos = {tipo: i for i, tipo in enumerate(buffer.tipos)}
+        pos += tam_tipos
+        buffer.offsets = np.frombuffer(mapa, dtype='<u8', count=n_cadenas + 1, offset=pos)
+        pos += buffer.offsets.nbytes
+        buffer.bytes_cadenas = memoryview(mapa)[pos:pos + tam_cadenas]
+        pos += tam_cadenas
+        buffer.datos = np.frombuffer(mapa, dtype=REGISTRO, count=n_tokens, offset=pos)
+        buffer.n = n_tokens
+        buffer.cadenas = None
+        buffer.indice_cadenas = None
+        buffer.solo_lectura = True
+        buffer.mapa = mapa
+        return buffer
+
+    def cerrar(self):
+        # Cierra el mmap de un buffer cargado con cargar. Los arreglos que lo
+        # leen se sueltan antes; las vistas de este buffer deben soltarse
+        # también, si no mmap no se puede cerrar (BufferError).
+        if self.mapa is None:
+            return
+        self.datos = np.zeros(0, dtype=REGISTRO)
+        self.n = 0
+        self.offsets = None
+        self.bytes_cadenas.release()
+        self.bytes_cadenas = None
+        self.mapa.close()
+        self.mapa = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def escribir_texto(self, output_file):
+        # Mismo formato de texto que sintactic.write_token_info
+        with open(output_file, 'w') as file:
+            for token in self:
+                file.write(f'Tipo: {token.token_type}, Valor: {token.value}, Linea: {token.line}\n')
@@ -0,0 +1,365 @@
+import hashlib
+import math
+import time
+from compilacion import compile_source
+from constantes import division_entera, resto_entero, potencia_entera, MINIMO_ENTERO, MAXIMO_ENTERO
+from maquina import ErrorEjecucion, ResultadoEjecucion
+from semantic import clase_nodo, EXPRESIONES, TIPOS_ENTEROS, TIPOS_REALES
+
+# Backend que traduce el árbol anotado a código fuente de Python y lo compila
+# con compile(). El programa queda como una función: cada variable es una
+# variable local (acceso rápido), while y do son ciclos while de Python y
+# las operaciones con la semántica del lenguaje (división entera truncada,
+# % con el signo del dividendo, ^ como potencia) son funciones auxiliares
+# que también se pasan como locales. Las variables llevan el prefijo v_ para
+# no chocar con palabras reservadas ni nombres de Python. Los enteros de
+# Python no tienen límite: los resultados enteros de + - * / ^ y lo leído con
+# cin se revisan contra el rango de int64, como en la máquina virtual.
+
+ENTRADA_FUNCION = 'programa'
+PREFIJO = 'v_'
+
+
+def entero(valor):
+    if not MINIMO_ENTERO <= valor <= MAXIMO_ENTERO:
+        raise OverflowError
+    return valor
+
+
+def division(a, b):
+    # division_entera ya lanza ZeroDivisionError con b == 0; el menor entero
+    # entre -1 desborda
+    return entero(division_entera(a, b))
+
+
+def potencia(base, exponente):
+    valor = potencia_entera(base, exponente)
+    if valor is None:
+        raise OverflowError
+    return entero(valor)
+
+
+def leer_entero(texto):
+    return entero(int(texto))
+
+
+def constante(valor):
+    # Literal entero que no cabe en int64: falla antes de ejecutar nada, como
+    # la máquina virtual al cargar sus constantes
+    raise ErrorEjecucion(f"La constante {valor} no cabe en un entero de 64 bits")
+
+
+def resto_real(a, b):
+    if b == 0:
+        raise ZeroDivisionError
+    return math.fmod(a, b)
+
+
+def texto_salida(valor):
+    # Mismo formato que la máquina virtual: booleanos como 0/1, reales con repr
+    if isinstance(valor, float):
+        return repr(valor)
+    return str(int(valor)) if isinstance(valor, bool) else str(valor)
+
+
+AUXILIARES = {
+    '_division': division, '_resto': resto_entero, '_potencia': potencia,
+    '_resto_real': resto_real, '_potencia_real': math.pow, '_texto': texto_salida,
+    '_entero': entero, '_leer_entero': leer_entero, '_constante': constante,
+}
+ENTEROS = {'/': '_division', '%': '_resto', '^': '_potencia'}
+REALES = {'%': '_resto_real', '^': '_potencia_real'}
+
+
+def valor_inicial(tipo):
+    if tipo in TIPOS_REALES:
+        return 0.0
+    if tipo in TIPOS_ENTEROS or tipo == 'boolean':
+        return 0
+    return ''
+
+
+def lectura(tipo):
+    # Conversión del texto leído por cin según el tipo de la variable
+    if tipo in TIPOS_REALES:
+        return 'float'
+    if tipo in TIPOS_ENTEROS or tipo == 'boolean':
+        return '_leer_entero'
+    return 'str'
+
+
+class TraductorPython:
+    # Recorre el árbol anotado con una pila explícita de marcos (función,
+    # dato), como intermedio.GeneradorIntermedio: las expresiones dejan su
+    # texto de Python en self.operandos y las sentencias agregan líneas.
+    def __init__(self):
+        self.lineas = []
+        self.nivel = 1
+        self.bloques = []    # número de líneas al abrir cada bloque
+        self.operandos = []
+        self.tipos = {}      # variable -> tipo declarado, en orden de declaración
+        self.fuera_de_rango = []  # literales enteros que no caben en int64
+        self.entradas = {clase: getattr(self, nombre) for clase, nombre in self.ENTRADAS.items()}
+
+    def traducir(self, arbol):
+        pila = [(self.visitar, arbol)]
+        while pila:
+            funcion, dato = pila.pop()
+            funcion(dato, pila)
+        variables = list(self.tipos)
+        auxiliares = ', '.join(f'{nombre}={nombre}' for nombre in AUXILIARES)
+        fuente = [f'def {ENTRADA_FUNCION}(_leer, _escribir, {auxiliares}):\n']
+        fuente.extend(f'    _constante({valor!r})\n' for valor in self.fuera_de_rango)
+        fuente.extend(f'    {PREFIJO}{nombre} = {valor_inicial(self.tipos[nombre])!r}\n' for nombre in variables)
+        fuente.extend(self.lineas)
+        fuente.append(f"    return ({''.join(PREFIJO + nombre + ', ' for nombre in variables)})\n")
+        return ''.join(fuente), [(nombre, self.tipos[nombre]) for nombre in variables]
+
+    def visitar(self, nodo, pila):
+        self.entradas[clase_nodo(nodo)](nodo, pila)
+
+    def linea(self, texto):
+        self.lineas.append('    ' * self.nivel + texto + '\n')
+
+    def abrir(self, encabezado):
+        self.linea(encabezado)
+        self.nivel += 1
+        self.bloques.append(len(self.lineas))
+
+    # Marcos auxiliares
+
+    def cerrar(self, dato, pila):
+        # Un bloque vacío necesita pass
+        if self.bloques.pop() == len(self.lineas):
+            self.linea('pass')
+        self.nivel -= 1
+
+    def descartar(self, dato, pila):
+        # Expresión usada como sentencia: se evalúa igual (puede dividir entre cero)
+        texto = self.operandos.pop()
+        if not texto.isidentifier():
+            self.linea(texto)
+
+    def abrir_si(self, dato, pila):
+        self.abrir(f'if {self.operandos.pop()}:')
+
+    def abrir_sino(self, dato, pila):
+        self.abrir('else:')
+
+    def abrir_mientras(self, dato, pila):
+        self.abrir(f'while {self.operandos.pop()}:')
+
+    def salir_do(self, dato, pila):
+        self.linea(f'if not {self.operandos.pop()}:')
+        self.linea('    break')
+
+    def asignar(self, nombre, valor, tipo_valor):
+        # Un entero guardado en una variable real se convierte
+        if self.tipos.get(nombre) in TIPOS_REALES and tipo_valor not in TIPOS_REALES:
+            valor = f'float({valor})'
+        self.linea(f'{PREFIJO}{nombre} = {valor}')
+
+    # Sentencias
+
+    def entrar_nulo(self, nodo, pila):
+        pass
+
+    def entrar_lista(self, nodo, pila):
+        for sentencia in reversed(nodo):
+            if clase_nodo(sentencia) in EXPRESIONES:
+                pila.append((self.descartar, sentencia))
+            pila.append((self.visitar, sentencia))
+
+    def entrar_bloque(self, nodo, pila):
+        # main y else
+        self.entrar_lista(nodo['children'], pila)
+
+    def entrar_declaracion(self, nodo, pila):
+        tipo = nodo['label']
+        for variable in nodo['children']:
+            self.tipos.setdefault(variable['label'], tipo)
+        for variable in reversed(nodo['children']):
+            if variable['children']:
+                pila.append((self.inicializar, variable))
+                pila.append((self.visitar, variable['children'][1]))
+
+    def inicializar(self, variable, pila):
+        self.asignar(variable['label'], self.operandos.pop(), tipo_expresion(variable['children'][1], self.tipos))
+
+    def entrar_asignacion(self, nodo, pila):
+        pila.append((self.salir_asignacion, nodo))
+        if nodo['children'][1] is not None:
+            pila.append((self.visitar, nodo['children'][1]))
+
+    def salir_asignacion(self, nodo, pila):
+        nombre, valor = nodo['children']
+        if valor is not None:
+            self.asignar(nombre, self.operandos.pop(), tipo_expresion(valor, self.tipos))
+        # Una asignación también es una expresión: su valor es la variable
+        self.operandos.append(PREFIJO + nombre)
+
+    def entrar_if(self, nodo, pila):
+        children = nodo['children']
+        if len(children) > 2:
+            pila.append((self.cerrar, None))
+            pila.append((self.visitar, children[2]))
+            pila.append((self.abrir_sino, None))
+        pila.append((self.cerrar, None))
+        pila.append((self.visitar, children[1]))
+        pila.append((self.abrir_si, None))
+        pila.append((self.visitar, children[0]))
+
+    def entrar_while(self, nodo, pila):
+        children = nodo['children']
+        pila.append((self.cerrar, None))
+        if len(children) > 1:
+            pila.append((self.visitar, children[1]))
+        pila.append((self.abrir_mientras, None))
+        pila.append((self.visitar, children[0]))
+
+    def entrar_do(self, nodo, pila):
+        # while True: bloque; if not c: break; [bloque del while]
+        bloque, condicion = nodo['children']
+        self.abrir('while True:')
+        pila.append((self.cerrar, None))
+        if len(condicion['children']) > 1:
+            pila.append((self.visitar, condicion['children'][1]))
+        pila.append((self.salir_do, None))
+        pila.append((self.visitar, condicion['children'][0]))
+        pila.append((self.visitar, bloque))
+
+    def entrar_cin(self, nodo, pila):
+        nombre = nodo['children'][0]
+        self.linea(f'{PREFIJO}{nombre} = _leer({lectura(self.tipos.get(nombre))})')
+
+    def entrar_cout(self, nodo, pila):
+        pila.append((self.escribir, nodo))
+        pila.append((self.visitar, nodo['children'][0]))
+
+    def escribir(self, nodo, pila):
+        self.linea(f'_escribir(_texto({self.operandos.pop()}))')
+
+    def entrar_desconocido(self, nodo, pila):
+        raise ValueError(f"Nodo desconocido '{nodo['label']}' en el árbol anotado")
+
+    # Expresiones
+
+    def entrar_literal(self, nodo, pila):
+        valor = nodo['label']
+        if type(valor) is int and not MINIMO_ENTERO <= valor <= MAXIMO_ENTERO:
+            self.fuera_de_rango.append(valor)
+        self.operandos.append(repr(valor))
+
+    def entrar_variable(self, nodo, pila):
+        self.operandos.append(PREFIJO + nodo['label'])
+
+    def entrar_texto(self, nodo, pila):
+        # x++ / x--: el nombre de la variable y la constante '1'
+        self.operandos.append(nodo if nodo.isdigit() else PREFIJO + nodo)
+
+    def entrar_binaria(self, nodo, pila):
+        izquierdo, derecho = nodo['children']
+        pila.append((self.salir_binaria, nodo))
+        pila.append((self.visitar, derecho))
+        pila.append((self.visitar, izquierdo))
+
+    def salir_binaria(self, nodo, pila):
+        derecho = self.operandos.pop()
+        izquierdo = self.operandos.pop()
+        label = nodo['label']
+        entera = nodo.get('type') in TIPOS_ENTEROS
+        if label in ('+', '-', '*') or clase_nodo(nodo) != 'aritmetica':
+            # Relacionales y lógicos (and/or) se escriben igual que en Python
+            texto = f'({izquierdo} {label} {derecho})'
+            if entera and clase_nodo(nodo) == 'aritmetica':
+                texto = f'_entero{texto}'
+            self.operandos.append(texto)
+            return
+        funciones = ENTEROS if entera else REALES
+        if label in funciones:
+            self.operandos.append(f'{funciones[label]}({izquierdo}, {derecho})')
+        else:
+            self.operandos.append(f'({izquierdo} / {derecho})')
+
+    # Tabla de despacho: clase de nodo (semantic.clase_nodo) -> método
+    ENTRADAS = {
+        'nulo': 'entrar_nulo', 'lista': 'entrar_lista', 'main': 'entrar_bloque', 'else': 'entrar_bloque',
+        'declaracion': 'entrar_declaracion', 'asignacion': 'entrar_asignacion',
+        'if': 'entrar_if', 'while': 'entrar_while', 'do': 'entrar_do',
+        'cin': 'entrar_cin', 'cout': 'entrar_cout', 'desconocido': 'entrar_desconocido',
+        'literal': 'entrar_literal', 'variable': 'entrar_variable', 'texto': 'entrar_texto',
+        'aritmetica': 'entrar_binaria', 'relacional': 'entrar_binaria', 'logica': 'entrar_binaria',
+    }
+
+
+def tipo_expresion(nodo, tipos):
+    # Tipo estático de una expresión según las anotaciones del árbol
+    if isinstance(nodo, str):
+        return 'integer' if nodo.isdigit() else tipos.get(nodo)
+    if not nodo['children'] and isinstance(nodo['label'], (int, float)):
+        return 'integer' if isinstance(nodo['label'], int) else 'double'
+    return nodo.get('type')
+
+
+class ProgramaPython:
+    def __init__(self, fuente, variables):
+        self.fuente = fuente
+        self.variables = variables  # (nombre, tipo) en el orden en que los devuelve la función
+        espacio = dict(AUXILIARES)
+        try:
+            exec(compile(fuente, '<programa>', 'exec'), espacio)
+        except (SyntaxError, RecursionError, MemoryError) as e:
+            # CPython limita la anidación de bloques (20 ciclos) y de sangría (100 niveles)
+            raise ValueError(f"El programa está demasiado anidado para el backend de Python: {e}")
+        self.funcion = espacio[ENTRADA_FUNCION]
+
+    def ejecutar(self, entrada=''):
+        resultado = ResultadoEjecucion()
+        entradas = iter(entrada.split())
+        salida = []
+
+        def leer(convertir):
+            texto = next(entradas, None)
+            if texto is None:
+                raise ErrorEjecucion("cin: no hay más datos de entrada")
+            try:
+                return convertir(texto)
+            except ValueError:
+                raise ErrorEjecucion(f"cin: '{texto}' no es un valor válido")
+
+        inicio = time.perf_counter()
+        try:
+            valores = self.funcion(leer, salida.append)
+            resultado.variables = {nombre: valor for (nombre, tipo), valor in zip(self.variables, valores)}
+        except ErrorEjecucion as e:
+            resultado.error = str(e)
+        except ZeroDivisionError:
+            resultado.error = "División entre cero"
+        except OverflowError:
+            resultado.error = "Desbordamiento numérico"
+        except ValueError:
+            resultado.error = "Operación no definida"
+        resultado.segundos = time.perf_counter() - inicio
+        resultado.salida = ''.join(texto + '\n' for texto in salida)
+        return resultado
+
+
+def traducir_python(arbol_anotado):
+    return ProgramaPython(*TraductorPython().traducir(arbol_anotado))
+
+
+# sha256 del programa fuente -> ProgramaPython
+CACHE = {}
+
+
+def compilar_python(text):
+    # Compila el texto del programa (o lo toma de la caché) hasta un objeto
+    # de código de Python. Lanza ValueError si el programa tiene errores.
+    clave = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    programa = CACHE.get(clave)
+    if programa is None:
+        resultado = compile_source(text, phases=('lexico', 'sintactico', 'semantico'))
+        if not resultado.exito:
+            raise ValueError('\n'.join(resultado.errores()))
+        programa = CACHE[clave] = traducir_python(resultado.arbol_anotado)
+    return programa
@@ -0,0 +1,144 @@
+import difflib
+
+# Vista perezosa de un árbol (AST o árbol anotado) en un ttk.Treeview. Cada
+# nodo se inserta sin sus hijos y con un hijo provisional (MARCADOR) para que
+# el Treeview muestre el botón de expandir; los hijos reales se insertan al
+# abrirlo. Al mostrar un árbol nuevo no se borra la vista: se compara con lo
+# que está mostrado y solo se cambian los nodos distintos, así los nodos
+# abiertos siguen abiertos. Todo se recorre con pilas explícitas, sin
+# recursión, y solo se visitan los nodos que ya se habían cargado.
+
+MARCADOR = 'marcador'
+
+
+def describir_sintactico(nodo):
+    # (texto, etiquetas, hijos) de un nodo del árbol sintáctico
+    if isinstance(nodo, dict):
+        return str(nodo['label']), ('dict_node',), nodo.get('children', [])
+    if isinstance(nodo, tuple):
+        return str(nodo[0]), ('tuple_node',), list(nodo[1:])
+    return str(nodo), ('other_node',), []
+
+
+def describir_anotado(nodo):
+    # (texto, etiquetas, hijos) de un nodo del árbol con anotaciones de tipo
+    if isinstance(nodo, dict):
+        return f"{nodo['label']} (Tipo: {nodo.get('type', 'Desconocido')})", (), nodo.get('children', [])
+    return str(nodo), (), []
+
+
+def aplanar(hijos):
+    # Las listas no se muestran como nodos: sus elementos cuelgan del padre
+    resultado = []
+    pila = [iter(hijos)]
+    while pila:
+        for hijo in pila[-1]:
+            if isinstance(hijo, list):
+                pila.append(iter(hijo))
+                break
+            resultado.append(hijo)
+        else:
+            pila.pop()
+    return resultado
+
+
+class VistaArbol:
+    def __init__(self, treeview, describir):
+        self.treeview = treeview
+        self.describir = describir
+        self.datos = {}        # item -> (nodo, texto, etiquetas)
+        self.cargados = set()  # Items con sus hijos reales ya insertados
+        treeview.bind('<<TreeviewOpen>>', self.al_abrir)
+
+    def al_abrir(self, event=None):
+        self.cargar(self.treeview.focus())
+
+    def insertar(self, padre, indice, nodo, texto, etiquetas, hijos):
+        item = self.treeview.insert(padre, indice, text=texto, tags=etiquetas)
+        self.datos[item] = (nodo, texto, etiquetas)
+        if hijos:
+            self.treeview.insert(item, 'end', text='', tags=(MARCADOR,))
+        return item
+
+    def cargar(self, item):
+        # Reemplaza el hijo provisional por los hijos reales
+        if item in self.cargados or item not in self.datos:
+            return
+        self.cargados.add(item)
+        self.treeview.delete(*self.treeview.get_children(item))
+        for hijo in aplanar(self.describir(self.datos[item][0])[2]):
+            self.insertar(item, 'end', hijo, *self.describir(hijo))
+
+    def borrar(self, items):
+        # Borra items de la vista y olvida sus datos y los de sus descendientes cargados
+        pila = list(items)
+        while pila:
+            item = pila.pop()
+            self.datos.pop(item, None)
+            if item in self.cargados:
+                self.cargados.discard(item)
+                pila.extend(self.treeview.get_children(item))
+        if items:
+            self.treeview.delete(*items)
+
+    def limpiar(self):
+        self.borrar(self.treeview.get_children(''))
+
+    def mostrar(self, arbol):
+        primera_vez = not self.treeview.get_children('')
+        pila = [('', aplanar([arbol]))]
+        while pila:
+            padre, nuevos = pila.pop()
+            self.parchear(padre, nuevos, pila)
+        if primera_vez:
+            # Como antes, el primer nivel se muestra abierto
+            for item in self.treeview.get_children(''):
+                self.cargar(item)
+                self.treeview.item(item, open=True)
+
+    def parchear(self, padre, nuevos, pila):
+        # Deja los hijos de padre iguales a nuevos; los hijos cargados que se
+        # conservan se agregan a pila para compararlos después
+        viejos = self.treeview.get_children(padre)
+        descripciones = [self.describir(nodo) for nodo in nuevos]
+        textos_viejos = [self.datos[item][1:] for item in viejos]
+        textos_nuevos = [(texto, etiquetas) for texto, etiquetas, _ in descripciones]
+
+        # Prefijo y sufijo comunes sin difflib: el caso normal es una edición pequeña
+        inicio = 0
+        limite = min(len(viejos), len(nuevos))
+        while inicio < limite and textos_viejos[inicio] == textos_nuevos[inicio]:
+            inicio += 1
+        fin_viejo, fin_nuevo = len(viejos), len(nuevos)
+        while fin_viejo > inicio and fin_nuevo > inicio and textos_viejos[fin_viejo - 1] == textos_nuevos[fin_nuevo - 1]:
+            fin_viejo -= 1
+            fin_nuevo -= 1
+        operaciones = [('equal', 0, inicio, 0, inicio)]
+        comparador = difflib.SequenceMatcher(None, textos_viejos[inicio:fin_viejo], textos_nuevos[inicio:fin_nuevo])
+        for operacion, i1, i2, j1, j2 in comparador.get_opcodes():
+            operaciones.append((operacion, inicio + i1, inicio + i2, inicio + j1, inicio + j2))
+        operaciones.append(('equal', fin_viejo, len(viejos), fin_nuevo, len(nuevos)))
+
+        for operacion, i1, i2, j1, j2 in operaciones:
+            pares = min(i2 - i1, j2 - j1)
+            for k in range(pares):
+                self.actualizar(viejos[i1 + k], nuevos[j1 + k], descripciones[j1 + k], pila)
+            if i2 - i1 > pares:
+                self.borrar(viejos[i1 + pares:i2])
+            for j in range(j1 + pares, j2):
+                self.insertar(padre, j, nuevos[j], *descripciones[j])
+
+    def actualizar(self, item, nodo, descripcion, pila):
+        texto, etiquetas, hijos = descripcion
+        _, texto_viejo, etiquetas_viejas = self.datos[item]
+        if texto != texto_viejo or etiquetas != etiquetas_viejas:
+            self.treeview.item(item, text=texto, tags=etiquetas)
+        self.datos[item] = (nodo, texto, etiquetas)
+        if item in self.cargados:
+            pila.append((item, aplanar(hijos)))
+        elif bool(hijos) != bool(self.treeview.get_children(item)):
+            # Sin cargar: solo importa si tiene el hijo provisional
+            if hijos:
+                self.treeview.insert(item, 'end', text='', tags=(MARCADOR,))
+            else:
+                self.treeview.delete(*self.treeview.get_children(item))